@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import Counter
+
+import msgpackrpc
+
+# 本地 AirSim msgpack-RPC 桩服务，用于在没有 UE 的机器上测试位姿更新流水线
+# 只实现可视化用到的接口，可设置每次调用的模拟延迟
+
+
+class StubAirSimHandler:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.paused = False
+        self.poses = {}
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def ping(self):
+        self._call("ping")
+        return True
+
+    def getServerVersion(self):
+        return 1
+
+    def getMinRequiredClientVersion(self):
+        return 1
+
+    def simIsPaused(self):
+        return self.paused
+
+    def simPause(self, is_paused):
+        self._call("simPause")
+        self.paused = bool(is_paused)
+
+    def simSetVehiclePose(self, pose, ignore_collision, vehicle_name=""):
+        self._call("simSetVehiclePose")
+        self.poses[vehicle_name] = pose
+
+
+class StubAirSimServer:
+    def __init__(self, host="127.0.0.1", port=41451, latency=0.0):
+        self.handler = StubAirSimHandler(latency)
+        self.server = msgpackrpc.Server(self.handler)
+        self.server.listen(msgpackrpc.Address(host, port))
+        self.thread = threading.Thread(target=self.server.start, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.stop()
+        self.server.close()
+
+
+class StubClient:
+    # 最小客户端，接口与 airsim.VehicleClient 中用到的方法一致，位姿以字典传递
+    def __init__(self, host="127.0.0.1", port=41451, timeout=5):
+        self.client = msgpackrpc.Client(msgpackrpc.Address(host, port), timeout=timeout)
+
+    def simPause(self, is_paused):
+        self.client.call("simPause", is_paused)
+
+    def simSetVehiclePose(self, pose, ignore_collision, vehicle_name=""):
+        self.client.call("simSetVehiclePose", pose, ignore_collision, vehicle_name)
+
+
+if __name__ == "__main__":
+    # 对比逐帧同步 RPC 与流水线的显示帧率
+    from pose_pipeline import PoseUpdater
+
+    server = StubAirSimServer(latency=0.002).start()
+    time.sleep(0.2)
+    frames = [{"ned_n": float(i), "ned_e": 0.0, "ned_d": 0.0, "qw": 1.0, "qx": 0.0, "qy": 0.0, "qz": 0.0}
+              for i in range(600)]
+
+    client = StubClient()
+    start = time.perf_counter()
+    for point in frames:
+        client.simPause(True)
+        client.simSetVehiclePose(point, True, "drone_1")
+        client.simPause(False)
+    print(f"同步逐帧: {len(frames)}帧, 用时{time.perf_counter() - start:.3f}s")
+
+    updater = PoseUpdater(StubClient(), make_pose=lambda p: p)
+    start = time.perf_counter()
+    for point in frames:
+        updater.submit(point)
+        time.sleep(1.0 / 120)
+    updater.flush()
+    elapsed = time.perf_counter() - start
+    updater.stop()
+    print(f"流水线(120Hz输入): 用时{elapsed:.3f}s, 统计: {updater.stats()}")
+    print(f"服务端调用次数: {dict(server.handler.calls)}")
+    server.stop()
@@ -0,0 +1,230 @@
+import csv
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import jsbsim
+
+from fcs_core import AircraftSimulation, capture_inputs, restore_inputs
+from trim import TrimCache
+
+# 场景表中有特殊含义的列，其余带 "/" 的列视为属性：
+#   ic/...      初始条件，在 run_ic 之前设置
+#   其他属性     在初始化任务之后设置，如 ap/airspeed_setpoint、atmosphere/wind-north-fps
+RESERVED = ("run_id", "script", "max_time", "initial_work")
+RESULT_FIELDS = ("run_id", "status", "error", "wall_time")
+
+# 每个工作进程只加载一次 c310 模型，之后所有场景复用
+_worker = {}
+
+
+def _init_worker(init_xml, scripts, metrics, trim_cache=None):
+    fdm = jsbsim.FGFDMExec(root_dir=None)
+    fdm.set_debug_level(0)
+    fdm.load_model("c310")
+    fdm.load_ic(init_xml, True)
+    fdm.run_ic()
+    _worker.update(
+        fdm=fdm,
+        inputs=capture_inputs(fdm),
+        init_xml=init_xml,
+        scripts=scripts or {},
+        metrics=metrics or summarize,
+        trim=TrimCache(trim_cache, init_xml) if trim_cache else None,
+    )
+
+
+def summarize(sim):
+    # 默认统计量，基于记录器中保留的数据
+    data = sim.recorder.recent()
+    idx = sim.state.index
+    final = sim.state
+    alt = data[:, idx["altitude_ft"]]
+    vc = data[:, idx["vc_kts"]]
+    return {
+        "sim_time": final["time"],
+        "terminated": int(sim.fdm["simulation/terminate"]),
+        "final_altitude_ft": final["altitude_ft"],
+        "final_lat_deg": final["lat_deg"],
+        "final_lon_deg": final["lon_deg"],
+        "final_vc_kts": final["vc_kts"],
+        "min_altitude_ft": float(alt.min()) if alt.size else final["altitude_ft"],
+        "max_vc_kts": float(vc.max()) if vc.size else final["vc_kts"],
+        "mean_vc_kts": float(vc.mean()) if vc.size else final["vc_kts"],
+    }
+
+
+def run_scenario(scenario, max_time=300.0, log_dir=None):
+    # 在工作进程中运行一个场景，异常时返回 status=error 而不是中断整个批次
+    start = time.perf_counter()
+    result = {"run_id": scenario["run_id"], "status": "ok", "error": ""}
+    try:
+        restore_inputs(_worker["inputs"])
+        ic = {k: v for k, v in scenario.items() if k.startswith("ic/")}
+        props = {k: v for k, v in scenario.items() if "/" in k and not k.startswith("ic/")}
+        run_time = float(scenario.get("max_time") or max_time)
+        log_csv = os.path.join(log_dir, f"{scenario['run_id']}.csv") if log_dir else None
+        sim = AircraftSimulation(max_time=run_time, init_xml=_worker["init_xml"], log_csv=log_csv,
+                                 log_retention=int(run_time / _worker["fdm"].get_delta_t()) + 1,
+                                 fdm=_worker["fdm"], ic=ic,
+                                 trim=_worker["trim"])
+        sim.print_enable = False
+        script = scenario.get("script")
+        if script:
+            sim.main_script = _worker["scripts"][script]
+        initial_work = scenario.get("initial_work") or "initial_work1"
+        getattr(sim, initial_work)()
+        for name, value in props.items():
+            sim.fdm[name] = value
+        sim.run_simulation(initial_work=None)
+        result.update(_worker["metrics"](sim))
+    except Exception:
+        result["status"] = "error"
+        result["error"] = traceback.format_exc(limit=3).strip().replace("\n", " | ")
+    result["wall_time"] = time.perf_counter() - start
+    return result
+
+
+def load_scenarios(scenarios):
+    # 支持 CSV 路径、DataFrame 或字典列表
+    if isinstance(scenarios, str):
+        import pandas as pd
+        scenarios = pd.read_csv(scenarios)
+    if hasattr(scenarios, "to_dict"):
+        scenarios = scenarios.to_dict("records")
+    rows = []
+    for i, row in enumerate(scenarios):
+        # 稀疏的场景表中未填写的单元格为 NaN/None/空字符串，视为未设置，不写入 FDM
+        row = {k: v for k, v in dict(row).items() if not _blank(v)}
+        run_id = row.get("run_id", i)
+        if isinstance(run_id, float) and run_id.is_integer():
+            # 含空值的整数列被 pandas 读成浮点数
+            run_id = int(run_id)
+        row["run_id"] = str(run_id)
+        rows.append(row)
+    return rows
+
+
+def _blank(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    return isinstance(value, str) and not value.strip()
+
+
+class BatchRunner:
+    # scripts: {名称: main_script函数}，函数须定义在模块顶层以便传给子进程
+    # metrics: 自定义统计函数 metrics(sim) -> dict，同样需可被pickle
+    # trim_cache: 配平缓存文件，设置后每个场景按初始条件配平后从平飞状态开始
+    def __init__(self, scenarios, results_csv="batch_results.csv", workers=None, init_xml="./lyj_init.xml",
+                 max_time=300.0, scripts=None, metrics=None, log_dir=None, trim_cache=None):
+        self.scenarios = load_scenarios(scenarios)
+        self.results_csv = results_csv
+        self.workers = workers
+        self.init_xml = init_xml
+        self.max_time = max_time
+        self.scripts = scripts
+        self.metrics = metrics
+        self.log_dir = log_dir
+        self.trim_cache = trim_cache
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    def completed(self):
+        # 断点续跑：结果文件中状态为 ok 的场景不再重复运行，失败的重新运行
+        if not os.path.exists(self.results_csv):
+            return set()
+        with open(self.results_csv, newline="") as f:
+            return {row["run_id"] for row in csv.DictReader(f) if row.get("status") == "ok"}
+
+    def _fields(self, first_row):
+        # 表头 = 结果列 + 所有场景的参数列（稀疏表中第一行未填的列也要保留）+ 统计列
+        fields = list(RESULT_FIELDS)
+        for row in self.scenarios + [first_row]:
+            fields.extend(k for k in row if k not in fields)
+        return fields
+
+    def _writer(self, fields):
+        # 追加到已有结果文件时，表头缺少的列追加到末尾并重写整个文件，不丢弃任何列
+        exists = os.path.exists(self.results_csv) and os.path.getsize(self.results_csv) > 0
+        if exists:
+            with open(self.results_csv, newline="") as f:
+                old = next(csv.reader(f))
+            missing = [k for k in fields if k not in old]
+            fields = old + missing
+            if missing:
+                self._rewrite(fields)
+        out = open(self.results_csv, "a", newline="")
+        writer = csv.DictWriter(out, fieldnames=fields, restval="")
+        if not exists:
+            writer.writeheader()
+        return out, writer
+
+    def _rewrite(self, fields):
+        with open(self.results_csv, newline="") as f:
+            rows = list(csv.DictReader(f))
+        tmp = f"{self.results_csv}.{os.getpid()}.tmp"
+        with open(tmp, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields, restval="")
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp, self.results_csv)
+
+    def _write(self, out, writer, rows):
+        # 统计函数在后续场景中返回了新的键时扩展表头，而不是静默丢弃
+        extra = [k for row in rows for k in row if k not in writer.fieldnames]
+        if extra:
+            out.close()
+            out, writer = self._writer(list(writer.fieldnames) + list(dict.fromkeys(extra)))
+        writer.writerows(rows)
+        out.flush()
+        return out, writer
+
+    def run(self):
+        done = self.completed()
+        todo = [s for s in self.scenarios if s["run_id"] not in done]
+        print(f"批量仿真: 共{len(self.scenarios)}个场景, 已完成{len(done)}, 待运行{len(todo)}")
+        if not todo:
+            return 0
+        out = writer = None
+        held = []
+        failed = 0
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                 initargs=(self.init_xml, self.scripts, self.metrics, self.trim_cache)) as pool:
+            futures = {pool.submit(run_scenario, s, self.max_time, self.log_dir): s for s in todo}
+            try:
+                for k, future in enumerate(as_completed(futures), 1):
+                    scenario = futures[future]
+                    result = {**scenario, **future.result()}
+                    # 统计列以第一个成功结果为准（失败结果没有统计列），之前的失败结果先暂存
+                    held.append(result)
+                    if writer is None and result["status"] == "ok":
+                        out, writer = self._writer(self._fields(result))
+                    if writer is not None:
+                        # 每个结果立即落盘，中断后可从结果文件续跑
+                        out, writer = self._write(out, writer, held)
+                        held = []
+                    if result["status"] != "ok":
+                        failed += 1
+                        print(f"(BATCH)场景 {result['run_id']} 失败: {result['error']}")
+                    print(f"(BATCH)进度 {k}/{len(todo)}, run_id={result['run_id']}, 耗时{result['wall_time']:.2f}s")
+            finally:
+                if held:
+                    if writer is None:
+                        out, writer = self._writer(self._fields(held[0]))
+                    out, writer = self._write(out, writer, held)
+                if out:
+                    out.close()
+        print(f"批量仿真结束, 失败{failed}个, 结果保存在 {self.results_csv}")
+        return failed
+
+
+if __name__ == "__main__":
+    # 示例：不同初始速度与目标速度组合
+    scenarios = [
+        {"run_id": f"v{vc}_sp{sp}", "ic/vc-kts": vc, "ap/airspeed_setpoint": sp, "ap/airspeed_hold": 1}
+        for vc in (110, 120, 130) for sp in (140, 160, 180)
+    ]
+    BatchRunner(scenarios, results_csv="batch_results.csv", max_time=60.0).run()
@@ -0,0 +1,256 @@
+import json
+import os
+import pickle
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+
+from fcs_core import INPUT_PREFIXES
+from flight_recorder import FlightRecorder
+from profiler import StageProfiler
+
+# 检查点：在某一时刻保存仿真状态，之后恢复或从该时刻分叉出多个分支
+# 两种方式：
+#   Checkpoint        基于属性的快照，可存内存或文件，跨进程/跨平台恢复；
+#                     自动驾驶 PID/积分器通过 initial-integrator-value 回填；PID 的微分项和
+#                     滤波器内部历史无法读写，恢复后第一步滤波器按当前输入重新初始化，
+#                     与原轨迹有小幅偏差（c310 巡航恢复后 60s 内最大约 1.4ft / 0.5kts）
+#   fork_branches     POSIX 下用 os.fork 复制整个进程，分支从完全一致的状态继续（写时复制，逐位一致）；
+#                     不支持 fork 的平台（Windows）退回到 Checkpoint 恢复
+CHECKPOINT_VERSION = 1
+
+# 运动学状态：(初始条件属性, 当前状态属性)
+KINEMATICS = (
+    ("ic/lat-geod-rad", "position/lat-geod-rad"),
+    ("ic/long-gc-rad", "position/long-gc-rad"),
+    ("ic/h-sl-ft", "position/h-sl-ft"),
+    ("ic/u-fps", "velocities/u-fps"),
+    ("ic/v-fps", "velocities/v-fps"),
+    ("ic/w-fps", "velocities/w-fps"),
+    ("ic/phi-rad", "attitude/phi-rad"),
+    ("ic/theta-rad", "attitude/theta-rad"),
+    ("ic/psi-true-rad", "attitude/psi-rad"),
+    ("ic/p-rad_sec", "velocities/p-rad_sec"),
+    ("ic/q-rad_sec", "velocities/q-rad_sec"),
+    ("ic/r-rad_sec", "velocities/r-rad_sec"),
+)
+
+
+def _component_name(name):
+    # JSBSim 中不带路径的部件名挂在 fcs/ 下
+    return name if "/" in name else "fcs/" + name
+
+
+@lru_cache(maxsize=None)
+def _integrator_components(aircraft_dir, model):
+    # 从飞机配置及其引用的系统/自动驾驶文件中找出 PID 和积分器
+    # 返回 ((部件名, 类型, 输出属性, 输入属性, kp), ...)
+    root = ET.parse(os.path.join(aircraft_dir, f"{model}.xml")).getroot()
+    docs = [root]
+    for tag in ("system", "autopilot", "flight_control"):
+        for el in root.iter(tag):
+            ref = el.get("file")
+            if not ref:
+                continue
+            for path in (os.path.join(aircraft_dir, ref + ".xml"), os.path.join(aircraft_dir, "Systems", ref + ".xml")):
+                if os.path.exists(path):
+                    docs.append(ET.parse(path).getroot())
+                    break
+    found = []
+    for doc in docs:
+        for kind in ("pid", "integrator"):
+            for el in doc.iter(kind):
+                name = _component_name(el.get("name", ""))
+                output = el.findtext("output")
+                output = output.strip() if output else name
+                found.append((name, kind, output, (el.findtext("input") or "").strip(), (el.findtext("kp") or "0").strip()))
+    return tuple(found)
+
+
+def _value(fdm, expr):
+    # 数值或属性名（可带负号）
+    try:
+        return float(expr)
+    except ValueError:
+        sign = -1.0 if expr.startswith("-") else 1.0
+        return sign * fdm[expr.lstrip("-")]
+
+
+class Checkpoint:
+    # 内存中保存为普通字典，save/load 读写 JSON 文件
+    def __init__(self, sim_time, step, kinematics, inputs, integrators, meta=None):
+        self.sim_time = sim_time
+        self.step = step
+        self.kinematics = kinematics
+        self.inputs = inputs
+        self.integrators = integrators
+        self.meta = meta or {}
+
+    @classmethod
+    def capture(cls, sim, meta=None):
+        fdm = sim.fdm
+        kinematics = {ic: fdm[prop] for ic, prop in KINEMATICS}
+        inputs = {}
+        for entry in fdm.get_property_catalog():
+            name, mode = entry.rsplit(" ", 1)
+            if mode == "(RW)" and name.startswith(INPUT_PREFIXES):
+                inputs[name] = fdm[name]
+        # 积分器状态即其输出；PID 的积分项 = 输出 - kp * 输入（忽略微分项）
+        integrators = {}
+        for name, kind, output, source, kp in _integrator_components(fdm.get_full_aircraft_path(), fdm.get_model_name()):
+            if kind == "integrator":
+                integrators[name] = fdm[output]
+            elif source:
+                integrators[name] = fdm[output] - _value(fdm, kp) * _value(fdm, source)
+        meta = dict(meta or {}, model=fdm.get_model_name())
+        return cls(sim.sim_time, sim.step, kinematics, inputs, integrators, meta)
+
+    def restore(self, sim):
+        # 恢复到 sim（可以是另一个进程中新建的仿真），之后用 run_simulation(initial_work=None) 继续
+        fdm = sim.fdm
+        for name, value in self.kinematics.items():
+            fdm[name] = value
+        fdm.reset_to_initial_conditions(0)
+        for name, value in self.inputs.items():
+            fdm[name] = value
+        fdm["propulsion/set-running"] = -1
+        for name, value in self.integrators.items():
+            fdm[name + "/initial-integrator-value"] = value
+        fdm.set_sim_time(self.sim_time)
+        sim.sim_time = self.sim_time
+        sim.step = self.step
+        sim.state.update(self.sim_time)
+        return sim
+
+    def to_dict(self):
+        return {"version": CHECKPOINT_VERSION, "sim_time": self.sim_time, "step": self.step,
+                "kinematics": self.kinematics, "inputs": self.inputs, "integrators": self.integrators,
+                "meta": self.meta}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"不支持的检查点版本: {data.get('version')}")
+        return cls(data["sim_time"], data["step"], data["kinematics"], data["inputs"], data["integrators"],
+                   data.get("meta"))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def _prepare_branch(sim, variant, log_dir):
+    # 分支使用独立的记录器和统计，不写父仿真的文件和状态总线、不发送可视化数据、不限速
+    run_id = variant["run_id"]
+    sim.max_time = float(variant.get("max_time") or sim.max_time)
+    log_csv = os.path.join(log_dir, f"{run_id}.csv") if log_dir else None
+    retention = int((sim.max_time - sim.sim_time) * 120) + 1
+    sim.log_csv = log_csv
+    sim.recorder = FlightRecorder(sim.state.names, csv_file=log_csv, retention=max(retention, 1))
+    sim.profiler = StageProfiler()
+    sim.broadcaster = None
+    sim.publisher = None
+    sim.state_bus = None
+    sim.session_dir = None
+    sim.print_enable = False
+    sim.pacer.realtime_factor = None
+    sim.commands.journal_file = None
+    for name, value in variant.items():
+        if "/" in name:
+            sim.fdm[name] = value
+
+
+def default_branch(sim, variant):
+    # 默认分支：写入 variant 中的属性后运行到 max_time，返回 batch_runner.summarize 的统计量
+    from batch_runner import summarize
+    sim.run_simulation(initial_work=None)
+    return summarize(sim)
+
+
+def _run_branch(sim, variant, branch, log_dir):
+    start = time.perf_counter()
+    result = {"run_id": variant["run_id"], "status": "ok", "error": ""}
+    try:
+        _prepare_branch(sim, variant, log_dir)
+        result.update(branch(sim, variant) or {})
+    except Exception:
+        result["status"] = "error"
+        result["error"] = traceback.format_exc(limit=3).strip().replace("\n", " | ")
+    result["wall_time"] = time.perf_counter() - start
+    return result
+
+
+def _fork_branch(sim, variant, branch, log_dir):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            data = pickle.dumps(_run_branch(sim, variant, branch, log_dir))
+        except Exception:
+            data = pickle.dumps({"run_id": variant["run_id"], "status": "error",
+                                 "error": traceback.format_exc(limit=1).strip(), "wall_time": 0.0})
+        with os.fdopen(write_fd, "wb") as f:
+            f.write(data)
+        # 子进程直接退出，不执行父进程注册的清理逻辑
+        os._exit(0)
+    os.close(write_fd)
+    return pid, read_fd
+
+
+def _collect(pid, read_fd, run_id):
+    with os.fdopen(read_fd, "rb") as f:
+        data = f.read()
+    os.waitpid(pid, 0)
+    if not data:
+        return {"run_id": run_id, "status": "error", "error": "分支进程异常退出", "wall_time": 0.0}
+    return pickle.loads(data)
+
+
+def fork_branches(sim, variants, branch=None, workers=None, log_dir=None, checkpoint=None):
+    # 从 sim 的当前状态分叉运行多个分支，variants 为字典列表，格式同 BatchRunner 的场景：
+    #   {"run_id": ..., "max_time": ..., "ap/airspeed_setpoint": ..., ...}
+    # branch(sim, variant) -> dict 为分支逻辑，默认运行到 max_time 并返回统计量
+    # 返回与 variants 顺序一致的结果列表；sim 本身不会被修改
+    branch = branch or default_branch
+    variants = [dict(v, run_id=str(v.get("run_id", i))) for i, v in enumerate(variants)]
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    if not hasattr(os, "fork"):
+        # 不支持 fork：每个分支都从属性快照恢复后顺序运行，最后恢复 sim 的原状态
+        checkpoint = checkpoint or Checkpoint.capture(sim)
+        saved = {k: getattr(sim, k) for k in ("max_time", "log_csv", "recorder", "profiler", "broadcaster",
+                                              "publisher", "state_bus", "session_dir", "print_enable")}
+        saved_factor, saved_journal = sim.pacer.realtime_factor, sim.commands.journal_file
+        results = []
+        for variant in variants:
+            checkpoint.restore(sim)
+            results.append(_run_branch(sim, variant, branch, log_dir))
+        checkpoint.restore(sim)
+        for k, v in saved.items():
+            setattr(sim, k, v)
+        sim.pacer.realtime_factor, sim.commands.journal_file = saved_factor, saved_journal
+        return results
+
+    # 分叉前把父进程缓冲中的数据落盘，避免子进程退出时重复写入
+    sim.recorder.flush()
+    if sim.commands._journal:
+        sim.commands._journal.flush()
+    workers = workers or os.cpu_count() or 1
+    results = [None] * len(variants)
+    running = []
+    for i, variant in enumerate(variants):
+        if len(running) >= workers:
+            j, pid, fd = running.pop(0)
+            results[j] = _collect(pid, fd, variants[j]["run_id"])
+        running.append((i, *_fork_branch(sim, variant, branch, log_dir)))
+    for j, pid, fd in running:
+        results[j] = _collect(pid, fd, variants[j]["run_id"])
+    return results
@@ -0,0 +1,203 @@
+import heapq
+import struct
+import threading
+import time
+from collections import deque
+
+# 命令日志二进制格式：
+# 文件头 = b"CJNL" + 版本(uint16)
+# 记录   = 类型(1字节) + 内容
+#   b"N": 属性名定义  id(uint16) + 长度(uint16) + 属性名(utf-8)
+#   b"C": 命令        仿真步序号(uint32) + 仿真时间(float64) + 属性id(uint16) + 值(float64)
+JOURNAL_MAGIC = b"CJNL"
+JOURNAL_VERSION = 1
+_HEAD = struct.Struct("<4sH")
+_NAME = struct.Struct("<HH")
+_CMD = struct.Struct("<IdHd")
+
+
+class CommandBuffer:
+    # 外部线程写入，仿真线程每步调用 apply
+    # 同一属性的多次写入只保留最新值；可指定生效的仿真时间；set_many 的多个属性在同一步生效
+    def __init__(self, fdm, journal_file=None, latency_window=1000):
+        self.fdm = fdm
+        self._pm = fdm.get_property_manager()
+        self._lock = threading.Lock()
+        # 立即生效的命令：属性名 -> (值, 提交时刻)
+        self._latest = {}
+        # 定时命令：(生效时间, 序号, {属性名: 值}, 提交时刻)
+        self._scheduled = []
+        self._seq = 0
+        self._nodes = {}
+
+        self.submitted = 0
+        self.applied = 0
+        # 属性名不存在而被拒绝的命令数
+        self.rejected = 0
+        self.latencies = deque(maxlen=latency_window)
+
+        self.journal_file = journal_file
+        self._journal = None
+        self._name_ids = {}
+
+    def set(self, name, value, at=None):
+        self.set_many({name: value}, at)
+
+    def set_many(self, updates, at=None):
+        # 提交时检查属性名，拼错的命令在调用方报错，而不是等到仿真线程写入时才发现
+        try:
+            for name in updates:
+                self._node(name)
+        except ValueError:
+            with self._lock:
+                self.rejected += len(updates)
+            raise
+        now = time.perf_counter()
+        with self._lock:
+            self.submitted += len(updates)
+            if at is None:
+                for name, value in updates.items():
+                    self._latest[name] = (value, now)
+            else:
+                heapq.heappush(self._scheduled, (at, self._seq, dict(updates), now))
+                self._seq += 1
+
+    def pending(self):
+        with self._lock:
+            return len(self._latest) + sum(len(u) for _, _, u, _ in self._scheduled)
+
+    def _node(self, name):
+        node = self._nodes.get(name)
+        if node is None:
+            # 不自动创建属性：拼错的属性名会写到新建的属性上，飞机永远读不到
+            node = self._pm.get_node(name, False)
+            if node is None:
+                raise ValueError(f"JSBSim属性 {name} 不存在")
+            self._nodes[name] = node
+        return node
+
+    def apply(self, sim_time, step=0):
+        # 在仿真线程中调用，工作量与本步涉及的不同属性数成正比
+        with self._lock:
+            if not self._latest and not (self._scheduled and self._scheduled[0][0] <= sim_time):
+                return 0
+            latest, self._latest = self._latest, {}
+            due = {}
+            while self._scheduled and self._scheduled[0][0] <= sim_time:
+                _, _, updates, submitted = heapq.heappop(self._scheduled)
+                for name, value in updates.items():
+                    due[name] = (value, submitted)
+        # 到期的定时命令先写，随后写入立即命令（更新的意图覆盖更早的定时值）
+        due.update(latest)
+        now = time.perf_counter()
+        for name, (value, submitted) in due.items():
+            self._node(name).set_double_value(value)
+            self.latencies.append(now - submitted)
+            if self.journal_file:
+                self._record(step, sim_time, name, value)
+        self.applied += len(due)
+        return len(due)
+
+    def _record(self, step, sim_time, name, value):
+        if self._journal is None:
+            self._journal = open(self.journal_file, "wb")
+            self._journal.write(_HEAD.pack(JOURNAL_MAGIC, JOURNAL_VERSION))
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self._name_ids)
+            self._name_ids[name] = name_id
+            raw = name.encode("utf-8")
+            self._journal.write(b"N" + _NAME.pack(name_id, len(raw)) + raw)
+        self._journal.write(b"C" + _CMD.pack(step, sim_time, name_id, value))
+
+    def close(self):
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        pending = self.pending()
+        out = {"submitted": self.submitted, "applied": self.applied,
+               "coalesced": self.submitted - self.applied - pending, "pending": pending,
+               "rejected": self.rejected}
+        if lat:
+            out.update(
+                latency_mean_ms=1000.0 * sum(lat) / len(lat),
+                latency_p99_ms=1000.0 * lat[min(len(lat) - 1, int(len(lat) * 0.99))],
+                latency_max_ms=1000.0 * lat[-1],
+            )
+        return out
+
+
+def read_journal(journal_file):
+    # 返回 [(仿真步序号, 仿真时间, 属性名, 值), ...]
+    with open(journal_file, "rb") as f:
+        data = f.read()
+    magic, version = _HEAD.unpack_from(data)
+    if magic != JOURNAL_MAGIC:
+        raise ValueError(f"{journal_file} 不是命令日志文件")
+    if version != JOURNAL_VERSION:
+        raise ValueError(f"不支持的命令日志版本: {version}")
+    names = {}
+    commands = []
+    pos = _HEAD.size
+    while pos < len(data):
+        kind = data[pos:pos + 1]
+        pos += 1
+        if kind == b"N":
+            if pos + _NAME.size > len(data):
+                break
+            name_id, length = _NAME.unpack_from(data, pos)
+            pos += _NAME.size
+            names[name_id] = data[pos:pos + length].decode("utf-8")
+            pos += length
+        elif kind == b"C":
+            # 写入中途崩溃时最后一条记录可能不完整
+            if pos + _CMD.size > len(data):
+                break
+            step, sim_time, name_id, value = _CMD.unpack_from(data, pos)
+            pos += _CMD.size
+            commands.append((step, sim_time, names[name_id], value))
+        else:
+            raise ValueError(f"命令日志损坏，位置 {pos - 1}")
+    return commands
+
+
+class JournalPlayer(CommandBuffer):
+    # 会话重放用的命令源：按命令日志中记录的仿真步写入命令，与记录时的生效步完全一致
+    # commands 为 read_journal 的结果；运行中外部写入的命令不生效，只计数
+    # journal_file 不为空时重放中生效的命令同样记录，可作为新的基准会话
+    def __init__(self, fdm, commands, journal_file=None):
+        super().__init__(fdm, journal_file=journal_file)
+        self.commands = commands
+        self.pos = 0
+        self.ignored = 0
+        # 生效步早于当前步的命令（重放从中途开始时），会立即写入
+        self.late = 0
+
+    def set_many(self, updates, at=None):
+        self.ignored += len(updates)
+
+    def pending(self):
+        return len(self.commands) - self.pos
+
+    def apply(self, sim_time, step=0):
+        commands = self.commands
+        pos = self.pos
+        while pos < len(commands) and commands[pos][0] <= step:
+            cmd_step, _, name, value = commands[pos]
+            if cmd_step < step:
+                self.late += 1
+            self._node(name).set_double_value(value)
+            if self.journal_file:
+                self._record(step, sim_time, name, value)
+            pos += 1
+        count = pos - self.pos
+        self.pos = pos
+        self.applied += count
+        return count
+
+    def stats(self):
+        return {"commands": len(self.commands), "applied": self.applied, "pending": self.pending(),
+                "ignored": self.ignored, "late": self.late}
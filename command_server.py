@@ -0,0 +1,321 @@
+import asyncio
+import math
+import socket
+import struct
+import threading
+import time
+
+# 控制/状态协议（little-endian），UDP 每个数据报一条消息，TCP 每条消息前加 uint16 长度
+# 消息头 = 类型(uint8) + 请求号(uint32)
+#   SET       = 生效仿真时间(float64, NaN 表示立即) + 条数(uint8) + 条目 * [名称长度(uint8) + 名称 + 值(float64)]
+#   SUBSCRIBE = 频率(float64, Hz, 0 表示取消订阅)
+#   SCHEMA    = 无内容，返回状态字段名
+#   ACK       = 状态(uint8) + 仿真步序号(uint32) + 仿真时间(float64)
+#   STATE     = 仿真步序号(uint32) + 字段数(uint16) + 字段值 * float64（顺序同 SCHEMA）
+MSG_SET = 1
+MSG_SUBSCRIBE = 2
+MSG_SCHEMA = 3
+MSG_ACK = 0x81
+MSG_STATE = 0x82
+MSG_SCHEMA_REPLY = 0x83
+
+STATUS_OK = 0
+STATUS_BAD_REQUEST = 1
+STATUS_FORBIDDEN = 2
+
+HEADER = struct.Struct("<BI")
+SET_HEAD = struct.Struct("<dB")
+ACK = struct.Struct("<BId")
+RATE = struct.Struct("<d")
+STATE_HEAD = struct.Struct("<IH")
+LENGTH = struct.Struct("<H")
+VALUE = struct.Struct("<d")
+
+MAX_RATE = 1000.0
+# UDP 无连接，订阅需在租期内续订（任意消息均可续期），否则视为客户端已离开
+UDP_LEASE = 10.0
+
+
+def encode_set(req_id, updates, at=None):
+    parts = [HEADER.pack(MSG_SET, req_id), SET_HEAD.pack(math.nan if at is None else at, len(updates))]
+    for name, value in updates.items():
+        raw = name.encode("utf-8")
+        parts.append(bytes((len(raw),)) + raw + VALUE.pack(value))
+    return b"".join(parts)
+
+
+def decode_set(body):
+    at, count = SET_HEAD.unpack_from(body)
+    pos = SET_HEAD.size
+    updates = {}
+    for _ in range(count):
+        length = body[pos]
+        name = body[pos + 1:pos + 1 + length].decode("utf-8")
+        pos += 1 + length
+        updates[name] = VALUE.unpack_from(body, pos)[0]
+        pos += VALUE.size
+    return (None if math.isnan(at) else at), updates
+
+
+class CommandServer:
+    # 与 AircraftSimulation 同进程运行的 asyncio 控制/状态服务，在独立线程中运行事件循环
+    # 客户端可写入 allowed_prefixes 下的属性，并以指定频率订阅状态快照
+    def __init__(self, sim, host="127.0.0.1", tcp_port=5600, udp_port=5601, allowed_prefixes=("fcs/", "ap/")):
+        self.sim = sim
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.allowed_prefixes = tuple(allowed_prefixes)
+        self.loop = None
+        self.thread = None
+        self._ready = threading.Event()
+        self._subscriptions = {}
+        self._leases = {}
+        self._error = None
+        self._tcp_server = None
+        self._udp_transport = None
+        self.received = 0
+        self.rejected = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        if not self._ready.wait(5.0):
+            raise TimeoutError("控制服务启动超时")
+        if self._error:
+            raise self._error
+        print(f"控制服务启动: TCP({self.host}, {self.tcp_port}), UDP({self.host}, {self.udp_port})")
+        return self
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(1.0)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            try:
+                self.loop.run_until_complete(self._open())
+            except Exception as exc:
+                # 端口被占用等启动失败交给 start() 在调用线程抛出
+                self._error = exc
+                return
+            finally:
+                self._ready.set()
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self._close())
+            self.loop.close()
+
+    async def _close(self):
+        tasks = [task for task, _ in self._subscriptions.values()]
+        self._subscriptions.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._tcp_server:
+            self._tcp_server.close()
+            await self._tcp_server.wait_closed()
+        if self._udp_transport:
+            self._udp_transport.close()
+
+    async def _open(self):
+        if self.tcp_port is not None:
+            # asyncio 的 TCP 传输默认开启 TCP_NODELAY
+            self._tcp_server = await asyncio.start_server(self._serve_tcp, self.host, self.tcp_port)
+        if self.udp_port is not None:
+            self._udp_transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: _UdpProtocol(self), local_addr=(self.host, self.udp_port))
+
+    def _ack(self, req_id, status):
+        return HEADER.pack(MSG_ACK, req_id) + ACK.pack(status, self.sim.step, self.sim.sim_time)
+
+    def handle(self, data, send, key):
+        # 处理一条消息，send(bytes) 用于回复和推送状态，key 标识订阅者
+        self.received += 1
+        try:
+            kind, req_id = HEADER.unpack_from(data)
+            body = data[HEADER.size:]
+            if kind == MSG_SET:
+                at, updates = decode_set(body)
+                if not all(name.startswith(self.allowed_prefixes) for name in updates):
+                    self.rejected += 1
+                    send(self._ack(req_id, STATUS_FORBIDDEN))
+                    return
+                self.sim.add_commands(updates, at)
+                send(self._ack(req_id, STATUS_OK))
+            elif kind == MSG_SUBSCRIBE:
+                self._subscribe(key, RATE.unpack_from(body)[0], send)
+                send(self._ack(req_id, STATUS_OK))
+            elif kind == MSG_SCHEMA:
+                send(HEADER.pack(MSG_SCHEMA_REPLY, req_id) + ",".join(self.sim.state.names).encode("utf-8"))
+            else:
+                raise ValueError(f"未知消息类型 {kind}")
+        except (struct.error, ValueError, IndexError, UnicodeDecodeError):
+            self.rejected += 1
+            req_id = HEADER.unpack_from(data)[1] if len(data) >= HEADER.size else 0
+            send(self._ack(req_id, STATUS_BAD_REQUEST))
+
+    def _subscribe(self, key, rate, send):
+        rate = min(rate, MAX_RATE)
+        old = self._subscriptions.get(key)
+        if old and old[1] == rate and rate > 0:
+            # 同频率重复订阅即续订，不重启推送
+            return
+        self._unsubscribe(key)
+        if rate > 0:
+            self._subscriptions[key] = (self.loop.create_task(self._publish(rate, send, key)), rate)
+
+    def _unsubscribe(self, key):
+        entry = self._subscriptions.pop(key, None)
+        self._leases.pop(key, None)
+        if entry:
+            entry[0].cancel()
+
+    def _renew(self, key):
+        # 仅为 UDP 订阅者记录租期，TCP 订阅随连接关闭而结束
+        if key in self._subscriptions:
+            self._leases[key] = self.loop.time() + UDP_LEASE
+        else:
+            self._leases.pop(key, None)
+
+    async def _publish(self, rate, send, key):
+        # 按订阅频率推送最新状态快照，仿真未前进时不重复发送
+        period = 1.0 / rate
+        last_step = -1
+        next_tick = self.loop.time()
+        while True:
+            lease = self._leases.get(key)
+            if lease is not None and self.loop.time() > lease:
+                self._subscriptions.pop(key, None)
+                self._leases.pop(key, None)
+                return
+            step = self.sim.step
+            if step != last_step:
+                values = self.sim.state.values
+                send(HEADER.pack(MSG_STATE, 0) + STATE_HEAD.pack(step, len(values))
+                     + struct.pack(f"<{len(values)}d", *values))
+                last_step = step
+            next_tick += period
+            await asyncio.sleep(max(0.0, next_tick - self.loop.time()))
+
+    async def _serve_tcp(self, reader, writer):
+        key = writer
+
+        def send(data):
+            if not writer.is_closing():
+                writer.write(LENGTH.pack(len(data)) + data)
+
+        try:
+            while True:
+                length = LENGTH.unpack(await reader.readexactly(LENGTH.size))[0]
+                self.handle(await reader.readexactly(length), send, key)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._unsubscribe(key)
+            writer.close()
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.server.handle(data, lambda out: self.transport.sendto(out, addr), addr)
+        self.server._renew(addr)
+
+
+class CommandClient:
+    # 同步客户端，供外部规划器、摇杆桥接程序使用；transport 为 "udp" 或 "tcp"
+    def __init__(self, host="127.0.0.1", port=5601, transport="udp", timeout=1.0):
+        self.transport = transport
+        self.addr = (host, port)
+        if transport == "udp":
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.connect(self.addr)
+        else:
+            self.sock = socket.create_connection(self.addr)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(timeout)
+        self.req_id = 0
+        self.names = None
+        self._states = []
+        self._rate = 0.0
+        self._renew_at = 0.0
+
+    def close(self):
+        self.sock.close()
+
+    def _send(self, data):
+        if self.transport == "udp":
+            self.sock.send(data)
+        else:
+            self.sock.sendall(LENGTH.pack(len(data)) + data)
+
+    def _recv_exact(self, n):
+        buf = b""
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError("连接已关闭")
+            buf += chunk
+        return buf
+
+    def _recv(self):
+        if self.transport == "udp":
+            return self.sock.recv(65535)
+        return self._recv_exact(LENGTH.unpack(self._recv_exact(LENGTH.size))[0])
+
+    def _request(self, data, expect):
+        # 等待对应请求号的回复，期间收到的状态帧先缓存
+        self.req_id += 1
+        self._send(HEADER.pack(data[0], self.req_id) + data[HEADER.size:])
+        while True:
+            msg = self._recv()
+            kind, req_id = HEADER.unpack_from(msg)
+            if kind == MSG_STATE:
+                self._states.append(msg)
+            elif kind == expect and req_id == self.req_id:
+                return msg[HEADER.size:]
+
+    def set(self, updates, at=None):
+        # 返回 (状态, 仿真步序号, 仿真时间)
+        return ACK.unpack(self._request(encode_set(0, updates, at), MSG_ACK))
+
+    def subscribe(self, rate):
+        self._rate = rate
+        self._renew_at = time.monotonic() + UDP_LEASE / 2
+        return ACK.unpack(self._request(HEADER.pack(MSG_SUBSCRIBE, 0) + RATE.pack(rate), MSG_ACK))
+
+    def _renew(self):
+        # UDP 订阅在租期过半时续订，不等待回复（ACK 由后续接收丢弃）
+        if self.transport == "udp" and self._rate > 0 and time.monotonic() > self._renew_at:
+            self._renew_at = time.monotonic() + UDP_LEASE / 2
+            self.req_id += 1
+            self._send(HEADER.pack(MSG_SUBSCRIBE, self.req_id) + RATE.pack(self._rate))
+
+    def schema(self):
+        self.names = tuple(self._request(HEADER.pack(MSG_SCHEMA, 0), MSG_SCHEMA_REPLY).decode("utf-8").split(","))
+        return self.names
+
+    def recv_state(self):
+        # 返回 (仿真步序号, 状态值元组)；若已获取 schema，返回字典
+        self._renew()
+        msg = self._states.pop(0) if self._states else None
+        while msg is None:
+            data = self._recv()
+            if data[0] == MSG_STATE:
+                msg = data
+        step, count = STATE_HEAD.unpack_from(msg, HEADER.size)
+        values = struct.unpack_from(f"<{count}d", msg, HEADER.size + STATE_HEAD.size)
+        if self.names:
+            return step, dict(zip(self.names, values))
+        return step, values
@@ -0,0 +1,322 @@
+import heapq
+import math
+import operator
+import xml.etree.ElementTree as ET
+
+# 事件引擎：解析 JSBSim runscript 的 <event>，条件预编译为基于属性节点的判断函数
+# 语义与 JSBSim 一致：
+#   条件由假变真时触发一次；persistent="true" 的事件在条件变假后重新待命，可再次触发
+#   continuous="true" 的事件在条件为真期间每步都执行设置
+#   <delay> 触发后延迟执行；<set> 支持 action=FG_STEP/FG_RAMP/FG_EXP (tc) 和 type=FG_VALUE/FG_DELTA/FG_BOOL
+#   <notify> 触发时打印并记录指定属性
+# 只有待命的事件参与判断；条件中包含 simulation/sim-time-sec ge/gt 常数时，到时间之前不参与判断
+OPERATORS = {
+    "lt": operator.lt, "<": operator.lt,
+    "le": operator.le, "<=": operator.le,
+    "gt": operator.gt, ">": operator.gt,
+    "ge": operator.ge, ">=": operator.ge,
+    "eq": operator.eq, "==": operator.eq,
+    "ne": operator.ne, "!=": operator.ne,
+}
+SIM_TIME = "simulation/sim-time-sec"
+
+
+class Transition:
+    # 按 FG_RAMP / FG_EXP 从起始值过渡到目标值，FG_EXP 在 5 倍时间常数后到达目标值
+    def __init__(self, node, start, target, t0, tc, action):
+        self.node = node
+        self.start = start
+        self.target = target
+        self.t0 = t0
+        self.tc = tc
+        self.action = action
+
+    def update(self, sim_time):
+        # 返回 False 表示过渡已结束
+        dt = sim_time - self.t0
+        if self.action == "FG_RAMP":
+            done = dt >= self.tc
+            frac = 1.0 if done else dt / self.tc
+        else:
+            done = dt >= 5.0 * self.tc
+            frac = 1.0 if done else 1.0 - math.exp(-dt / self.tc)
+        self.node.set_double_value(self.start + (self.target - self.start) * frac)
+        return not done
+
+
+class Event:
+    def __init__(self, name, condition, sets, persistent=False, continuous=False, delay=0.0, notify=(),
+                 time_gate=None, repeat=0):
+        self.name = name
+        self.condition = condition
+        # [(属性名, 节点, 值, 类型, 方式, 时间常数), ...]
+        self.sets = sets
+        self.persistent = persistent
+        self.continuous = continuous
+        self.delay = delay
+        # [(标题, 节点), ...]
+        self.notify = notify
+        # 条件中 sim-time 的下限，到达之前条件必为假
+        self.time_gate = time_gate
+        # 非 persistent 事件在首次触发后还可再触发的次数（<repeat>）
+        self.repeat = repeat
+        self.fired = 0
+        self.active = False
+
+
+class EventEngine:
+    def __init__(self, fdm, verbose=True):
+        self.fdm = fdm
+        self._pm = fdm.get_property_manager()
+        self._nodes = {}
+        self.verbose = verbose
+        self.events = []
+        # 待命事件；有时间门限的事件先放在按时间排序的堆中
+        self._armed = []
+        self._gated = []
+        self._delayed = []
+        # 属性名 -> 正在进行的过渡
+        self._transitions = {}
+        self._seq = 0
+        self.notifications = []
+        self.fired = 0
+        # runscript 中的 <use> 与 <run> 信息
+        self.name = None
+        self.initialize = None
+        self.end_time = None
+        # 已加载的 runscript 文件，会话记录中用于重放
+        self.sources = []
+
+    def node(self, name):
+        node = self._nodes.get(name)
+        if node is None:
+            node = self._pm.get_node(name, True)
+            self._nodes[name] = node
+        return node
+
+    # ---------- 条件编译 ----------
+    def _operand(self, token):
+        try:
+            value = float(token)
+            return lambda: value
+        except ValueError:
+            pass
+        if token.startswith("-"):
+            get = self.node(token[1:]).get_double_value
+            return lambda: -get()
+        return self.node(token).get_double_value
+
+    def _compile_test(self, text):
+        parts = text.split()
+        if len(parts) != 3 or parts[1] not in OPERATORS:
+            raise ValueError(f"无法解析的条件: {text}")
+        left, op, right = parts
+        compare = OPERATORS[op]
+        lhs = self._operand(left)
+        try:
+            value = float(right)
+        except ValueError:
+            rhs = self._operand(right)
+            return lambda: compare(lhs(), rhs())
+        return lambda: compare(lhs(), value)
+
+    def compile_condition(self, condition):
+        # condition: 字符串（一行一个比较，逻辑与）、字符串列表，或 <condition> 元素（可嵌套，logic="OR"）
+        # 返回 (判断函数, sim-time 下限)
+        if isinstance(condition, str):
+            lines = [line.strip() for line in condition.splitlines() if line.strip()]
+            return self._combine([self._compile_test(line) for line in lines], "AND"), self._time_gate(lines)
+        if isinstance(condition, (list, tuple)):
+            return self.compile_condition("\n".join(condition))
+        logic = condition.get("logic", "AND").upper()
+        tests = []
+        lines = []
+        for line in (condition.text or "").splitlines():
+            if line.strip():
+                lines.append(line.strip())
+                tests.append(self._compile_test(line.strip()))
+        for child in condition:
+            if child.tag == "condition":
+                tests.append(self.compile_condition(child)[0])
+            tests.extend(self._compile_test(line.strip()) for line in (child.tail or "").splitlines() if line.strip())
+            lines.extend(line.strip() for line in (child.tail or "").splitlines() if line.strip())
+        return self._combine(tests, logic), (self._time_gate(lines) if logic == "AND" else None)
+
+    @staticmethod
+    def _combine(tests, logic):
+        tests = tuple(tests)
+        if len(tests) == 1:
+            return tests[0]
+        if logic == "OR":
+            def any_true():
+                for test in tests:
+                    if test():
+                        return True
+                return False
+            return any_true
+
+        def all_true():
+            for test in tests:
+                if not test():
+                    return False
+            return True
+        return all_true
+
+    @staticmethod
+    def _time_gate(lines):
+        gate = None
+        for line in lines:
+            parts = line.split()
+            if len(parts) == 3 and parts[0] == SIM_TIME and parts[1] in ("ge", ">=", "gt", ">"):
+                try:
+                    value = float(parts[2])
+                except ValueError:
+                    continue
+                gate = value if gate is None else max(gate, value)
+        return gate
+
+    # ---------- 事件定义 ----------
+    def add(self, name, condition, sets, persistent=False, continuous=False, delay=0.0, notify=(), repeat=0):
+        # Python 写法：sets 为 {属性: 值}，或 [(属性, 值, {"action": "FG_EXP", "tc": 3.0, "type": "FG_DELTA"}), ...]
+        # 例：engine.add("30秒后加速", "simulation/sim-time-sec ge 30", {"ap/airspeed_setpoint": 150.0})
+        predicate, gate = self.compile_condition(condition)
+        items = sets.items() if isinstance(sets, dict) else sets
+        compiled = []
+        for item in items:
+            prop, value = item[0], item[1]
+            opts = item[2] if len(item) > 2 else {}
+            action = opts.get("action", "FG_STEP")
+            tc = float(opts.get("tc", 0.0))
+            if action not in ("FG_STEP", "FG_RAMP", "FG_EXP"):
+                raise ValueError(f"事件 {name}: 不支持的 action {action}")
+            compiled.append((prop, self.node(prop), float(value), opts.get("type", "FG_VALUE"), action if tc > 0 else "FG_STEP", tc))
+        # notify: {标题: 属性} 或属性名列表
+        notify = tuple((caption, self.node(prop)) for caption, prop in
+                       (notify.items() if isinstance(notify, dict) else ((p, p) for p in notify)))
+        event = Event(name, predicate, compiled, persistent, continuous, delay, notify, gate, repeat)
+        self.events.append(event)
+        self._arm(event)
+        return event
+
+    def _arm(self, event):
+        if event.time_gate is not None:
+            heapq.heappush(self._gated, (event.time_gate, self._seq, event))
+            self._seq += 1
+        else:
+            self._armed.append(event)
+
+    def load(self, path):
+        # 解析 runscript 文件中的 <run> 部分，返回 self
+        root = ET.parse(path).getroot()
+        self.sources.append(str(path))
+        self.name = root.get("name")
+        use = root.find("use")
+        if use is not None:
+            self.initialize = use.get("initialize")
+        run = root.find("run")
+        if run is None:
+            raise ValueError(f"{path} 中没有 <run>")
+        if run.get("end"):
+            self.end_time = float(run.get("end"))
+        for prop in run.findall("property"):
+            # 脚本中声明的局部属性
+            self.node(prop.text.strip()).set_double_value(float(prop.get("value", 0.0)))
+        for el in run.findall("event"):
+            self._load_event(el)
+        return self
+
+    def _load_event(self, el):
+        name = el.get("name", f"event{len(self.events)}")
+        condition = el.find("condition")
+        if condition is None:
+            raise ValueError(f"事件 {name} 缺少 <condition>")
+        sets = []
+        for s in el.findall("set"):
+            if s.find("function") is not None:
+                raise ValueError(f"事件 {name}: 暂不支持 <set> 中的 <function>")
+            opts = {"action": s.get("action", "FG_STEP"), "tc": s.get("tc", 0.0), "type": s.get("type", "FG_VALUE")}
+            sets.append((s.get("name"), float(s.get("value").strip()), opts))
+        notify = {}
+        for n in el.findall("notify"):
+            for p in n.findall("property"):
+                prop = (p.text or "").strip() or p.get("name")
+                notify[p.get("caption", prop)] = prop
+        delay = float(el.findtext("delay", "0") or 0)
+        repeat = int(float(el.findtext("repeat", "0") or 0))
+        event = self.add(name, condition, sets, persistent=el.get("persistent") == "true",
+                         continuous=el.get("continuous") == "true", delay=delay, notify=notify, repeat=repeat)
+        return event
+
+    @classmethod
+    def from_xml(cls, fdm, path, verbose=True):
+        return cls(fdm, verbose).load(path)
+
+    # ---------- 运行 ----------
+    def update(self, sim_time):
+        # 每个仿真步调用一次；返回本步触发的事件数
+        while self._gated and self._gated[0][0] <= sim_time:
+            self._armed.append(heapq.heappop(self._gated)[2])
+        fired = 0
+        if self._armed:
+            keep = []
+            for event in self._armed:
+                if event.condition():
+                    if not event.active or event.continuous:
+                        if not event.active:
+                            fired += 1
+                        event.active = True
+                        self._trigger(event, sim_time)
+                    if not event.persistent and not event.continuous and event.fired > event.repeat:
+                        # 一次性事件触发后不再判断
+                        continue
+                elif event.active:
+                    # 条件变假后重新待命（persistent 或 repeat 次数未用完）
+                    event.active = False
+                keep.append(event)
+            self._armed = keep
+        if self._delayed:
+            while self._delayed and self._delayed[0][0] <= sim_time:
+                _, _, event = heapq.heappop(self._delayed)
+                self._apply(event, sim_time)
+        if self._transitions:
+            done = [prop for prop, tr in self._transitions.items() if not tr.update(sim_time)]
+            for prop in done:
+                del self._transitions[prop]
+        self.fired += fired
+        return fired
+
+    def _trigger(self, event, sim_time):
+        event.fired += 1
+        if event.delay > 0:
+            heapq.heappush(self._delayed, (sim_time + event.delay, self._seq, event))
+            self._seq += 1
+        else:
+            self._apply(event, sim_time)
+
+    def _apply(self, event, sim_time):
+        for prop, node, value, kind, action, tc in event.sets:
+            current = node.get_double_value()
+            if kind == "FG_DELTA":
+                value = current + value
+            elif kind == "FG_BOOL":
+                value = 1.0 if value else 0.0
+            if action == "FG_STEP":
+                # 新的设置取消该属性上正在进行的过渡
+                self._transitions.pop(prop, None)
+                node.set_double_value(value)
+            else:
+                self._transitions[prop] = Transition(node, current, value, sim_time, tc, action)
+        values = {caption: node.get_double_value() for caption, node in event.notify}
+        if values:
+            self.notifications.append((sim_time, event.name, values))
+        if self.verbose:
+            detail = ", ".join(f"{k}={v:.3f}" for k, v in values.items())
+            print(f"(EVENT){sim_time:.2f}s 触发: {event.name}" + (f", {detail}" if detail else ""))
+
+    def pending(self):
+        # 尚未结束的事件数（待命、等待时间门限或延迟执行中）
+        return len(self._armed) + len(self._gated) + len(self._delayed)
+
+    def stats(self):
+        return {"events": len(self.events), "fired": self.fired, "armed": len(self._armed),
+                "gated": len(self._gated), "delayed": len(self._delayed), "transitions": len(self._transitions)}
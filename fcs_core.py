@@ -1,39 +1,193 @@
+import os
+
 import jsbsim
-import pandas as pd
-import queue
+from command_buffer import CommandBuffer
+from flight_recorder import FlightRecorder
+from output_scheduler import OutputScheduler
+from pacing import Pacer
+from profiler import StageProfiler
+
+# 控制与自动驾驶输入属性前缀，复用FDM前恢复为模型加载时的值
+INPUT_PREFIXES = ("ap/", "fcs/", "guidance/", "propulsion/", "gear/", "atmosphere/wind", "atmosphere/turb",
+                  "atmosphere/psiw", "atmosphere/gust")
+
+
+def capture_inputs(fdm, prefixes=INPUT_PREFIXES):
+    # 记录所有可写输入属性的当前值，返回 [(节点, 值), ...]
+    pm = fdm.get_property_manager()
+    saved = []
+    for entry in fdm.get_property_catalog():
+        name, mode = entry.rsplit(" ", 1)
+        if mode == "(RW)" and name.startswith(prefixes):
+            node = pm.get_node(name)
+            saved.append((node, node.get_double_value()))
+    return saved
+
+
+def restore_inputs(saved):
+    for node, value in saved:
+        node.set_double_value(value)
+
+
+class StateSnapshot:
+    # 默认状态量：(字段名, JSBSim属性名)，字段名与CSV列名一致
+    DEFAULT_FIELDS = (
+        ("altitude_ft", "position/h-agl-ft"),
+        ("lat_deg", "position/lat-geod-deg"),
+        ("lon_deg", "position/long-gc-deg"),
+        ("vc_kts", "velocities/vc-kts"),
+        ("roll", "attitude/phi-deg"),
+        ("pitch", "attitude/theta-deg"),
+        ("yaw", "attitude/psi-deg"),
+    )
+
+    def __init__(self, fdm, fields=None):
+        self.fields = tuple(fields) if fields else self.DEFAULT_FIELDS
+        # 第0列固定为仿真时间
+        self.names = ("time",) + tuple(name for name, _ in self.fields)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        # 构造时一次性解析属性节点，之后每步只调用节点的读取方法
+        pm = fdm.get_property_manager()
+        self._getters = []
+        for _, prop in self.fields:
+            node = pm.get_node(prop)
+            if node is None:
+                raise ValueError(f"JSBSim属性 {prop} 不存在")
+            self._getters.append(node.get_double_value)
+        self.values = [0.0] * len(self.names)
+
+    def update(self, sim_time):
+        # 每个仿真步读取一次，生成一条扁平记录
+        values = [sim_time]
+        values.extend([get() for get in self._getters])
+        self.values = values
+        return values
+
+    def __getitem__(self, name):
+        return self.values[self.index[name]]
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def as_dict(self):
+        return dict(zip(self.names, self.values))
+
 
 class AircraftSimulation:
-    def __init__(self, max_time=1000.0, init_xml="./lyj_init.xml", log_csv="c310_demo.csv", broadcaster=None):
-        self.fdm = jsbsim.FGFDMExec(root_dir=None)
-        self.fdm.load_model("c310")
-        self.fdm.load_ic(init_xml, True)
-        self.fdm.run_ic()
+    # UDP消息键名 -> 状态字段名
+    UDP_FIELDS = (
+        ("time", "time"),
+        ("longitude", "lon_deg"),
+        ("latitude", "lat_deg"),
+        ("altitude", "altitude_ft"),
+        ("speed", "vc_kts"),
+        ("roll", "roll"),
+        ("pitch", "pitch"),
+        ("yaw", "yaw"),
+    )
+    # 求均值时需要按圆周处理的角度字段及其取值下限
+    ANGLE_RANGES = {"roll": -180.0, "yaw": 0.0}
+
+    def __init__(self, max_time=1000.0, init_xml="./lyj_init.xml", log_csv="c310_demo.csv", broadcaster=None,
+                 state_fields=None, log_bin=None, log_chunk=1200, log_retention=12000, fdm=None, ic=None,
+                 command_journal=None, realtime_factor=None, max_catchup=0.25, profile_dump_rate=None,
+                 profile_csv=None, profile_udp=None, trim=None, state_bus=None,
+                 publisher=None, session_dir=None):
+        # fdm: 复用已加载模型的 FGFDMExec（批量运行时避免重复加载），ic: 覆盖初始条件 {"ic/vc-kts": 130, ...}
+        # trim: trim.TrimCache，按初始空速和高度配平后从平飞状态开始，不再经历初始瞬态
+        # publisher: publisher.TelemetryPublisher，每步发布状态，各订阅者按自己的字段、频率和编码接收
+        # state_bus: 共享内存名称（True 为默认名称），每步把状态写入 state_bus.StateBus，同机进程用 StateBusReader 读取
+        # session_dir: 记录可复现的会话（命令日志、逐步二进制记录、初始条件与配置文件哈希），用 session.replay 重放
+        self.init_xml = init_xml
+        self.ic = dict(ic or {})
+        self.session_dir = session_dir
+        if session_dir:
+            from session import GOLDEN_LOG, JOURNAL
+            os.makedirs(session_dir, exist_ok=True)
+            command_journal = command_journal or os.path.join(session_dir, JOURNAL)
+            log_bin = log_bin or os.path.join(session_dir, GOLDEN_LOG)
+        if fdm is None:
+            self.fdm = jsbsim.FGFDMExec(root_dir=None)
+            self.fdm.load_model("c310")
+            self.fdm.load_ic(init_xml, True)
+            self._apply_ic(ic)
+            self.fdm.run_ic()
+        else:
+            self.fdm = fdm
+            self.fdm.load_ic(init_xml, True)
+            self._apply_ic(ic)
+            # 重置所有模型（含自动驾驶积分器）和仿真时间后重新初始化
+            self.fdm.reset_to_initial_conditions(0)
+        # 与初始速度匹配的油门和保持高度，配平后使用配平解
+        self.throttle_trim = 0.954
+        self.altitude_setpoint = 550.0
+        self.trim_solution = None
+        if trim is not None:
+            self.trim_solution = trim.apply(self.fdm)
+            self.throttle_trim = self.trim_solution["throttle"]
+            self.altitude_setpoint = self.trim_solution["h_sl_ft"]
+        # 状态快照：日志、广播、着陆判断和用户脚本共用同一条记录
+        # state_fields 为额外关注的 (字段名, 属性名)，追加在默认字段之后
+        self.state_fields = tuple(state_fields or ())
+        self.state = StateSnapshot(self.fdm, StateSnapshot.DEFAULT_FIELDS + self.state_fields)
+        # 事件可通过 simulation/terminate 结束仿真；复用的 FDM 可能残留上次的值
+        self._terminate = self.fdm.get_property_manager().get_node("simulation/terminate", True)
+        self._terminate.set_double_value(0.0)
 
         self.sim_time = 0.0
         self.max_time = max_time
         self.log_csv = log_csv
         self.broadcaster = broadcaster
+        self.publisher = publisher
+        if publisher is not None:
+            publisher.set_schema(self.state.names, self.UDP_FIELDS)
         self.main_script = None
+        # 事件引擎（JSBSim runscript 的 <event>），用 load_events 加载或 self.events.add 添加
+        self.events = None
         self.print_enable = True
+        # 实时倍率：1.0 按真实时间推进，None 不限速（批量/无界面运行）
+        self.pacer = Pacer(realtime_factor, max_catchup)
 
-        self.log_data = []
-        # 命令队列，外部通过 add_command 添加
-        self.command_queue = queue.Queue()
+        # 各输出端独立频率：recorder / broadcaster / console / script，默认每步输出
+        # 例：sim.set_output_rate("broadcaster", 60.0); sim.set_output_rate("recorder", 50.0, mode="average")
+        self.outputs = OutputScheduler({self.state.index[name]: low for name, low in self.ANGLE_RANGES.items()})
+        self._udp_index = tuple((key, self.state.index[name]) for key, name in self.UDP_FIELDS)
+
+        # 飞行记录：列式环形缓冲，运行中按块追加写入 CSV / 二进制文件
+        self.recorder = FlightRecorder(self.state.names, csv_file=log_csv, bin_file=log_bin,
+                                       chunk_size=log_chunk, retention=log_retention)
+        # 命令缓冲，外部通过 add_command 添加；同一属性只保留最新值，command_journal 记录实际生效的命令
+        self.commands = CommandBuffer(self.fdm, journal_file=command_journal)
+        self.step = 0
+        # 分阶段耗时统计，sim.stats() 查看；可按 profile_dump_rate 周期写入 profile_csv 或发送到 profile_udp
+        self.profiler = StageProfiler(dump_rate=profile_dump_rate, dump_csv=profile_csv, dump_udp=profile_udp)
+        self.profiler.gauges["command_pending"] = self.commands.pending
+        self.state_bus = None
+        if state_bus:
+            from state_bus import DEFAULT_NAME, StateBus
+            self.state_bus = StateBus(self.state.names, DEFAULT_NAME if state_bus is True else state_bus)
+            self.state_bus.publish(self.state.update(self.sim_time))
+        if broadcaster is not None and hasattr(broadcaster, "queue"):
+            self.profiler.gauges["sender_queue"] = lambda: len(broadcaster.queue)
+
+    def _apply_ic(self, ic):
+        for name, value in (ic or {}).items():
+            self.fdm[name] = value
 
     # 初始化任务
     def initial_work1(self):
         # 动力相关
         self.fdm['fcs/mixture-cmd-norm[0]'] = 1.0
         self.fdm['fcs/mixture-cmd-norm[1]'] = 1.0
-        self.fdm['fcs/advance-mocmd-norm[0]'] = 1.0
+        self.fdm['fcs/advance-cmd-norm[0]'] = 1.0
         self.fdm['fcs/advance-cmd-norm[1]'] = 1.0
         self.fdm['propulsion/magneto_cmd'] = 3
         self.fdm['propulsion/starter_cmd'] = 1
 
-        self.fdm['fcs/throttle-cmd-norm[0]'] = 0.954
-        self.fdm['fcs/throttle-cmd-norm[1]'] = 0.954
+        self.fdm['fcs/throttle-cmd-norm[0]'] = self.throttle_trim
+        self.fdm['fcs/throttle-cmd-norm[1]'] = self.throttle_trim
         # 高度保持
-        self.fdm['ap/altitude_setpoint'] = 550.0
+        self.fdm['ap/altitude_setpoint'] = self.altitude_setpoint
         self.fdm['ap/altitude_hold'] = 1
         # 航向保持
         self.fdm['ap/heading_setpoint'] = 0
@@ -47,22 +201,66 @@ class AircraftSimulation:
     def initial_work2(self):
         pass
 
-    def add_command(self, attr_name, value):
-        # 在外部线程调用，添加控制命令到队列
-        def cmd():
-            self.fdm[attr_name] = value
-            print(f"[Command executed] {attr_name} = {value}")
-        self.command_queue.put((cmd, (), {}))
+    def stats(self):
+        # 运行统计快照：各阶段耗时、步频、队列深度、实时调度与命令延迟
+        out = {"profile": self.profiler.snapshot(), "pacing": self.pacer.stats(self.sim_time),
+               "commands": self.commands.stats()}
+        if self.broadcaster is not None and hasattr(self.broadcaster, "stats"):
+            out["broadcaster"] = self.broadcaster.stats()
+        if self.publisher is not None:
+            out["publisher"] = self.publisher.stats()
+        return out
+
+    def load_events(self, path=None):
+        # 加载 runscript 中的事件，可多次调用叠加；path 为空时只创建引擎，之后用 self.events.add 添加
+        from events import EventEngine
+        if self.events is None:
+            self.events = EventEngine(self.fdm, verbose=self.print_enable)
+        if path:
+            self.events.load(path)
+        return self.events
+
+    def checkpoint(self, path=None, meta=None):
+        # 保存当前状态，path 不为空时同时写入文件；分叉多个分支见 checkpoint.fork_branches
+        from checkpoint import Checkpoint
+        cp = Checkpoint.capture(self, meta)
+        if path:
+            cp.save(path)
+        return cp
+
+    def restore(self, cp):
+        # cp 为 Checkpoint 或检查点文件路径，恢复后用 run_simulation(initial_work=None) 继续
+        from checkpoint import Checkpoint
+        if isinstance(cp, str):
+            cp = Checkpoint.load(cp)
+        return cp.restore(self)
+
+    def set_realtime_factor(self, realtime_factor):
+        # 运行中可调整，None 表示不限速
+        self.pacer.set_factor(realtime_factor, self.sim_time)
+
+    def set_output_rate(self, sink, rate=None, mode="decimate"):
+        # rate 单位 Hz，None 表示每个仿真步都输出
+        self.outputs.configure(sink, rate, mode)
+
+    def add_command(self, attr_name, value, at=None):
+        # 在外部线程调用，at 为生效的仿真时间，None 表示下一步生效
+        self.commands.set(attr_name, value, at)
+
+    def add_commands(self, updates, at=None):
+        # 多个属性在同一仿真步原子生效，如 {"fcs/throttle-cmd-norm[0]": 0.8, "fcs/throttle-cmd-norm[1]": 0.8}
+        self.commands.set_many(updates, at)
 
     def process_commands(self):
-        # 每个时间步执行队列中的所有命令
-        while not self.command_queue.empty():
-            func, args, kwargs = self.command_queue.get()
-            func(*args, **kwargs)
+        # 每个时间步写入到期的命令
+        self.commands.apply(self.sim_time, self.step)
 
 
     def check_terminate(self):
-        h_agl = self.fdm["position/h-agl-ft"]
+        # 事件或外部命令也可能设置 simulation/terminate
+        if self._terminate.get_double_value():
+            return True
+        h_agl = self.state["altitude_ft"]
         if h_agl < 5.0:
             self.fdm["simulation/terminate"] = 1
             return True
@@ -70,91 +268,116 @@ class AircraftSimulation:
 
 
     def log_state(self):
-        self.log_data.append({
-            "time": self.sim_time,
-            "altitude_ft": self.fdm['position/h-agl-ft'],
-            "lat_deg": self.fdm['position/lat-geod-deg'],
-            "lon_deg": self.fdm['position/long-gc-deg'],
-            "vc_kts": self.fdm['velocities/vc-kts'],
-            "roll": self.fdm['attitude/phi-deg'],
-            "pitch": self.fdm['attitude/theta-deg'],
-            "yaw": self.fdm['attitude/psi-deg'],
-        })
+        values = self.outputs["recorder"].push(self.state.values)
+        if values is not None:
+            self.recorder.append(values)
 
     def visualize_sync(self):
+        # 多订阅者发布，频率由各订阅组控制
+        if self.publisher is not None:
+            self.publisher.publish(self.state.values)
         # UE可视化
         if self.broadcaster:
-            msg = {
-                'time': self.sim_time,
-                'longitude': self.fdm['position/long-gc-deg'],
-                'latitude': self.fdm['position/lat-geod-deg'],
-                'altitude': self.fdm['position/h-agl-ft'],
-                'speed': self.fdm['velocities/vc-kts'],
-                'roll': self.fdm['attitude/phi-deg'],
-                'pitch': self.fdm['attitude/theta-deg'],
-                'yaw': self.fdm['attitude/psi-deg']
-            }
-            self.broadcaster.send_udp(msg)
-        # 打印状态
-        msg = f"(JSBSIM)Time:{self.sim_time:.2f}"
-        msg += f", Speed:{self.fdm['velocities/vc-kts']:.1f}"
-        msg += f", Altitude:{self.fdm['position/h-agl-ft']:.1f}"
-        msg += f", Lat:{self.fdm['position/lat-geod-deg']:.4f}"
-        msg += f", Lon:{self.fdm['position/long-gc-deg']:.4f}"
-        msg += f", Pitch:{self.fdm['attitude/theta-deg']:.1f}"
-        msg += f", Roll:{self.fdm['attitude/phi-deg']:.1f}"
-        msg += f", Yaw:{self.fdm['attitude/psi-deg']:.1f}"
+            values = self.outputs["broadcaster"].push(self.state.values)
+            if values is not None:
+                msg = {key: values[i] for key, i in self._udp_index}
+                self.broadcaster.send_udp(msg)
+        # 打印状态，关闭打印时不构造状态字符串
         if self.print_enable:
-            print(msg)
+            values = self.outputs["console"].push(self.state.values)
+            if values is not None:
+                idx = self.state.index
+                msg = f"(JSBSIM)Time:{values[0]:.2f}"
+                msg += f", Speed:{values[idx['vc_kts']]:.1f}"
+                msg += f", Altitude:{values[idx['altitude_ft']]:.1f}"
+                msg += f", Lat:{values[idx['lat_deg']]:.4f}"
+                msg += f", Lon:{values[idx['lon_deg']]:.4f}"
+                msg += f", Pitch:{values[idx['pitch']]:.1f}"
+                msg += f", Roll:{values[idx['roll']]:.1f}"
+                msg += f", Yaw:{values[idx['yaw']]:.1f}"
+                print(msg)
 
     # 仿真循环
     def run_simulation(self, initial_work="initial_work1"):
         # 初始化
+        self.initial_work = initial_work
         if initial_work == "initial_work1":
             self.initial_work1()
-        while self.sim_time < self.max_time:
-            self.fdm.run()
-            self.sim_time = self.fdm.get_sim_time()
-            # 执行外部发来的命令
-            self.process_commands()
-
-            # 在这里运行脚本控制逻辑
-            if self.main_script:
-                self.main_script(self)
-
-            # 着陆判断
-            if self.check_terminate():
-                break
-            # 可视化同步
-            self.visualize_sync()
-
-            self.log_state()
-
-        # 保存 CSV
-        df = pd.DataFrame(self.log_data)
-        df.to_csv(self.log_csv, index=False)
-        print(f"Simulation finished. Data saved to {self.log_csv}")
+        self.pacer.start(self.sim_time)
+        prof = self.profiler
+        try:
+            while self.sim_time < self.max_time:
+                prof.begin()
+                self.fdm.run()
+                self.step += 1
+                self.sim_time = self.fdm.get_sim_time()
+                # 读取本步状态快照
+                self.state.update(self.sim_time)
+                if self.state_bus is not None:
+                    self.state_bus.publish(self.state.values)
+                prof.mark(0)
+                # 按实时倍率等待，之后再处理命令以减小控制延迟
+                self.pacer.wait(self.sim_time)
+                prof.mark(1)
+                # 执行外部发来的命令
+                self.process_commands()
+                prof.mark(2)
+
+                # 在这里运行脚本控制逻辑：事件只判断待命的条件，main_script 按 script 输出频率调用
+                if self.events is not None:
+                    self.events.update(self.sim_time)
+                if self.main_script and self.outputs["script"].ready(self.sim_time):
+                    self.main_script(self)
+                prof.mark(3)
+
+                # 着陆判断：终止的这一步（如接地）也写入记录再退出
+                if self.check_terminate():
+                    self.log_state()
+                    break
+                prof.mark(4)
+                # 可视化同步
+                self.visualize_sync()
+                prof.mark(5)
+
+                self.log_state()
+                prof.mark(6)
+                prof.end()
+        finally:
+            # 异常退出时也把已记录的数据落盘
+            self.recorder.close()
+            self.commands.close()
+            self.profiler.close()
+            if self.state_bus is not None:
+                self.state_bus.close()
+            if self.session_dir:
+                from session import write_manifest
+                write_manifest(self)
+        if self.print_enable:
+            print(self.profiler.report())
+        if self.pacer.enabled:
+            print(f"Pacing stats: {self.pacer.stats(self.sim_time)}")
+        if self.log_csv:
+            print(f"Simulation finished. Data saved to {self.log_csv}")
+        else:
+            print("Simulation finished.")
         if self.broadcaster:
             self.broadcaster.stop()
+        if self.publisher is not None:
+            self.publisher.stop()
 
 
 if __name__ == "__main__":
     from flight_visualizer import PlotVisualizer, SimDataSender, UEVisualizer
     bro = SimDataSender()
-    sim = AircraftSimulation(max_time=100.0, broadcaster=bro)
-
-    def main_script(this):
-        # 在这里预设脚本控制逻辑
-        # 例如：30秒后改变速度
-        # 例如：60秒后改变高度
-        if this.sim_time > 30.0:
-            this.fdm['ap/airspeed_setpoint'] = 150.0
-            this.fdm['ap/airspeed_hold'] = 1
-        if this.sim_time > 60.0:
-            this.fdm['ap/altitude_setpoint'] = 200.0
-            this.fdm['ap/altitude_hold'] = 1
-
-    sim.main_script = main_script
+    sim = AircraftSimulation(max_time=100.0, broadcaster=bro, realtime_factor=1.0)
+
+    # 预设的条件事件只在条件成立时执行一次，也可用 sim.load_events("lyj_cruise.xml") 加载 runscript
+    events = sim.load_events()
+    # 例如：30秒后改变速度
+    events.add("改变速度", "simulation/sim-time-sec gt 30", {"ap/airspeed_setpoint": 150.0, "ap/airspeed_hold": 1})
+    # 例如：60秒后改变高度
+    events.add("改变高度", "simulation/sim-time-sec gt 60", {"ap/altitude_setpoint": 200.0, "ap/altitude_hold": 1})
+    # 需要每步执行的逻辑仍可通过 main_script 实现，状态可通过 this.state['字段名'] 读取
     sim.run_simulation()
 
     # 仿真结束后执行可视化
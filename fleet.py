@@ -0,0 +1,359 @@
+import math
+import multiprocessing as mp
+import os
+import threading
+import traceback
+from multiprocessing import shared_memory
+
+import jsbsim
+import numpy as np
+
+from fcs_core import AircraftSimulation, StateSnapshot
+from output_scheduler import OutputScheduler
+from pacing import Pacer
+from profiler import StageProfiler
+
+# 多机仿真：N 架 c310 在同一个调度下逐步同步推进（lockstep）
+# 每步把各机状态读入 N x 字段 的状态数组，按广播频率发送一个多机数据报（SimDataSender.send_fleet），
+# 由 flight_visualizer.FleetVisualizer 分发到 N 架 AirSim 飞机；限速、广播和打印对整个机群只做一次
+# workers > 0 时飞机分配到多个工作进程中推进，状态数组放在共享内存中，每步用栅栏同步
+
+# 飞机描述中有特殊含义的键，其余带 "/" 的键与批量场景相同：
+#   ic/...      初始条件
+#   其他属性     在初始化任务之后设置
+#   offset_north_ft / offset_east_ft   相对初始条件文件位置的偏移，用于编队
+RESERVED = ("name", "initial_work", "offset_north_ft", "offset_east_ft")
+# 每架飞机的状态列，与 StateSnapshot 默认字段一致，最后一列为是否已结束
+STATE_NAMES = tuple(name for name, _ in StateSnapshot.DEFAULT_FIELDS)
+FLEET_NAMES = ("time",) + STATE_NAMES + ("terminated",)
+FLEET_STAGES = ("fleet", "pacing", "script", "visualize", "console")
+EARTH_RADIUS_FT = 20925646.3
+
+
+def formation(n, spacing_ft=300.0, rows=None, **props):
+    # 横队编队：每行 rows 架（默认一行），行间沿北向后错开 spacing_ft；props 为所有飞机共同的属性
+    rows = rows or n
+    return [dict(props, name=f"c310_{i}", offset_east_ft=(i % rows - (rows - 1) / 2.0) * spacing_ft,
+                 offset_north_ft=-(i // rows) * spacing_ft)
+            for i in range(n)]
+
+
+def _build_member(spec, init_xml, max_time, log_dir, trim):
+    fdm = jsbsim.FGFDMExec(root_dir=None)
+    fdm.set_debug_level(0)
+    fdm.load_model("c310")
+    fdm.load_ic(init_xml, True)
+    ic = {k: v for k, v in spec.items() if k.startswith("ic/")}
+    north = float(spec.get("offset_north_ft") or 0.0)
+    east = float(spec.get("offset_east_ft") or 0.0)
+    if north or east:
+        lat = fdm["ic/lat-geod-rad"]
+        ic.setdefault("ic/lat-geod-rad", lat + north / EARTH_RADIUS_FT)
+        ic.setdefault("ic/long-gc-rad", fdm["ic/long-gc-rad"] + east / (EARTH_RADIUS_FT * math.cos(lat)))
+    log_csv = os.path.join(log_dir, f"{spec['name']}.csv") if log_dir else None
+    sim = AircraftSimulation(max_time=max_time, init_xml=init_xml, log_csv=log_csv, fdm=fdm, ic=ic, trim=trim)
+    sim.print_enable = False
+    initial_work = spec.get("initial_work") or "initial_work1"
+    getattr(sim, initial_work)()
+    for name, value in spec.items():
+        if "/" in name and not name.startswith("ic/"):
+            sim.fdm[name] = value
+    return sim
+
+
+def _build_members(specs, init_xml, max_time, log_dir, trim_cache):
+    trim = None
+    if trim_cache:
+        from trim import TrimCache
+        trim = TrimCache(trim_cache, init_xml)
+    return [_build_member(spec, init_xml, max_time, log_dir, trim) for spec in specs]
+
+
+def _advance(sim):
+    # 单架飞机推进一步，处理顺序与 AircraftSimulation.run_simulation 一致（限速、广播、打印由机群统一处理）
+    # 返回是否结束
+    sim.fdm.run()
+    sim.step += 1
+    sim.sim_time = sim.fdm.get_sim_time()
+    values = sim.state.update(sim.sim_time)
+    sim.process_commands()
+    if sim.events is not None:
+        sim.events.update(sim.sim_time)
+    if sim.main_script and sim.outputs["script"].ready(sim.sim_time):
+        sim.main_script(sim)
+    if sim.check_terminate():
+        # 终止的这一步（如接地）也写入记录
+        sim.log_state()
+        return True
+    sim.log_state()
+    return values[0] >= sim.max_time
+
+
+def _tick(members, rows, done):
+    # members: [(行号, sim)]；已结束的飞机保持最后的状态
+    for i, sim in members:
+        if done[i]:
+            continue
+        if _advance(sim):
+            done[i] = 1.0
+        rows[i, :-1] = sim.state.values
+
+
+def _close(sims):
+    for sim in sims:
+        sim.recorder.close()
+        sim.commands.close()
+
+
+def _worker_main(wid, indices, specs, init_xml, max_time, log_dir, trim_cache, shm_name, shape, barrier, stop,
+                 commands, sent, errors):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    sims = []
+    try:
+        table = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        sims = _build_members(specs, init_xml, max_time, log_dir, trim_cache)
+        members = list(zip(indices, sims))
+        local = dict(members)
+        for i, sim in members:
+            table[i, :-1] = sim.state.update(sim.sim_time)
+        done = table[:, -1]
+        received = 0
+        barrier.wait()
+        while True:
+            # 等待主进程开始下一步
+            barrier.wait()
+            if stop.is_set():
+                break
+            # 按主进程的发送计数阻塞读取，保证本步之前发出的命令都在本步生效，与单进程结果一致
+            while received < sent[wid]:
+                i, updates, at = commands.get()
+                local[i].add_commands(updates, at)
+                received += 1
+            _tick(members, table, done)
+            barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    except Exception:
+        errors.put((wid, traceback.format_exc(limit=5)))
+        barrier.abort()
+    finally:
+        _close(sims)
+        shm.close()
+
+
+class FleetSimulation:
+    # vehicles: 飞机数量或飞机描述字典列表（见 RESERVED 和 formation）
+    # broadcaster: SimDataSender，按 set_output_rate("broadcaster", Hz) 的频率发送多机数据报
+    # workers: 0 在本进程中推进；>0 时分配到多个工作进程（飞机数较多且有多核时使用）
+    # log_dir: 每架飞机的记录写入 log_dir/{name}.csv
+    def __init__(self, vehicles, max_time=1000.0, init_xml="./lyj_init.xml", broadcaster=None, workers=0,
+                 realtime_factor=1.0, max_catchup=0.25, log_dir=None, trim_cache=None):
+        if isinstance(vehicles, int):
+            vehicles = formation(vehicles)
+        self.specs = [dict(spec, name=str(spec.get("name", f"c310_{i}"))) for i, spec in enumerate(vehicles)]
+        if not self.specs:
+            raise ValueError("机群中至少需要一架飞机")
+        self.names = [spec["name"] for spec in self.specs]
+        self.max_time = max_time
+        self.init_xml = init_xml
+        self.broadcaster = broadcaster
+        self.workers = min(int(workers or 0), len(self.specs))
+        self.log_dir = log_dir
+        self.trim_cache = trim_cache
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+        self.sim_time = 0.0
+        self.step = 0
+        # 机群脚本 main_script(fleet)，可读取 fleet.states 并用 fleet.add_command 控制各机
+        self.main_script = None
+        self.print_enable = True
+        self.pacer = Pacer(realtime_factor, max_catchup)
+        self.outputs = OutputScheduler()
+        self.profiler = StageProfiler(FLEET_STAGES)
+        self._index = {name: i for i, name in enumerate(FLEET_NAMES)}
+        # 多机数据报的列：与 telemetry.VEHICLE_FIELDS 顺序一致
+        self._udp_cols = [self._index[name] for key, name in AircraftSimulation.UDP_FIELDS if key != "time"]
+        self._ids = list(range(len(self.specs)))
+
+        self.sims = []
+        self._shm = None
+        self._procs = []
+        self._commands = []
+        self._owner = []
+        if self.workers:
+            self._start_workers()
+        else:
+            self.table = np.zeros((len(self.specs), len(FLEET_NAMES)), dtype=np.float64)
+            self.sims = _build_members(self.specs, init_xml, max_time, log_dir, trim_cache)
+            self._members = list(enumerate(self.sims))
+            for i, sim in self._members:
+                self.table[i, :-1] = sim.state.update(sim.sim_time)
+        print(f"(FLEET)已加载 {len(self.specs)} 架飞机, 工作进程: {self.workers or '无'}")
+
+    @property
+    def states(self):
+        # N x 字段 的状态数组视图，列名见 FLEET_NAMES
+        return self.table
+
+    def column(self, name):
+        return self.table[:, self._index[name]]
+
+    def _start_workers(self):
+        shape = (len(self.specs), len(FLEET_NAMES))
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        self.table = np.ndarray(shape, dtype=np.float64, buffer=self._shm.buf)
+        self.table[:] = 0.0
+        ctx = mp.get_context()
+        self._barrier = ctx.Barrier(self.workers + 1)
+        self._stop = ctx.Event()
+        self._errors = ctx.Queue()
+        # 各工作进程已发送的命令数
+        self._sent = ctx.Array("q", self.workers, lock=False)
+        # 飞机按顺序均分到各工作进程
+        groups = np.array_split(np.arange(len(self.specs)), self.workers)
+        self._owner = [0] * len(self.specs)
+        for wid, group in enumerate(groups):
+            indices = group.tolist()
+            for i in indices:
+                self._owner[i] = wid
+            commands = ctx.Queue()
+            self._commands.append(commands)
+            proc = ctx.Process(target=_worker_main, daemon=True,
+                               args=(wid, indices, [self.specs[i] for i in indices], self.init_xml, self.max_time,
+                                     self.log_dir, self.trim_cache, self._shm.name, shape, self._barrier,
+                                     self._stop, commands, self._sent, self._errors))
+            proc.start()
+            self._procs.append(proc)
+        self._sync()
+
+    def _sync(self):
+        try:
+            self._barrier.wait()
+        except threading.BrokenBarrierError:
+            detail = "; ".join(f"工作进程{wid}: {err.strip().splitlines()[-1]}"
+                               for wid, err in _drain(self._errors)) or "工作进程异常退出"
+            self._shutdown()
+            raise RuntimeError(f"多机仿真中断: {detail}")
+
+    def _shutdown(self):
+        if self._procs:
+            self._stop.set()
+            if not self._barrier.broken:
+                try:
+                    self._barrier.wait(5.0)
+                except threading.BrokenBarrierError:
+                    pass
+            for proc in self._procs:
+                proc.join(5.0)
+                if proc.is_alive():
+                    proc.terminate()
+            self._procs = []
+        if self._shm is not None:
+            # 结束后保留一份状态拷贝
+            self.table = np.array(self.table)
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def add_command(self, vehicle, attr_name, value, at=None):
+        self.add_commands(vehicle, {attr_name: value}, at)
+
+    def add_commands(self, vehicle, updates, at=None):
+        # vehicle 为编号或名称；在下一步（或 at 时刻）生效
+        i = vehicle if isinstance(vehicle, int) else self.names.index(vehicle)
+        if self.workers:
+            wid = self._owner[i]
+            self._commands[wid].put((i, dict(updates), at))
+            self._sent[wid] += 1
+        else:
+            self.sims[i].add_commands(updates, at)
+
+    def set_output_rate(self, sink, rate=None, mode="decimate"):
+        self.outputs.configure(sink, rate, mode)
+
+    def set_realtime_factor(self, realtime_factor):
+        self.pacer.set_factor(realtime_factor, self.sim_time)
+
+    def active(self):
+        return int(len(self.specs) - self.column("terminated").sum())
+
+    def _step(self):
+        if self.workers:
+            # 第一次同步开始本步，第二次同步等待所有工作进程完成
+            self._sync()
+            self._sync()
+        else:
+            _tick(self._members, self.table, self.table[:, -1])
+
+    def run_simulation(self):
+        self.pacer.start(self.sim_time)
+        prof = self.profiler
+        time_col = self.column("time")
+        try:
+            while self.sim_time < self.max_time and self.active():
+                prof.begin()
+                self._step()
+                self.step += 1
+                self.sim_time = float(time_col.max())
+                prof.mark(0)
+                self.pacer.wait(self.sim_time)
+                prof.mark(1)
+                if self.main_script and self.outputs["script"].ready(self.sim_time):
+                    self.main_script(self)
+                prof.mark(2)
+                if self.broadcaster and self.outputs["broadcaster"].ready(self.sim_time):
+                    # 高级索引生成连续的 N x 7 拷贝，直接编码
+                    self.broadcaster.send_fleet(self.sim_time, self._ids, self.table[:, self._udp_cols])
+                prof.mark(3)
+                if self.print_enable and self.outputs["console"].ready(self.sim_time):
+                    print(f"(FLEET)Time:{self.sim_time:.2f}, 运行中:{self.active()}/{len(self.specs)}"
+                          f", Speed:{self.column('vc_kts').mean():.1f}"
+                          f", Altitude:{self.column('altitude_ft').min():.1f}~{self.column('altitude_ft').max():.1f}")
+                prof.mark(4)
+                prof.end()
+        finally:
+            self._shutdown()
+            _close(self.sims)
+        if self.print_enable:
+            print(self.profiler.report())
+        if self.pacer.enabled:
+            print(f"Pacing stats: {self.pacer.stats(self.sim_time)}")
+        print(f"多机仿真结束: {len(self.specs)} 架飞机, {self.step} 步")
+        if self.broadcaster:
+            self.broadcaster.stop()
+
+    def results(self):
+        # 每架飞机的最终状态
+        return [dict(zip(FLEET_NAMES, row), name=name) for name, row in zip(self.names, self.table.tolist())]
+
+    def stats(self):
+        return {"profile": self.profiler.snapshot(), "pacing": self.pacer.stats(self.sim_time),
+                "vehicles": len(self.specs), "active": self.active(), "workers": self.workers}
+
+
+def _drain(queue):
+    # 读取工作进程上报的异常
+    while True:
+        try:
+            yield queue.get(timeout=0.5)
+        except Exception:
+            return
+
+
+if __name__ == "__main__":
+    from sim_sender import SimDataSender
+    # 示例：10 架飞机 5x2 编队，30 秒后后排加速
+    fleet = FleetSimulation(formation(10, spacing_ft=300.0, rows=5), max_time=120.0,
+                            broadcaster=SimDataSender(async_mode=True), realtime_factor=1.0)
+    fleet.set_output_rate("broadcaster", 60.0)
+    fleet.set_output_rate("console", 1.0)
+    fleet.set_output_rate("script", 1.0)
+
+    def main_script(this):
+        if 30.0 <= this.sim_time < 31.0:
+            for i in range(5, 10):
+                this.add_commands(i, {"ap/airspeed_setpoint": 230.0, "ap/airspeed_hold": 1})
+
+    fleet.main_script = main_script
+    fleet.run_simulation()
@@ -0,0 +1,135 @@
+import struct
+import numpy as np
+
+# 二进制记录文件格式：
+# 文件头 = 魔数(4字节) + 版本(uint16) + 列数(uint16) + 列名长度(uint32) + 列名(utf-8, 逗号分隔)
+# 数据区 = 按行连续存放的 little-endian float64
+BIN_MAGIC = b"FREC"
+BIN_VERSION = 1
+_BIN_HEADER = struct.Struct("<4sHHI")
+
+
+class FlightRecorder:
+    def __init__(self, names, csv_file=None, bin_file=None, chunk_size=1200, retention=12000):
+        self.names = tuple(names)
+        self.csv_file = csv_file
+        self.bin_file = bin_file
+        self.chunk_size = int(chunk_size)
+        # 内存中只保留最近 retention 行，必须能容纳一个待写入的数据块
+        self.retention = max(int(retention), self.chunk_size)
+        self.buffer = np.zeros((self.retention, len(self.names)), dtype=np.float64)
+        # 累计写入行数 / 已落盘行数
+        self.count = 0
+        self.flushed = 0
+
+        self._csv = None
+        self._bin = None
+        self._fmt = ",".join(["%.17g"] * len(self.names))
+
+    def __len__(self):
+        return min(self.count, self.retention)
+
+    def append(self, values):
+        self.buffer[self.count % self.retention] = values
+        self.count += 1
+        if self.count - self.flushed >= self.chunk_size:
+            self.flush()
+
+    def _open(self):
+        # 首次落盘时创建文件并写入表头
+        if self.csv_file and self._csv is None:
+            self._csv = open(self.csv_file, "w", newline="")
+            self._csv.write(",".join(self.names) + "\n")
+        if self.bin_file and self._bin is None:
+            self._bin = open(self.bin_file, "wb")
+            header = ",".join(self.names).encode("utf-8")
+            self._bin.write(_BIN_HEADER.pack(BIN_MAGIC, BIN_VERSION, len(self.names), len(header)))
+            self._bin.write(header)
+
+    def _pending(self):
+        # 未落盘的行，按时间顺序返回（环形缓冲可能需要拼接两段）
+        start = self.flushed % self.retention
+        n = self.count - self.flushed
+        if start + n <= self.retention:
+            return self.buffer[start:start + n]
+        return np.concatenate((self.buffer[start:], self.buffer[:start + n - self.retention]))
+
+    def flush(self):
+        if self.count == self.flushed:
+            return
+        rows = self._pending()
+        self._open()
+        if self._csv:
+            np.savetxt(self._csv, rows, fmt=self._fmt)
+            self._csv.flush()
+        if self._bin:
+            self._bin.write(rows.astype("<f8", copy=False).tobytes())
+            self._bin.flush()
+        self.flushed = self.count
+
+    def close(self):
+        self.flush()
+        for f in (self._csv, self._bin):
+            if f:
+                f.close()
+        self._csv = None
+        self._bin = None
+
+    def recent(self, n=None):
+        # 返回内存中保留的最近 n 行（按时间顺序）
+        size = len(self)
+        n = size if n is None else min(int(n), size)
+        end = self.count % self.retention
+        start = end - n
+        if start >= 0:
+            return self.buffer[start:end].copy()
+        return np.concatenate((self.buffer[start:], self.buffer[:end]))
+
+    def column(self, name, n=None):
+        return self.recent(n)[:, self.names.index(name)]
+
+    def to_dataframe(self, n=None):
+        import pandas as pd
+        return pd.DataFrame(self.recent(n), columns=list(self.names))
+
+
+def _read_header(f, bin_file):
+    magic, version, ncols, name_len = _BIN_HEADER.unpack(f.read(_BIN_HEADER.size))
+    if magic != BIN_MAGIC:
+        raise ValueError(f"{bin_file} 不是飞行记录文件")
+    if version != BIN_VERSION:
+        raise ValueError(f"不支持的记录文件版本: {version}")
+    names = tuple(f.read(name_len).decode("utf-8").split(","))
+    return names, _BIN_HEADER.size + name_len
+
+
+def read_binary(bin_file):
+    # 读取二进制记录文件，返回 (列名, 二维数组)
+    with open(bin_file, "rb") as f:
+        names, _ = _read_header(f, bin_file)
+        data = np.fromfile(f, dtype="<f8")
+    ncols = len(names)
+    # 写入中途崩溃时可能留下不完整的最后一行，直接丢弃
+    rows = data.size // ncols
+    return names, data[:rows * ncols].reshape(rows, ncols)
+
+
+def map_binary(bin_file):
+    # 以内存映射方式打开二进制记录，按需从磁盘读取，适合长时间记录的回放
+    with open(bin_file, "rb") as f:
+        names, offset = _read_header(f, bin_file)
+        f.seek(0, 2)
+        size = f.tell()
+    rows = (size - offset) // (8 * len(names))
+    if rows == 0:
+        return names, np.zeros((0, len(names)))
+    return names, np.memmap(bin_file, dtype="<f8", mode="r", offset=offset, shape=(rows, len(names)))
+
+
+def load_recording(path):
+    # 按扩展名读取 CSV 或二进制记录，统一返回 DataFrame
+    import pandas as pd
+    if str(path).endswith(".csv"):
+        return pd.read_csv(path)
+    names, data = read_binary(path)
+    return pd.DataFrame(data, columns=list(names))
@@ -1,54 +1,43 @@
 import errno
 import threading
 from abc import ABC, abstractmethod
-import airsim
-from pyproj import Transformer
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from collections import deque
 import time
-import math
 from collections import deque
 import socket
-import json
-
-class SimDataSender:
-    def __init__(self, host='127.0.0.1', port=5555):
-        self.addr = (host, port)
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-    def stop(self):
-        self.sock.close()
-        print("已关闭UDP发送端")
-
-    def send_udp(self, msg):
-        data = (json.dumps(msg) + "\n").encode('utf-8')
-        try:
-            self.sock.sendto(data, self.addr)
-            time.sleep(0.0001)
-        except OSError as e:
-            # 服务端未启动时静默跳过
-            if e.errno in (errno.ECONNREFUSED, 10061, 10054, 111):
-                pass
-            else:
-                print(f"发送异常: {e}")
-
+import struct
+from geodesy import LocalFrame, euler_to_quaternion_point, interpolate_pose
+from pose_pipeline import PoseUpdater
+from replay import ReplayEngine, TrajectorySource
+from telemetry import FLEET_MAGIC, TelemetryDecoder
+# 兼容旧的导入方式：from flight_visualizer import SimDataSender
+from sim_sender import SimDataSender
+# airsim、pandas、matplotlib 只在用到对应功能时导入，仿真节点和批量进程无需安装/加载
 
 class VisualizerBase(ABC):
-    def __init__(self, host='0.0.0.0', port=5555, buffer_size=20):
+    # multicast_group: 从组播地址接收（publisher.TelemetryPublisher 发往该组播），同机多个接收端可共用端口
+    def __init__(self, host='0.0.0.0', port=5555, buffer_size=20, multicast_group=None):
         # 数据存储（队列）
         self.trajectory = deque(maxlen=buffer_size)
         self.lock = threading.Lock()
+        # 新数据到达时唤醒消费线程，避免空转
+        self.cond = threading.Condition(self.lock)
         self.wait_data = True
         self.offline_mode = False
 
         self.host = host
         self.port = port
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if multicast_group:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.sock.bind((self.host, self.port))
+        if multicast_group:
+            mreq = struct.pack("4s4s", socket.inet_aton(multicast_group), socket.inet_aton("0.0.0.0"))
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
 
         self.stop_event = threading.Event()
+        # 遥测解码器，统计丢包和乱序
+        self.decoder = TelemetryDecoder()
         self.recv_thread = threading.Thread(target=self.recv_data, daemon=True)
 
     def start(self, source="udp"):
@@ -66,6 +55,11 @@ class VisualizerBase(ABC):
                 self.recv_thread.join(1.0)
             self.sock.close()
             print("可视化服务已关闭，程序退出。")
+        finally:
+            self.close()
+
+    def close(self):
+        pass
 
     @abstractmethod
     def recv_data(self):
@@ -82,36 +76,60 @@ class VisualizerBase(ABC):
 
 
 class UEVisualizer(VisualizerBase):
-    def __init__(self, vehicle_name="drone_1", height_offset=-150, time_step=0.0001):
-        super().__init__()
+    # latest_only: 实时模式下积压多帧时只显示最新一帧
+    # render_fps: 实时模式下按固定帧率在相邻两次接收的位姿之间插值显示（滞后一帧），None 表示收到即显示
+    # pipelined: 位姿RPC在独立线程执行，接收与显示互不阻塞，并合并连续帧之间多余的暂停/恢复调用
+    def __init__(self, vehicle_name="drone_1", height_offset=-150, time_step=0.0001, latest_only=True,
+                 render_fps=None, pipelined=True, port=5555, multicast_group=None):
+        super().__init__(port=port, multicast_group=multicast_group)
         self.vehicle_name = vehicle_name
         self.height_offset = height_offset
         self.time_step = time_step
+        self.latest_only = latest_only
+        self.render_fps = render_fps
+        self.skipped = 0
 
+        import airsim
+        self._airsim = airsim
         self.client = airsim.VehicleClient()
         self.client.confirmConnection()
         print(f"已连接AirSim: {vehicle_name}")
+        self.pose_updater = PoseUpdater(self.client, self.make_pose, vehicle_name) if pipelined else None
 
         self.ref_point = {}
+        # 参考点对应的 NED 坐标系（缓存旋转矩阵）
+        self.frame = None
+        self.replay_engine = None
 
     def visualize(self):
+        if self.render_fps and not self.offline_mode:
+            return self._visualize_interpolated()
         print_flag = True
         has_visualized = 0
         while not self.stop_event.is_set():
-            with self.lock:
+            with self.cond:
                 # 队空判断
                 if not self.trajectory:
-                    if self.wait_data and print_flag:
-                        print("轨迹数据为空，等待数据...CTRL+C退出")
-                        print_flag = False
                     if self.offline_mode and not self.wait_data:
                         print("离线模式运行完毕，退出可视化线程")
                         self.stop_event.set()
+                        break
+                    if self.wait_data and print_flag:
+                        print("轨迹数据为空，等待数据...CTRL+C退出")
+                        print_flag = False
+                    # 等待新数据，超时后重新检查退出标志
+                    self.cond.wait(0.5)
                     continue
                 total = len(self.trajectory)
-                # 弹出一帧数据
-                point = self.trajectory.popleft()
-                remains = total - 1
+                if self.latest_only and not self.offline_mode and total > 1:
+                    # 只取最新一帧，丢弃过时的积压帧
+                    point = self.trajectory[-1]
+                    self.trajectory.clear()
+                    self.skipped += total - 1
+                else:
+                    # 弹出一帧数据
+                    point = self.trajectory.popleft()
+                remains = len(self.trajectory)
             n = point['ned_n']
             e = point['ned_e']
             d = point['ned_d']
@@ -120,104 +138,122 @@ class UEVisualizer(VisualizerBase):
             qy = point['qy']
             qz = point['qz']
 
-            self.client.simPause(True)
-            pose = airsim.Pose(
-                airsim.Vector3r(n, e, d + self.height_offset),
-                airsim.Quaternionr(qx, qy, qz, qw)
-            )
-            self.client.simSetVehiclePose(pose, ignore_collision=True, vehicle_name=self.vehicle_name)
+            self.set_pose(point)
+            if self.offline_mode and self.pose_updater:
+                # 离线数据需要逐帧显示：等待本帧发送完再取下一帧，否则只保留最新位姿的流水线会覆盖未发送的帧
+                self.pose_updater.flush()
             has_visualized += 1
             if self.offline_mode:
                 print(f"(UE)余:{remains}, N={n:.2f}, E={e:.2f}, D={d:.2f}, Q=({qw:.3f},{qx:.3f},{qy:.3f},{qz:.3f})")
             else:
                 print(f"(UE)成功:{has_visualized}, N={n:.2f}, E={e:.2f}, D={d:.2f}, Q=({qw:.3f},{qx:.3f},{qy:.3f},{qz:.3f})")
-            self.client.simPause(False)
             time.sleep(self.time_step)
             print_flag = True
 
+    def _visualize_interpolated(self):
+        period = 1.0 / self.render_fps
+        prev = latest = None
+        interval = period
+        has_visualized = 0
+        next_tick = time.perf_counter()
+        while not self.stop_event.is_set():
+            with self.cond:
+                # 最新位姿已显示完毕且没有新数据时阻塞等待
+                if not self.trajectory and (latest is None or latest is prev):
+                    self.cond.wait(0.5)
+                    next_tick = time.perf_counter()
+                    continue
+                if self.trajectory:
+                    newest = self.trajectory[-1]
+                    before = self.trajectory[-2] if len(self.trajectory) > 1 else latest
+                    self.skipped += max(0, len(self.trajectory) - 2)
+                    self.trajectory.clear()
+                    prev, latest = (before or newest), newest
+                    interval = max(latest['recv'] - prev['recv'], 1e-3) if prev is not latest else period
+            alpha = min((time.perf_counter() - latest['recv']) / interval, 1.0)
+            self.set_pose(interpolate_pose(prev, latest, alpha))
+            has_visualized += 1
+            if alpha >= 1.0:
+                # 已到达最新位姿，之后等待新数据
+                prev = latest
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            else:
+                next_tick = time.perf_counter()
+        print(f"(UE)插值显示结束, 已显示{has_visualized}帧, 跳过{self.skipped}帧")
+
+    def make_pose(self, point):
+        airsim = self._airsim
+        return airsim.Pose(
+            airsim.Vector3r(point['ned_n'], point['ned_e'], point['ned_d'] + self.height_offset),
+            airsim.Quaternionr(point['qx'], point['qy'], point['qz'], point['qw'])
+        )
+
+    def set_pose(self, point, vehicle_name=None):
+        # 流水线模式下只提交位姿，由工作线程执行RPC
+        if self.pose_updater:
+            self.pose_updater.submit(point, vehicle_name)
+            return
+        self.client.simPause(True)
+        self.client.simSetVehiclePose(self.make_pose(point), ignore_collision=True,
+                                      vehicle_name=vehicle_name or self.vehicle_name)
+        self.client.simPause(False)
+
+    def close(self):
+        if self.pose_updater:
+            self.pose_updater.flush()
+            self.pose_updater.stop()
+            print(f"(UE)位姿更新统计: {self.pose_updater.stats()}")
+
+    def replay(self, source, speed=1.0, fps=60.0, interpolate=True, chunk_rows=6000):
+        # 按记录时间回放 CSV / 二进制记录，speed 为倍速(0.25~50)
+        # 回放中可从其他线程调用 self.replay_engine 的 seek/pause/resume/set_speed
+        self.offline_mode = True
+        trajectory = TrajectorySource(source, chunk_rows=chunk_rows)
+        self.frame = trajectory.frame
+        self.replay_engine = ReplayEngine(trajectory, self.set_pose, speed=speed, fps=fps, interpolate=interpolate)
+        print(f"(UE)回放 {source}: {trajectory.start_time:.2f}s ~ {trajectory.end_time:.2f}s, 倍速{self.replay_engine.speed}")
+        try:
+            self.replay_engine.run()
+        except KeyboardInterrupt:
+            self.replay_engine.stop()
+        if self.pose_updater:
+            self.pose_updater.flush()
+        return self.replay_engine
+
     def recv_data(self):
         print(f"可视化服务器启动：({self.host}, {self.port})")
-        recv_num = 0
+        decoder = self.decoder
         while not self.stop_event.is_set():
             try:
-                # 默认客户端每次发送一行数据
-                data, addr = self.sock.recvfrom(1024)
-                msg = json.loads(data.decode('utf-8'))
-                parsed = {
-                    'longitude': msg.get('longitude', 0.0),
-                    'latitude': msg.get('latitude', 0.0),
-                    'altitude': msg.get('altitude', 0.0),
-                    'roll': msg.get('roll', 0.0),
-                    'pitch': msg.get('pitch', 0.0),
-                    'yaw': msg.get('yaw', 0.0)
-                }
-                self.process_data(**parsed)
-                recv_num += 1
-                print(f"(UE)已接收数据: {recv_num}, 来自: {addr}")
+                # 一个数据报可能包含多帧（二进制批量发送），也兼容旧版单帧JSON
+                data, addr = self.sock.recvfrom(65535)
+                for msg in decoder.decode(data):
+                    self.process_data(**msg)
+                print(f"(UE)已接收数据: {decoder.received}, 丢失: {decoder.lost}, 乱序: {decoder.reordered}, 重复: {decoder.duplicates}, 来自: {addr}")
             except Exception as e:
-                if e.errno in (errno.EBADF, 10038):
+                if getattr(e, 'errno', None) in (errno.EBADF, 10038):
                     break
                 print(f"recv_data 异常: {e}")
                 break
 
     @staticmethod
     def euler_to_quaternion(pitch, roll, yaw):
-        # 将角度从度转换为弧度
-        yaw_rad = math.radians(yaw)
-        pitch_rad = math.radians(pitch)
-        roll_rad = math.radians(roll)
-
-        # 计算每个角度一半的余弦和正弦值
-        cy = math.cos(yaw_rad * 0.5)
-        sy = math.sin(yaw_rad * 0.5)
-        cp = math.cos(pitch_rad * 0.5)
-        sp = math.sin(pitch_rad * 0.5)
-        cr = math.cos(roll_rad * 0.5)
-        sr = math.sin(roll_rad * 0.5)
-
-        # 根据 ZYX 旋转顺序计算四元数分量
-        w = cr * cp * cy + sr * sp * sy
-        x = sr * cp * cy - cr * sp * sy
-        y = cr * sp * cy + sr * cp * sy
-        z = cr * cp * sy - sr * sp * cy
-
-        return w, x, y, z
-
+        # 角度单位为度，返回 (w, x, y, z)
+        return euler_to_quaternion_point(pitch, roll, yaw)
 
     def ecef_to_ned(self, X, Y, Z):
-        # 支持单点或批量轨迹输入
-        X = np.atleast_1d(X).flatten()
-        Y = np.atleast_1d(Y).flatten()
-        Z = np.atleast_1d(Z).flatten()
-
-        dx = X - self.ref_point['x']
-        dy = Y - self.ref_point['y']
-        dz = Z - self.ref_point['z']
-
-        phi = np.radians(self.ref_point['lat'])
-        lam = np.radians(self.ref_point['lon'])
-
-        sin_phi, cos_phi = np.sin(phi), np.cos(phi)
-        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
-
-        # ECEF -> NED旋转矩阵
-        R = np.array([
-            [-sin_phi * cos_lam, -sin_phi * sin_lam,  cos_phi],
-            [        -sin_lam,           cos_lam,       0    ],
-            [-cos_phi * cos_lam, -cos_phi * sin_lam, -sin_phi]
-        ])
-        # shape (3, N)
-        ecef = np.stack((dx, dy, dz), axis=0)
-        ned = R @ ecef
-        if X.size == 1:
-            return ned[0].item(), ned[1].item(), ned[2].item()
-        else:
-            # 若输入为数组，返回3个1D numpy数组
-            return ned[0], ned[1], ned[2]
+        # 支持单点或批量轨迹输入，旋转矩阵由参考点坐标系缓存
+        if np.ndim(X) == 0:
+            return self.frame.point_ecef_to_ned(X, Y, Z)
+        # 若输入为数组，返回3个1D numpy数组
+        return self.frame.ecef_to_ned(X, Y, Z)
 
     def set_preference_point(self, longitude, latitude, altitude):
-        transformer = Transformer.from_crs("EPSG:4979", "EPSG:4978", always_xy=True)
-        x, y, z = transformer.transform(longitude, latitude, altitude * 0.3048)
+        self.frame = LocalFrame(longitude, latitude, altitude)
+        x, y, z = self.frame.origin
         self.ref_point['x'] = x
         self.ref_point['y'] = y
         self.ref_point['z'] = z
@@ -229,13 +265,10 @@ class UEVisualizer(VisualizerBase):
     def process_data(self, longitude, latitude, altitude, roll, pitch, yaw, *args, **kwargs):
         # longitude, latitude, roll, pitch, yaw 单位度
         # altitude 单位英尺
-        transformer = Transformer.from_crs("EPSG:4979", "EPSG:4978", always_xy=True)
-        x, y, z = transformer.transform(longitude, latitude, altitude * 0.3048)
-        if not self.ref_point:
+        if self.frame is None:
             self.set_preference_point(longitude, latitude, altitude)
             return
-        qw, qx, qy, qz = self.euler_to_quaternion(pitch, roll, yaw)
-        ned_n, ned_e, ned_d = self.ecef_to_ned(x, y, z) #返回的是单个点
+        ned_n, ned_e, ned_d, qw, qx, qy, qz = self.frame.convert_point(longitude, latitude, altitude, roll, pitch, yaw)
         point = {
             "ned_n": ned_n,
             "ned_e": ned_e,
@@ -243,62 +276,273 @@ class UEVisualizer(VisualizerBase):
             "qw": qw,
             "qx": qx,
             "qy": qy,
-            "qz": qz
+            "qz": qz,
+            "time": kwargs.get("time"),
+            "recv": time.perf_counter()
         }
-        with self.lock:
+        with self.cond:
             self.trajectory.append(point)
-        
+            self.cond.notify()
+
+    def process_batch(self, longitude, latitude, altitude, roll, pitch, yaw):
+        # 整段轨迹一次转换，返回 (n, e, d, qw, qx, qy, qz) 数组；未设置参考点时以首点为参考
+        if self.frame is None:
+            self.set_preference_point(float(longitude[0]), float(latitude[0]), float(altitude[0]))
+        return self.frame.convert(longitude, latitude, altitude, roll, pitch, yaw)
+
     def visualize_from_csv(self, csv_file, frequency=100):
+        import pandas as pd
         self.offline_mode = True
-        # 清空现有轨迹
-        self.trajectory = deque()
-        # 设置参考点为最后一个点
-        df = pd.read_csv(csv_file)
-        last_row = df.iloc[-1]
-        self.set_preference_point(
-            last_row['lon_deg'],
-            last_row['lat_deg'],
-            last_row['altitude_ft']
-        )
-
+        start = time.perf_counter()
         required = ['time', 'altitude_ft', 'lat_deg', 'lon_deg', 'vc_kts', 'roll', 'pitch', 'yaw']
+        # 只读取需要的列
+        df = pd.read_csv(csv_file, usecols=lambda c: c in required)
         for key in required:
             if key not in df.columns:
                 raise ValueError(f"CSV 缺少必要列: {key}")
-        df['time'] = pd.to_numeric(df['time'], errors='coerce')
-        df = df.dropna(subset=['time'])
-
-        last_time = None
-        time_interval = 1.0 / frequency
-        count = 0
-        for _, row in df.iterrows():
-            count += 1
-            time_val = row['time']
-            latitude = row['lat_deg']
-            longitude = row['lon_deg']
-            altitude = row['altitude_ft']
-            roll = row['roll']
-            pitch = row['pitch']
-            yaw = row['yaw']
-            if last_time is None or (time_val - last_time) >= time_interval:
-                last_time = time_val
-                self.process_data(longitude, latitude, altitude, roll, pitch, yaw)
-                print(f"(UE)已加载数据{count}/{len(df)}: time={time_val:.2f}, lat={latitude:.4f}, lon={longitude:.4f}, alt={altitude:.1f}")
+        t = pd.to_numeric(df['time'], errors='coerce').to_numpy(dtype=np.float64)
+        valid = ~np.isnan(t)
+        cols = {key: df[key].to_numpy(dtype=np.float64)[valid] for key in required[1:]}
+        t = t[valid]
+        total = len(t)
+        if total == 0:
+            raise ValueError(f"CSV 没有有效数据: {csv_file}")
+
+        # 按频率抽稀：每个 1/frequency 时间窗口保留第一行
+        bucket = np.floor((t - t[0]) * frequency + 1e-9)
+        keep = np.empty(total, dtype=bool)
+        keep[0] = True
+        keep[1:] = bucket[1:] != bucket[:-1]
+
+        # 设置参考点为最后一个点
+        self.set_preference_point(cols['lon_deg'][-1], cols['lat_deg'][-1], cols['altitude_ft'][-1])
+        n, e, d, qw, qx, qy, qz = self.frame.convert(
+            cols['lon_deg'][keep], cols['lat_deg'][keep], cols['altitude_ft'][keep],
+            cols['roll'][keep], cols['pitch'][keep], cols['yaw'][keep])
+        self.trajectory = FrameStore(np.column_stack((t[keep], n, e, d, qw, qx, qy, qz)))
+        print(f"(UE)已加载数据{len(self.trajectory)}/{total}帧, 用时{time.perf_counter() - start:.3f}s")
         # 后续没有数据添加，队列为空可退出线程
         self.wait_data = False
 
+
+class FleetVisualizer(UEVisualizer):
+    # 多机实时显示：接收 SimDataSender.send_fleet 的多机数据报，第 i 架飞机显示到 vehicle_names[i]
+    # 所有飞机共用一个参考点（首帧中第一架飞机的位置），保持编队的相对位置；每次只显示最新一帧
+    def __init__(self, vehicle_names, height_offset=-150, time_step=0.0001, pipelined=True):
+        super().__init__(vehicle_names[0], height_offset, time_step, latest_only=True, pipelined=pipelined)
+        self.vehicle_names = list(vehicle_names)
+        # 编号超出 vehicle_names 的飞机状态数
+        self.unknown = 0
+
+    def recv_data(self):
+        print(f"多机可视化服务器启动：({self.host}, {self.port}), 飞机数: {len(self.vehicle_names)}")
+        decoder = self.decoder
+        while not self.stop_event.is_set():
+            try:
+                data, addr = self.sock.recvfrom(65535)
+                if data[:2] == FLEET_MAGIC:
+                    fleet = decoder.decode_fleet(data)
+                    if fleet is not None:
+                        self.process_fleet(*fleet)
+                else:
+                    # 单机数据报按 0 号飞机显示
+                    for msg in decoder.decode(data):
+                        self.process_fleet(msg["time"], [(0, msg)])
+            except Exception as e:
+                if getattr(e, 'errno', None) in (errno.EBADF, 10038):
+                    break
+                print(f"recv_data 异常: {e}")
+                break
+
+    def process_fleet(self, sim_time, vehicles):
+        names, msgs = [], []
+        for vid, msg in vehicles:
+            if vid < len(self.vehicle_names):
+                names.append(self.vehicle_names[vid])
+                msgs.append(msg)
+            else:
+                self.unknown += 1
+        if not names:
+            return
+        if self.frame is None:
+            self.set_preference_point(msgs[0]["longitude"], msgs[0]["latitude"], msgs[0]["altitude"])
+        # 所有飞机一次批量转换
+        cols = {k: np.array([m[k] for m in msgs]) for k in ("longitude", "latitude", "altitude", "roll", "pitch", "yaw")}
+        n, e, d, qw, qx, qy, qz = (a.tolist() for a in self.frame.convert(
+            cols["longitude"], cols["latitude"], cols["altitude"], cols["roll"], cols["pitch"], cols["yaw"]))
+        now = time.perf_counter()
+        poses = {name: {"ned_n": n[i], "ned_e": e[i], "ned_d": d[i], "qw": qw[i], "qx": qx[i], "qy": qy[i],
+                        "qz": qz[i], "time": sim_time, "recv": now}
+                 for i, name in enumerate(names)}
+        with self.cond:
+            self.trajectory.append({"time": sim_time, "recv": now, "vehicles": poses})
+            self.cond.notify()
+
+    def visualize(self):
+        has_visualized = 0
+        while not self.stop_event.is_set():
+            with self.cond:
+                if not self.trajectory:
+                    self.cond.wait(0.5)
+                    continue
+                # 只取最新一帧
+                frame = self.trajectory[-1]
+                self.skipped += len(self.trajectory) - 1
+                self.trajectory.clear()
+            for name, point in frame["vehicles"].items():
+                self.set_pose(point, name)
+            has_visualized += 1
+            print(f"(UE)多机帧:{has_visualized}, Time={frame['time']:.2f}, 飞机数={len(frame['vehicles'])}, "
+                  f"跳过:{self.skipped}")
+            time.sleep(self.time_step)
+
+    def visualize_from_csv(self, csv_file, frequency=100):
+        raise ValueError("多机可视化只支持实时 UDP 数据")
+
+
+class FrameStore:
+    # 离线轨迹的数组存储，每行为 FIELDS 顺序的一帧，接口与 deque 的 popleft 用法一致
+    FIELDS = ("time", "ned_n", "ned_e", "ned_d", "qw", "qx", "qy", "qz")
+
+    def __init__(self, data):
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        self.pos = 0
+
+    def __len__(self):
+        return len(self.data) - self.pos
+
+    def popleft(self):
+        if self.pos >= len(self.data):
+            raise IndexError("pop from an empty FrameStore")
+        row = self.data[self.pos].tolist()
+        self.pos += 1
+        return dict(zip(self.FIELDS, row))
+
+def downsample_minmax(y, max_points):
+    # 每个区间保留最小值和最大值所在行，峰值不会被抽掉；返回按时间排序的行号
+    n = len(y)
+    buckets = max_points // 2
+    if buckets < 1 or n <= max_points:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.concatenate((y, np.full(size * buckets - n, y[-1]))).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    idx = np.concatenate((padded.argmin(axis=1) + offsets, padded.argmax(axis=1) + offsets, (0, n - 1)))
+    return np.unique(np.minimum(idx, n - 1))
+
+
+def downsample_lttb(x, y, max_points):
+    # Largest-Triangle-Three-Buckets：每个区间保留与前一个保留点、下一区间均值构成三角形面积最大的行
+    n = len(x)
+    if max_points < 3 or n <= max_points:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    idx = np.empty(max_points, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+
 class PlotVisualizer:
-    def __init__(self, csv_file):
+    # 派生列：列名 -> (源列, 向量化转换, 坐标轴标签)；结果缓存，重复绘图不会重复转换
+    # 另外任意 "xxx-deg" 列在原始数据中不存在时由 "xxx-rad" 列换算（JSBSim 输出格式）
+    CONVERSIONS = {
+        "yaw": ("yaw", lambda v: np.where(v > 180.0, v - 360.0, v), "yaw"),
+        "vc_kts": ("vc_kts", lambda v: v * 1.68781, "vc_fps"),
+    }
+
+    # columns: 只读取这些列（默认全部）；max_points: 每条曲线最多绘制的点数，None 不抽稀
+    # downsample: "minmax" 保留每段的极值，"lttb" 保留视觉形状
+    def __init__(self, csv_file, columns=None, max_points=5000, downsample="minmax"):
+        if downsample not in ("minmax", "lttb"):
+            raise ValueError(f"未知的抽稀方式: {downsample}")
         self.csv_file = csv_file
+        self.columns = columns
+        self.max_points = max_points
+        self.downsample = downsample
         self.df = None
+        self._derived = {}
+        self._sampled = {}
         self._load_csv()
-    
+
     def _load_csv(self):
-        self.df = pd.read_csv(self.csv_file)
-        self.df['time'] = pd.to_numeric(self.df['time'], errors='coerce')
-        self.df = self.df.dropna(subset=['time'])
-    
+        import pandas as pd
+        header = pd.read_csv(self.csv_file, nrows=0).columns
+        # JSBSim 输出的时间列为 Time
+        time_col = "time" if "time" in header or "Time" not in header else "Time"
+        usecols = None
+        if self.columns:
+            wanted = {time_col}
+            for col in self.columns:
+                source = self.CONVERSIONS.get(col, (col,))[0]
+                if source not in header and source.endswith("-deg"):
+                    source = source[:-4] + "-rad"
+                wanted.add(source)
+            usecols = [c for c in header if c in wanted]
+        try:
+            # 记录文件全部为数值列，按 float64 直接解析
+            df = pd.read_csv(self.csv_file, usecols=usecols, dtype=np.float64)
+        except ValueError:
+            # 含非数值行（如追加写入时重复的表头）时逐列转换，无法解析的值置为 NaN
+            df = pd.read_csv(self.csv_file, usecols=usecols).apply(pd.to_numeric, errors='coerce')
+        df = df.rename(columns={time_col: "time"})
+        self.df = df.dropna(subset=['time']).reset_index(drop=True)
+        self._derived = {}
+        self._sampled = {}
+
+    def column(self, col):
+        # 返回转换后的列（numpy 数组），首次访问时计算并缓存
+        values = self._derived.get(col)
+        if values is not None:
+            return values
+        if col in self.CONVERSIONS:
+            source, func, _ = self.CONVERSIONS[col]
+            values = func(self._raw(source))
+        elif col not in self.df.columns and col.endswith("-deg") and col[:-4] + "-rad" in self.df.columns:
+            values = np.degrees(self._raw(col[:-4] + "-rad"))
+        else:
+            values = self._raw(col)
+        self._derived[col] = values
+        return values
+
+    def _raw(self, col):
+        if col not in self.df.columns:
+            raise ValueError(f"列 {col} 不存在")
+        return self.df[col].to_numpy(dtype=np.float64)
+
+    def label(self, col):
+        return self.CONVERSIONS[col][2] if col in self.CONVERSIONS else col
+
+    def series(self, col, x='time'):
+        # 抽稀后的 (x, y)，按 (x, 列, 点数, 方式) 缓存
+        key = (x, col, self.max_points, self.downsample)
+        cached = self._sampled.get(key)
+        if cached is not None:
+            return cached
+        xs, ys = self.column(x), self.column(col)
+        valid = ~(np.isnan(xs) | np.isnan(ys))
+        if not valid.all():
+            xs, ys = xs[valid], ys[valid]
+        if self.max_points and len(xs) > self.max_points:
+            if self.downsample == "lttb":
+                idx = downsample_lttb(xs, ys, self.max_points)
+            else:
+                idx = downsample_minmax(ys, self.max_points)
+            xs, ys = xs[idx], ys[idx]
+        self._sampled[key] = (xs, ys)
+        return xs, ys
+
     def plot(self, y_columns, x='time', titles=None):
+        import matplotlib.pyplot as plt
         n = len(y_columns)
         fig, axs = plt.subplots(n, 1, sharex=True)
         
@@ -308,11 +552,8 @@ class PlotVisualizer:
         
         for i, col in enumerate(y_columns):
             ax = axs[i]
-            ax.plot(self.df[x], self.__process_column(col))
-            # 修改标签
-            if col == 'vc_kts':
-                col = 'vc_fps'
-            ax.set_ylabel(col)
+            ax.plot(*self.series(col, x))
+            ax.set_ylabel(self.label(col))
             if titles and i < len(titles):
                 ax.set_title(titles[i])
         
@@ -328,9 +569,10 @@ class PlotVisualizer:
         if labels is None:
             labels = y_columns
         
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
         for col, label in zip(y_columns, labels):
-            ax.plot(self.df[x], self.__process_column(col), label=label)
+            ax.plot(*self.series(col, x), label=label)
         
         ax.set_xlabel(x)
         ax.set_ylabel(', '.join(y_columns))
@@ -340,19 +582,6 @@ class PlotVisualizer:
             ax.legend()
         plt.show()
         return ax
-
-    def __process_column(self, col):
-        if col not in self.df.columns:
-            raise ValueError(f"列 {col} 不存在")
-        
-        # 对不同列的数据处理
-        if col == 'yaw':
-            self.df[col] = self.df[col].apply(lambda x: x-360 if x>180 else x)
-            
-        if col == 'vc_kts':
-            self.df[col] = self.df[col].apply(lambda x: x * 1.68781)
-        
-        return self.df[col]
     
     
 
@@ -360,4 +589,6 @@ if __name__ == "__main__":
     ue_vis = UEVisualizer()
     # 选择数据源：udp 或 csv 文件路径
     ue_vis.start(source="c310_teleop.csv")
-    # ue_vis.start(source="udp")
\ No newline at end of file
+    # ue_vis.start(source="udp")
+    # 按记录时间10倍速回放
+    # ue_vis.replay("c310_teleop.csv", speed=10.0)
\ No newline at end of file
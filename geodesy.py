@@ -0,0 +1,114 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+FT_TO_M = 0.3048
+
+
+@lru_cache(maxsize=None)
+def get_transformer(src="EPSG:4979", dst="EPSG:4978"):
+    # 创建 Transformer 开销很大，同一对坐标系只创建一次
+    from pyproj import Transformer
+    return Transformer.from_crs(src, dst, always_xy=True)
+
+
+def geodetic_to_ecef(longitude, latitude, altitude_ft):
+    # 经纬度(度)、高度(英尺) -> ECEF(米)，支持标量或数组
+    return get_transformer().transform(longitude, latitude, np.asarray(altitude_ft) * FT_TO_M)
+
+
+def euler_to_quaternion(pitch, roll, yaw):
+    # 欧拉角(度) -> 四元数 (w, x, y, z)，ZYX 旋转顺序，支持标量或数组
+    half = 0.5 * np.pi / 180.0
+    cy, sy = np.cos(np.asarray(yaw) * half), np.sin(np.asarray(yaw) * half)
+    cp, sp = np.cos(np.asarray(pitch) * half), np.sin(np.asarray(pitch) * half)
+    cr, sr = np.cos(np.asarray(roll) * half), np.sin(np.asarray(roll) * half)
+
+    w = cr * cp * cy + sr * sp * sy
+    x = sr * cp * cy - cr * sp * sy
+    y = cr * sp * cy + sr * cp * sy
+    z = cr * cp * sy - sr * sp * cy
+    return w, x, y, z
+
+
+def euler_to_quaternion_point(pitch, roll, yaw):
+    # 单点版本，标量用 math 比 NumPy 快
+    half = 0.5 * math.pi / 180.0
+    cy, sy = math.cos(yaw * half), math.sin(yaw * half)
+    cp, sp = math.cos(pitch * half), math.sin(pitch * half)
+    cr, sr = math.cos(roll * half), math.sin(roll * half)
+    return (cr * cp * cy + sr * sp * sy,
+            sr * cp * cy - cr * sp * sy,
+            cr * sp * cy + sr * cp * sy,
+            cr * cp * sy - sr * sp * cy)
+
+
+class LocalFrame:
+    # 以参考点为原点的 NED 坐标系，参考点 ECEF 坐标和旋转矩阵只计算一次
+    def __init__(self, longitude, latitude, altitude_ft):
+        self.lon = float(longitude)
+        self.lat = float(latitude)
+        self.alt = float(altitude_ft) * FT_TO_M
+        x, y, z = geodetic_to_ecef(self.lon, self.lat, altitude_ft)
+        self.origin = np.array([x, y, z], dtype=np.float64)
+
+        phi = np.radians(self.lat)
+        lam = np.radians(self.lon)
+        sin_phi, cos_phi = np.sin(phi), np.cos(phi)
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        # ECEF -> NED旋转矩阵
+        self.R = np.array([
+            [-sin_phi * cos_lam, -sin_phi * sin_lam,  cos_phi],
+            [        -sin_lam,           cos_lam,       0    ],
+            [-cos_phi * cos_lam, -cos_phi * sin_lam, -sin_phi]
+        ])
+        # 单点转换用的纯 Python 行向量，避免小数组的 NumPy 开销
+        self._rows = [tuple(float(v) for v in row) for row in self.R]
+        self._origin = tuple(float(v) for v in self.origin)
+
+    def ecef_to_ned(self, X, Y, Z):
+        # 批量：输入为数组，返回3个1D数组
+        ecef = np.stack((np.atleast_1d(X).ravel() - self.origin[0],
+                         np.atleast_1d(Y).ravel() - self.origin[1],
+                         np.atleast_1d(Z).ravel() - self.origin[2]), axis=0)
+        ned = self.R @ ecef
+        return ned[0], ned[1], ned[2]
+
+    def to_ned(self, longitude, latitude, altitude_ft):
+        return self.ecef_to_ned(*geodetic_to_ecef(longitude, latitude, altitude_ft))
+
+    def convert(self, longitude, latitude, altitude_ft, roll, pitch, yaw):
+        # 整条轨迹一次转换：返回 (n, e, d, qw, qx, qy, qz)，均为1D数组
+        n, e, d = self.to_ned(longitude, latitude, altitude_ft)
+        qw, qx, qy, qz = euler_to_quaternion(np.atleast_1d(pitch).ravel(), np.atleast_1d(roll).ravel(),
+                                             np.atleast_1d(yaw).ravel())
+        return n, e, d, qw, qx, qy, qz
+
+    def point_ecef_to_ned(self, x, y, z):
+        dx = x - self._origin[0]
+        dy = y - self._origin[1]
+        dz = z - self._origin[2]
+        r0, r1, r2 = self._rows
+        return (r0[0] * dx + r0[1] * dy + r0[2] * dz,
+                r1[0] * dx + r1[1] * dy + r1[2] * dz,
+                r2[0] * dx + r2[1] * dy + r2[2] * dz)
+
+    def convert_point(self, longitude, latitude, altitude_ft, roll, pitch, yaw):
+        # 流式接口：单点转换，返回 Python float 元组 (n, e, d, qw, qx, qy, qz)
+        x, y, z = get_transformer().transform(longitude, latitude, altitude_ft * FT_TO_M)
+        return self.point_ecef_to_ned(x, y, z) + euler_to_quaternion_point(pitch, roll, yaw)
+
+
+def interpolate_pose(a, b, alpha):
+    # 两个位姿字典之间插值：位置线性插值，四元数取短弧后归一化（nlerp）
+    if alpha <= 0.0:
+        return a
+    if alpha >= 1.0:
+        return b
+    out = {k: a[k] + (b[k] - a[k]) * alpha for k in ("ned_n", "ned_e", "ned_d")}
+    sign = 1.0 if a["qw"] * b["qw"] + a["qx"] * b["qx"] + a["qy"] * b["qy"] + a["qz"] * b["qz"] >= 0 else -1.0
+    q = [a[k] + (sign * b[k] - a[k]) * alpha for k in ("qw", "qx", "qy", "qz")]
+    norm = math.sqrt(sum(v * v for v in q))
+    out.update(zip(("qw", "qx", "qy", "qz"), (v / norm for v in q)))
+    return out
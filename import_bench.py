@@ -0,0 +1,92 @@
+import json
+import subprocess
+import sys
+
+# 导入耗时基准：每个入口模块在新的解释器中导入，记录耗时和加载的重依赖
+# 出现不应加载的依赖时返回非零退出码，可在修改模块结构后运行检查
+HEAVY = ("numpy", "pandas", "matplotlib", "pyproj", "airsim", "msgpackrpc", "jsbsim")
+
+# 入口模块 -> 导入时不允许加载的依赖
+FORBIDDEN = {
+    "sim_sender": HEAVY,
+    "telemetry": HEAVY,
+    "command_server": HEAVY,
+    "state_bus": HEAVY,
+    "publisher": HEAVY,
+    "fcs_core": ("pandas", "matplotlib", "pyproj", "airsim", "msgpackrpc"),
+    "batch_runner": ("pandas", "matplotlib", "pyproj", "airsim", "msgpackrpc"),
+    "checkpoint": ("pandas", "matplotlib", "pyproj", "airsim", "msgpackrpc"),
+    "fleet": ("pandas", "matplotlib", "pyproj", "airsim", "msgpackrpc"),
+    "session": ("pandas", "matplotlib", "pyproj", "airsim", "msgpackrpc"),
+    "flight_visualizer": ("pandas", "matplotlib", "pyproj", "airsim", "msgpackrpc", "jsbsim"),
+    "landing_analytics": ("pandas", "matplotlib", "pyproj", "airsim", "msgpackrpc", "jsbsim"),
+}
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000.0, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat=5):
+    # 返回 (最短导入耗时ms, 加载的重依赖)
+    best = None
+    loaded = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY)],
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f"导入 {module} 失败: {out.stderr.strip().splitlines()[-1]}")
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        best = result["ms"] if best is None else min(best, result["ms"])
+        loaded = result["loaded"]
+    return best, loaded
+
+
+def top_imports(module, n=8):
+    # 用 -X importtime 找出入口模块直接导入的依赖中累计耗时最多的几个
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True)
+    children = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative) / 1000.0, name.strip()))
+        elif depth == 0:
+            # 子模块的记录先于父模块输出
+            if name.strip() == module:
+                return sorted(children, reverse=True)[:n]
+            children = []
+    return []
+
+
+def main(modules=None, repeat=5, detail=False):
+    failed = 0
+    for module in modules or FORBIDDEN:
+        try:
+            ms, loaded = measure(module, repeat)
+        except RuntimeError as e:
+            # 本机缺少可选依赖时跳过
+            print(f"{module:<18} 跳过: {e}")
+            continue
+        bad = [m for m in loaded if m in FORBIDDEN.get(module, ())]
+        status = "FAIL" if bad else "ok"
+        failed += bool(bad)
+        print(f"{module:<18} {ms:8.1f}ms  {status:<4} 已加载: {', '.join(loaded) or '-'}"
+              + (f"  不应加载: {', '.join(bad)}" if bad else ""))
+        if detail:
+            for cost, name in top_imports(module):
+                print(f"    {cost:8.1f}ms  {name}")
+    return failed
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("-")]
+    sys.exit(1 if main(args or None, detail="--detail" in sys.argv) else 0)
@@ -0,0 +1,519 @@
+import csv
+import glob
+import hashlib
+import json
+import math
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from flight_recorder import map_binary
+
+# 着陆/轨迹批量分析：把大量飞行记录载入同一个列存储（各列首尾相接，offsets 记录每次运行的起止行），
+# 各项指标对所有运行一次性向量化计算（reduceat 按运行分段归约），不逐个运行循环
+# 支持两种日志格式：
+#   fcs_core 记录（CSV 或 flight_recorder 二进制）：time, altitude_ft, lat_deg, lon_deg, vc_kts, roll, pitch, yaw
+#   JSBSim <output> 的 CSV：Time, 弧度经纬度（position/lat-geod-rad 等）、"Altitude AGL (ft)" 等标准列
+# 文件按内容哈希缓存：规范化后的列存为 {哈希}.npz，指标按 {哈希}.json 中的参数指纹缓存，
+# 同一批日志改变参数重算时不再解析 CSV，参数不变时不再载入数据
+
+# 规范列 -> [(候选列名, 换算)]，按顺序取第一个存在的列；换算为乘数
+DEG = 180.0 / math.pi
+FPS_TO_KTS = 1.0 / 1.6878098571
+COLUMNS = {
+    "time": [("time", 1.0), ("Time", 1.0)],
+    "altitude_ft": [("altitude_ft", 1.0), ("position/h-agl-ft", 1.0), ("Altitude AGL (ft)", 1.0)],
+    "lat_deg": [("lat_deg", 1.0), ("position/lat-geod-deg", 1.0), ("Latitude Geodetic (deg)", 1.0),
+                ("position/lat-geod-rad", DEG), ("latitude_rad", DEG)],
+    "lon_deg": [("lon_deg", 1.0), ("position/long-gc-deg", 1.0), ("Longitude (deg)", 1.0),
+                ("position/long-gc-rad", DEG), ("longitude_rad", DEG)],
+    "vc_kts": [("vc_kts", 1.0), ("velocities/vc-kts", 1.0)],
+    "pitch": [("pitch", 1.0), ("attitude/theta-deg", 1.0), ("Theta (deg)", 1.0), ("attitude/pitch-deg", 1.0)],
+    "yaw": [("yaw", 1.0), ("attitude/psi-deg", 1.0), ("Psi (deg)", 1.0), ("attitude/heading-true-deg", 1.0)],
+    # 可选列，缺少时为 NaN
+    "hdot_fps": [("hdot_fps", 1.0), ("velocities/h-dot-fps", 1.0), ("V_{Down} (ft/s)", -1.0)],
+    "airspeed_setpoint_kts": [("airspeed_setpoint_kts", 1.0), ("ap/airspeed_setpoint", FPS_TO_KTS)],
+}
+REQUIRED = ("time", "altitude_ft", "lat_deg", "lon_deg", "vc_kts")
+# 未设置 caption 的属性在 JSBSim 输出中带有完整路径前缀
+PROPERTY_PREFIX = "/fdm/jsbsim/"
+
+# zzy_land_v1 的航路点（纬度, 经度，度）与接地目标点；跑道朝北
+WAYPOINTS = (
+    (0.516291656 * DEG, -1.6599238 * DEG),
+    (0.51642159 * DEG, -1.6599238 * DEG),
+    (0.5166114 * DEG, -1.6599238 * DEG),
+)
+# (纬度, 经度, 跑道航向)，度
+RUNWAY = (0.5166114 * DEG, -1.6599238 * DEG, 0.0)
+EARTH_RADIUS_FT = 20925646.0
+CACHE_VERSION = 2
+
+METRIC_FIELDS = (
+    "landed", "duration", "touchdown_time", "touchdown_along_ft", "touchdown_cross_ft", "touchdown_vc_kts",
+    "touchdown_pitch", "sink_rate_fps", "glide_rms_ft", "glide_max_ft", "glide_samples",
+    "xtrack_rms_ft", "xtrack_max_ft", "airspeed_rms_kts", "airspeed_mean_kts",
+)
+
+
+def _column_map(header):
+    # 表头 -> {规范列: (原列名, 换算)}，缺少必要列时抛出异常
+    names = {h.strip(): h for h in header}
+    for h in header:
+        if h.strip().startswith(PROPERTY_PREFIX):
+            names.setdefault(h.strip()[len(PROPERTY_PREFIX):], h)
+    mapping = {}
+    for canon, candidates in COLUMNS.items():
+        for name, scale in candidates:
+            if name in names:
+                mapping[canon] = (names[name], scale)
+                break
+    missing = [c for c in REQUIRED if c not in mapping]
+    if missing:
+        raise ValueError(f"记录缺少必要列: {missing}")
+    return mapping
+
+
+def _read_log(path):
+    # 读取一个日志，返回 ({规范列: float64 数组}, 格式说明)
+    path = str(path)
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            header = next(csv.reader(f), None)
+        if not header:
+            raise ValueError(f"记录没有表头: {path}")
+        mapping = _column_map(header)
+        import pandas as pd
+        usecols = sorted({src for src, _ in mapping.values()})
+        df = pd.read_csv(path, usecols=usecols, skipinitialspace=True, engine="c")
+        df.columns = [c.strip() for c in df.columns]
+        raw = {c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64) for c in df.columns}
+        rows = len(df)
+        get = lambda src: raw[src.strip()]
+    else:
+        names, mm = map_binary(path)
+        mapping = _column_map(names)
+        rows = len(mm)
+        get = lambda src: np.asarray(mm[:, names.index(src)], dtype=np.float64)
+    columns = {}
+    for canon in COLUMNS:
+        if canon in mapping:
+            src, scale = mapping[canon]
+            values = get(src)
+            columns[canon] = values * scale if scale != 1.0 else values.copy()
+        else:
+            columns[canon] = np.full(rows, np.nan)
+    schema = ",".join(f"{c}={mapping[c][0].strip()}" for c in COLUMNS if c in mapping)
+    return columns, schema
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def expand_paths(paths):
+    # 接受文件、目录、通配符或它们的列表；目录下取全部 .csv/.bin
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    result = []
+    for p in paths:
+        p = str(p)
+        if os.path.isdir(p):
+            result.extend(sorted(glob.glob(os.path.join(p, "*.csv")) + glob.glob(os.path.join(p, "*.bin"))))
+        elif any(ch in p for ch in "*?["):
+            result.extend(sorted(glob.glob(p)))
+        else:
+            result.append(p)
+    return result
+
+
+def waypoints_from_script(path, skip=0):
+    # 按事件顺序提取 runscript 中设置的 guidance/target_wp_latitude_rad / longitude_rad，返回 [(纬度, 经度)]（度）
+    # skip: 跳过前几个航路点，如 zzy_land_v1 初始化事件中设置的占位航路点
+    points = []
+    lat = lon = None
+    for s in ET.parse(path).getroot().iter("set"):
+        name = s.get("name", "")
+        if name == "guidance/target_wp_latitude_rad":
+            lat = float(s.get("value")) * DEG
+        elif name == "guidance/target_wp_longitude_rad":
+            lon = float(s.get("value")) * DEG
+        else:
+            continue
+        if lat is not None and lon is not None:
+            points.append((lat, lon))
+            lat = lon = None
+    return points[skip:]
+
+
+def _load_cached(args):
+    # 工作进程入口：读取（或从 npz 缓存读取）一个日志
+    path, digest, cache_dir = args
+    npz = os.path.join(cache_dir, f"{digest}.npz") if cache_dir else None
+    if npz and os.path.exists(npz):
+        with np.load(npz) as data:
+            columns = {c: data[c] for c in COLUMNS}
+            schema = str(data["_schema"])
+        return columns, schema, True
+    columns, schema = _read_log(path)
+    if npz:
+        tmp = npz + f".{os.getpid()}.tmp.npz"
+        np.savez(tmp, _schema=np.array(schema), **columns)
+        os.replace(tmp, npz)
+    return columns, schema, False
+
+
+class RunStore:
+    # 多次运行的列存储：columns[名称] 为所有运行首尾相接的数组，第 i 次运行为 offsets[i]:offsets[i+1]
+    def __init__(self, paths, digests, columns, offsets, schemas):
+        self.paths = list(paths)
+        self.digests = list(digests)
+        self.columns = columns
+        self.offsets = offsets
+        self.schemas = list(schemas)
+
+    def __len__(self):
+        return len(self.paths)
+
+    @property
+    def rows(self):
+        return int(self.offsets[-1])
+
+    def run(self, i):
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return {c: v[lo:hi] for c, v in self.columns.items()}
+
+    @classmethod
+    def concat(cls, paths, digests, parts):
+        # parts: [(列字典, 格式说明), ...]
+        lengths = np.array([len(cols["time"]) for cols, _ in parts], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        columns = {c: np.concatenate([cols[c] for cols, _ in parts]) if parts else np.zeros(0) for c in COLUMNS}
+        return cls(paths, digests, columns, offsets, [s for _, s in parts])
+
+
+class LandingAnalytics:
+    # runs: 日志文件、目录、通配符或列表；cache_dir=None 时不使用缓存
+    # runway: 接地目标点 (纬度, 经度, 跑道航向)，度；waypoints: 航路点 [(纬度, 经度)]，度
+    # glide_slope_deg: 下滑角；glide_range_ft: 计算下滑道偏差的进近距离（接地点之前）
+    # touchdown_agl: 与 check_terminate 一致的接地高度；sink_window: 计算下沉率的时间窗口(秒)，记录中有垂直速度时直接取值
+    # airspeed_target_kts: 记录中没有空速设定值时使用的目标空速；workers: 解析日志的进程数
+    def __init__(self, runs, cache_dir=".landing_cache", runway=RUNWAY, waypoints=WAYPOINTS, glide_slope_deg=3.0,
+                 glide_range_ft=6000.0, touchdown_agl=5.0, sink_window=0.5, airspeed_target_kts=None, workers=None):
+        self.paths = expand_paths(runs)
+        if not self.paths:
+            raise ValueError(f"没有找到飞行记录: {runs}")
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        if len(runway) == 2:
+            runway = (runway[0], runway[1], 0.0)
+        self.params = {
+            "runway": [float(v) for v in runway],
+            "waypoints": [[float(a), float(b)] for a, b in waypoints],
+            "glide_slope_deg": float(glide_slope_deg),
+            "glide_range_ft": float(glide_range_ft),
+            "touchdown_agl": float(touchdown_agl),
+            "sink_window": float(sink_window),
+            "airspeed_target_kts": None if airspeed_target_kts is None else float(airspeed_target_kts),
+            "version": CACHE_VERSION,
+        }
+        self.params_key = hashlib.sha1(json.dumps(self.params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.workers = workers
+        self.digests = self._hash_files()
+        self.store = None
+        self._metrics = None
+        self.cache_hits = {"data": 0, "metrics": 0}
+
+    # ---------- 文件哈希与缓存 ----------
+    def _hash_files(self):
+        # 文件大小和修改时间未变时直接使用索引中的哈希，不重新读取文件
+        index_file = os.path.join(self.cache_dir, "index.json") if self.cache_dir else None
+        index = {}
+        if index_file and os.path.exists(index_file):
+            with open(index_file) as f:
+                index = json.load(f)
+        digests = []
+        changed = False
+        for path in self.paths:
+            st = os.stat(path)
+            key = os.path.abspath(path)
+            entry = index.get(key)
+            if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                digests.append(entry[2])
+                continue
+            digest = file_hash(path)
+            index[key] = [st.st_size, st.st_mtime_ns, digest]
+            digests.append(digest)
+            changed = True
+        if index_file and changed:
+            tmp = index_file + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp, index_file)
+        return digests
+
+    def _metrics_file(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _cached_metrics(self, digest):
+        if not self.cache_dir or not os.path.exists(self._metrics_file(digest)):
+            return None
+        with open(self._metrics_file(digest)) as f:
+            return json.load(f).get(self.params_key)
+
+    def _save_metrics(self, digest, values):
+        path = self._metrics_file(digest)
+        entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                entries = json.load(f)
+        entries[self.params_key] = values
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, path)
+
+    def load(self, indices=None):
+        # 载入指定运行（默认全部）为列存储；内容相同的文件只解析一次
+        indices = range(len(self.paths)) if indices is None else indices
+        paths = [self.paths[i] for i in indices]
+        digests = [self.digests[i] for i in indices]
+        unique = list(dict.fromkeys(digests))
+        src = {d: p for p, d in zip(paths, digests)}
+        jobs = [(src[d], d, self.cache_dir) for d in unique]
+        if self.workers and self.workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                loaded = list(pool.map(_load_cached, jobs, chunksize=max(1, len(jobs) // (4 * self.workers))))
+        else:
+            loaded = [_load_cached(job) for job in jobs]
+        self.cache_hits["data"] += sum(hit for _, _, hit in loaded)
+        by_digest = {d: (cols, schema) for d, (cols, schema, _) in zip(unique, loaded)}
+        return RunStore.concat(paths, digests, [by_digest[d] for d in digests])
+
+    # ---------- 指标 ----------
+    def metrics(self):
+        # 返回 {指标名: 数组}，每个数组对应 self.paths 中的一次运行；缓存中已有的运行不再载入
+        if self._metrics is not None:
+            return self._metrics
+        rows = [None] * len(self.paths)
+        missing = []
+        for i, digest in enumerate(self.digests):
+            rows[i] = self._cached_metrics(digest)
+            if rows[i] is None:
+                missing.append(i)
+        self.cache_hits["metrics"] += len(self.paths) - len(missing)
+        if missing:
+            self.store = self.load(missing)
+            computed = compute_metrics(self.store, **{k: v for k, v in self.params.items() if k != "version"})
+            saved = set()
+            for j, i in enumerate(missing):
+                rows[i] = {name: float(computed[name][j]) for name in METRIC_FIELDS}
+                if self.cache_dir and self.digests[i] not in saved:
+                    self._save_metrics(self.digests[i], rows[i])
+                    saved.add(self.digests[i])
+        self._metrics = {name: np.array([r[name] for r in rows], dtype=np.float64) for name in METRIC_FIELDS}
+        return self._metrics
+
+    def summary(self):
+        # 各指标的统计量，以及接地点散布（相对平均接地点的圆概率误差 CEP50 和 95% 半径）
+        m = self.metrics()
+        landed = m["landed"] > 0
+        result = {"runs": len(self.paths), "landed": int(landed.sum())}
+        for name in METRIC_FIELDS[1:]:
+            v = m[name][np.isfinite(m[name])]
+            if len(v):
+                result[name] = {"mean": float(v.mean()), "std": float(v.std()), "min": float(v.min()),
+                                "p50": float(np.percentile(v, 50)), "p95": float(np.percentile(v, 95)),
+                                "max": float(v.max())}
+        if landed.any():
+            along = m["touchdown_along_ft"][landed]
+            cross = m["touchdown_cross_ft"][landed]
+            radius = np.hypot(along - along.mean(), cross - cross.mean())
+            result["dispersion"] = {"along_mean_ft": float(along.mean()), "cross_mean_ft": float(cross.mean()),
+                                    "along_std_ft": float(along.std()), "cross_std_ft": float(cross.std()),
+                                    "cep50_ft": float(np.percentile(radius, 50)),
+                                    "r95_ft": float(np.percentile(radius, 95))}
+        return result
+
+    def to_dataframe(self):
+        import pandas as pd
+        df = pd.DataFrame(self.metrics())
+        df.insert(0, "path", self.paths)
+        df.insert(1, "sha1", self.digests)
+        return df
+
+    def save_csv(self, path):
+        m = self.metrics()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("path", "sha1") + METRIC_FIELDS)
+            for i, p in enumerate(self.paths):
+                writer.writerow([p, self.digests[i]] + [f"{m[name][i]:.10g}" for name in METRIC_FIELDS])
+
+
+def _segment(values, mask, starts, reduce=np.add, fill=0.0):
+    # 按运行分段归约 mask 为真的元素
+    return reduce.reduceat(np.where(mask, values, fill), starts)
+
+
+def _rms(values, mask, starts):
+    count = _segment(np.ones_like(values), mask, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.sqrt(_segment(values * values, mask, starts) / count), count
+
+
+def _max_abs(values, mask, starts):
+    result = _segment(np.abs(values), mask, starts, np.maximum, -np.inf)
+    return np.where(np.isfinite(result), result, np.nan)
+
+
+def compute_metrics(store, runway=RUNWAY, waypoints=WAYPOINTS, glide_slope_deg=3.0, glide_range_ft=6000.0,
+                    touchdown_agl=5.0, sink_window=0.5, airspeed_target_kts=None):
+    # 对列存储中的所有运行一次性计算指标，返回 {指标名: 每次运行一个值的数组}
+    # 位置换算为以接地目标点为原点、沿跑道航向的平面坐标（along 为沿跑道方向，接地点之前为负；cross 向右为正）
+    n = len(store)
+    empty = {name: np.full(n, np.nan) for name in METRIC_FIELDS}
+    cols = store.columns
+    offsets = store.offsets
+    lengths = np.diff(offsets)
+    if n == 0 or (lengths == 0).any():
+        if n and (lengths == 0).any():
+            bad = [store.paths[i] for i in np.flatnonzero(lengths == 0)]
+            raise ValueError(f"记录没有数据: {bad}")
+        return empty
+    starts = offsets[:-1]
+    ends = offsets[1:]
+    t = cols["time"]
+    alt = cols["altitude_ft"]
+    rows = np.arange(store.rows, dtype=np.int64)
+    run_id = np.repeat(np.arange(n), lengths)
+
+    lat0, lon0, heading = runway
+    k_north = EARTH_RADIUS_FT / DEG
+    k_east = k_north * math.cos(math.radians(lat0))
+    north = (cols["lat_deg"] - lat0) * k_north
+    east = (cols["lon_deg"] - lon0) * k_east
+    ch, sh = math.cos(math.radians(heading)), math.sin(math.radians(heading))
+    along = north * ch + east * sh
+    cross = east * ch - north * sh
+
+    # 接地：第一个低于 touchdown_agl 的采样点；未接地的运行用最后一个点，接地相关指标为 NaN
+    # 降频记录或旧版 fcs_core 记录中可能没有接地那一步：记录结束时仍在下降、且再下降一个采样间隔就低于
+    # touchdown_agl 的运行也视为接地，接地点取最后一个采样
+    first = _segment(rows, alt < touchdown_agl, starts, np.minimum, store.rows)
+    last = ends - 1
+    drop = alt[np.maximum(last - 1, starts)] - alt[last]
+    landed = (first < ends) | ((drop > 0) & (alt[last] - drop < touchdown_agl))
+    td = np.where(first < ends, first, last)
+    nan_unless_landed = lambda v: np.where(landed, v, np.nan)
+
+    # 下沉率：记录中有垂直速度时直接取接地时刻的值，否则按接地前 sink_window 秒的高度差计算
+    # 所有运行的 (运行号, 时间) 组合成单调递增的键，一次 searchsorted 找到每次运行的窗口起点
+    span = float(np.nanmax(t) - np.nanmin(t)) + 2.0 * sink_window + 1.0
+    key = run_id * span + (t - np.nanmin(t))
+    back = np.maximum(np.searchsorted(key, key[td] - sink_window, side="left"), starts)
+    dt = t[td] - t[back]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sink = np.where(dt > 0, (alt[back] - alt[td]) / dt, np.nan)
+    hdot = cols["hdot_fps"][td]
+    sink = np.where(np.isfinite(hdot), -hdot, sink)
+
+    # 接地之前的采样（未接地的运行取全部）
+    before = rows < np.repeat(np.where(landed, td, ends), lengths)
+
+    # 下滑道偏差：进近段中高度与 glide_slope_deg 下滑线的差
+    approach = before & (along <= 0.0) & (along >= -glide_range_ft) & (alt >= touchdown_agl)
+    glide_dev = alt - math.tan(math.radians(glide_slope_deg)) * (-along)
+    glide_rms, glide_count = _rms(glide_dev, approach, starts)
+
+    # 航路偏差：到航路点折线的最近距离，带符号（航段右侧为正）
+    if len(waypoints) >= 2:
+        wp = np.asarray(waypoints, dtype=np.float64)
+        wn = (wp[:, 0] - lat0) * k_north
+        we = (wp[:, 1] - lon0) * k_east
+        best = np.full(store.rows, np.inf)
+        signed = np.zeros(store.rows)
+        for k in range(len(wp) - 1):
+            dn, de = wn[k + 1] - wn[k], we[k + 1] - we[k]
+            length2 = dn * dn + de * de
+            pn, pe = north - wn[k], east - we[k]
+            u = np.clip((pn * dn + pe * de) / length2, 0.0, 1.0) if length2 > 0 else np.zeros(store.rows)
+            dist = np.hypot(pn - u * dn, pe - u * de)
+            side = np.sign(pe * dn - pn * de)
+            closer = dist < best
+            best = np.where(closer, dist, best)
+            signed = np.where(closer, np.where(side == 0, 1.0, side) * dist, signed)
+        xtrack_valid = before & np.isfinite(signed)
+        xtrack_rms, _ = _rms(signed, xtrack_valid, starts)
+        xtrack_max = _max_abs(signed, xtrack_valid, starts)
+    else:
+        xtrack_rms = xtrack_max = np.full(n, np.nan)
+
+    # 空速跟踪误差：优先使用记录中的空速设定值
+    target = cols["airspeed_setpoint_kts"]
+    if airspeed_target_kts is not None:
+        target = np.where(np.isfinite(target), target, airspeed_target_kts)
+    speed_err = cols["vc_kts"] - target
+    speed_valid = before & np.isfinite(speed_err)
+    speed_rms, speed_count = _rms(speed_err, speed_valid, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        speed_mean = _segment(speed_err, speed_valid, starts) / speed_count
+
+    return {
+        "landed": landed.astype(np.float64),
+        "duration": t[ends - 1] - t[starts],
+        "touchdown_time": nan_unless_landed(t[td]),
+        "touchdown_along_ft": nan_unless_landed(along[td]),
+        "touchdown_cross_ft": nan_unless_landed(cross[td]),
+        "touchdown_vc_kts": nan_unless_landed(cols["vc_kts"][td]),
+        "touchdown_pitch": nan_unless_landed(cols["pitch"][td]),
+        "sink_rate_fps": nan_unless_landed(sink),
+        "glide_rms_ft": glide_rms,
+        "glide_max_ft": _max_abs(glide_dev, approach, starts),
+        "glide_samples": glide_count,
+        "xtrack_rms_ft": xtrack_rms,
+        "xtrack_max_ft": xtrack_max,
+        "airspeed_rms_kts": speed_rms,
+        "airspeed_mean_kts": speed_mean,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="批量分析着陆记录")
+    parser.add_argument("runs", nargs="+", help="日志文件、目录或通配符")
+    parser.add_argument("--script", help="从 runscript 读取航路点，最后一个航路点作为接地目标点")
+    parser.add_argument("--skip-waypoints", type=int, default=0, help="跳过 runscript 中的前几个航路点")
+    parser.add_argument("--cache", default=".landing_cache", help="缓存目录，传空字符串不使用缓存")
+    parser.add_argument("--airspeed", type=float, help="记录中没有设定值时的目标空速(kts)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", help="每次运行的指标另存为 CSV")
+    args = parser.parse_args()
+
+    kwargs = {}
+    if args.script:
+        points = waypoints_from_script(args.script, args.skip_waypoints)
+        if points:
+            kwargs["waypoints"] = points
+            heading = 0.0
+            if len(points) >= 2:
+                (la1, lo1), (la2, lo2) = points[-2], points[-1]
+                heading = math.degrees(math.atan2((lo2 - lo1) * math.cos(math.radians(la2)), la2 - la1))
+            kwargs["runway"] = (points[-1][0], points[-1][1], heading)
+    start = time.perf_counter()
+    analytics = LandingAnalytics(args.runs, cache_dir=args.cache or None, airspeed_target_kts=args.airspeed,
+                                 workers=args.workers, **kwargs)
+    summary = analytics.summary()
+    print(f"(ANALYTICS){len(analytics.paths)} 个记录, 耗时 {time.perf_counter() - start:.3f}s, 缓存命中 {analytics.cache_hits}")
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.out:
+        analytics.save_csv(args.out)
@@ -0,0 +1,96 @@
+MODES = ("decimate", "average")
+
+
+class OutputGate:
+    # 按仿真时间控制某个输出端的频率
+    # rate 为 None 或 0 时每个仿真步都输出
+    # decimate: 到时刻时输出当前记录；average: 输出两次输出之间所有记录的均值
+    def __init__(self, rate=None, mode="decimate", angle_ranges=None):
+        if mode not in MODES:
+            raise ValueError(f"未知的输出模式: {mode}，可选 {MODES}")
+        self.rate = rate
+        self.mode = mode
+        self.period = 1.0 / rate if rate else 0.0
+        # 角度字段 {列索引: 取值下限}，如航向 [0, 360) 为 0.0，滚转 [-180, 180) 为 -180.0
+        # 求均值时按与首个样本的差值展开，避免 359 和 1 平均成 180
+        self.angle_ranges = dict(angle_ranges or {})
+        self.next_time = None
+        self._sum = None
+        self._first = None
+        self._last_time = 0.0
+        self._n = 0
+
+    def reset(self):
+        self.next_time = None
+        self._sum = None
+        self._first = None
+        self._n = 0
+
+    def ready(self, sim_time):
+        if not self.period:
+            return True
+        if self.next_time is None:
+            self.next_time = sim_time
+        # 留一点余量，避免浮点误差导致整除频率错过一个步长
+        if sim_time + 1e-9 < self.next_time:
+            return False
+        self.next_time += self.period
+        # 落后超过一个周期（如暂停后）时不再补发，直接对齐到当前时刻
+        if self.next_time <= sim_time:
+            self.next_time = sim_time + self.period
+        return True
+
+    def push(self, values):
+        # values[0] 为仿真时间；返回本次应输出的记录，未到输出时刻返回 None
+        if self.mode == "decimate" or not self.period:
+            return values if self.ready(values[0]) else None
+        self._accumulate(values)
+        if not self.ready(values[0]):
+            return None
+        return self._take()
+
+    def _accumulate(self, values):
+        if self._sum is None:
+            self._sum = [0.0] * len(values)
+            self._first = values
+        for i, v in enumerate(values):
+            self._sum[i] += v
+        for i in self.angle_ranges:
+            first = self._first[i]
+            delta = (values[i] - first + 180.0) % 360.0 - 180.0
+            self._sum[i] += first + delta - values[i]
+        self._last_time = values[0]
+        self._n += 1
+
+    def _take(self):
+        n = self._n
+        out = [s / n for s in self._sum]
+        # 时间取窗口内最后一个样本
+        out[0] = self._last_time
+        for i, low in self.angle_ranges.items():
+            out[i] = low + (out[i] - low) % 360.0
+        self._sum = None
+        self._first = None
+        self._n = 0
+        return out
+
+
+class OutputScheduler:
+    # 管理多个命名输出端（记录、广播、控制台、用户脚本）的输出频率
+    def __init__(self, angle_ranges=None):
+        self.angle_ranges = dict(angle_ranges or {})
+        self.gates = {}
+
+    def configure(self, name, rate=None, mode="decimate"):
+        self.gates[name] = OutputGate(rate, mode, self.angle_ranges)
+        return self.gates[name]
+
+    def __getitem__(self, name):
+        gate = self.gates.get(name)
+        if gate is None:
+            gate = self.configure(name)
+        return gate
+
+    def reset(self):
+        for gate in self.gates.values():
+            gate.reset()
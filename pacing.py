@@ -0,0 +1,78 @@
+import time
+
+
+class Pacer:
+    # 按实时倍率控制仿真推进速度，基于单调时钟计算每一步的目标墙钟时刻，不累积误差
+    # realtime_factor: 1.0 实时，0.5 半速，N 为 N 倍速，None/0 不限速（批量运行）
+    # max_catchup: 落后时允许不等待连续追赶的最大时长(秒，墙钟)，超过后放弃追赶并重新对齐时钟
+    def __init__(self, realtime_factor=1.0, max_catchup=0.25):
+        self.realtime_factor = realtime_factor
+        self.max_catchup = max_catchup
+        self._anchor_wall = None
+        self._anchor_sim = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.steps = 0
+        self.overruns = 0
+        self.max_lag = 0.0
+        self.dropped_time = 0.0
+        self.slept = 0.0
+        self._start_wall = None
+        self._start_sim = 0.0
+
+    @property
+    def enabled(self):
+        return bool(self.realtime_factor)
+
+    def start(self, sim_time=0.0):
+        now = time.perf_counter()
+        self._anchor_wall = now
+        self._anchor_sim = sim_time
+        self._start_wall = now
+        self._start_sim = sim_time
+
+    def set_factor(self, realtime_factor, sim_time):
+        # 从当前仿真时刻重新对齐，之后按新倍率推进
+        self.realtime_factor = realtime_factor
+        self._anchor_wall = time.perf_counter()
+        self._anchor_sim = sim_time
+
+    def wait(self, sim_time):
+        # 在仿真推进到 sim_time 后调用，等待到其对应的墙钟时刻
+        self.steps += 1
+        if not self.realtime_factor:
+            return
+        if self._anchor_wall is None:
+            self.start(sim_time)
+            return
+        target = self._anchor_wall + (sim_time - self._anchor_sim) / self.realtime_factor
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+            self.slept += delay
+            return
+        lag = -delay
+        self.overruns += 1
+        if lag > self.max_lag:
+            self.max_lag = lag
+        if lag > self.max_catchup:
+            # 超出追赶预算：丢弃落后的时间，从当前时刻重新对齐
+            self.dropped_time += lag
+            self._anchor_wall = time.perf_counter()
+            self._anchor_sim = sim_time
+
+    def stats(self, sim_time=None):
+        out = {
+            "realtime_factor": self.realtime_factor,
+            "steps": self.steps,
+            "overruns": self.overruns,
+            "overrun_ratio": self.overruns / self.steps if self.steps else 0.0,
+            "max_lag_ms": 1000.0 * self.max_lag,
+            "dropped_time_s": self.dropped_time,
+            "slept_s": self.slept,
+        }
+        if sim_time is not None and self._start_wall is not None:
+            wall = time.perf_counter() - self._start_wall
+            out["achieved_factor"] = (sim_time - self._start_sim) / wall if wall > 0 else 0.0
+        return out
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+
+
+class PoseUpdater:
+    # AirSim 位姿更新流水线：接收线程/渲染线程只提交位姿，RPC 在独立工作线程中执行
+    # - 每架飞机只保留最新一帧，渲染端跟不上时丢弃过时位姿；多机时同一个客户端依次更新各飞机
+    # - 连续到达的帧只在开始时 simPause(True)，空闲 idle_unpause 秒后才 simPause(False)
+    # - 记录每次 simSetVehiclePose 的 RPC 往返时间
+    def __init__(self, client, make_pose, vehicle_name="drone_1", pause=True, idle_unpause=0.05,
+                 latency_window=1000):
+        self.client = client
+        self.make_pose = make_pose
+        self.vehicle_name = vehicle_name
+        self.pause = pause
+        self.idle_unpause = idle_unpause
+
+        self.cond = threading.Condition()
+        # 飞机名 -> 待发送的最新位姿
+        self._slots = {}
+        self._stopping = False
+        self._busy = False
+
+        self.submitted = 0
+        self.sent = 0
+        self.replaced = 0
+        self.pause_calls = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=latency_window)
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, point, vehicle_name=None):
+        with self.cond:
+            vehicle_name = vehicle_name or self.vehicle_name
+            if vehicle_name in self._slots:
+                self.replaced += 1
+            self._slots[vehicle_name] = point
+            self.submitted += 1
+            self.cond.notify()
+
+    def _set_paused(self, paused):
+        self.client.simPause(paused)
+        self.pause_calls += 1
+
+    def _run(self):
+        paused = False
+        while True:
+            with self.cond:
+                if not self._slots and not self._stopping:
+                    self.cond.wait(self.idle_unpause if paused else 0.5)
+                points, self._slots = self._slots, {}
+                stopping = self._stopping
+                self._busy = bool(points)
+            if not points:
+                # 一段时间没有新帧，恢复仿真运行
+                if paused:
+                    self._safe(self._set_paused, False)
+                    paused = False
+                if stopping:
+                    break
+                continue
+            if self.pause and not paused:
+                paused = self._safe(self._set_paused, True)
+            for vehicle_name, point in points.items():
+                start = time.perf_counter()
+                if self._safe(self.client.simSetVehiclePose, self.make_pose(point), ignore_collision=True,
+                              vehicle_name=vehicle_name):
+                    self.latencies.append(time.perf_counter() - start)
+                    self.sent += 1
+            with self.cond:
+                self._busy = False
+                self.cond.notify_all()
+
+    def _safe(self, func, *args, **kwargs):
+        try:
+            func(*args, **kwargs)
+            return True
+        except Exception as e:
+            self.errors += 1
+            print(f"(UE)RPC 异常: {e}")
+            return False
+
+    def flush(self, timeout=1.0):
+        # 等待已提交的位姿发送完毕
+        deadline = time.perf_counter() + timeout
+        with self.cond:
+            while self._slots or self._busy:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+        return True
+
+    def stop(self, timeout=1.0):
+        with self.cond:
+            self._stopping = True
+            self.cond.notify_all()
+        self.thread.join(timeout)
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        out = {
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "replaced": self.replaced,
+            "pause_calls": self.pause_calls,
+            "errors": self.errors,
+        }
+        if lat:
+            out.update(
+                rpc_mean_ms=1000.0 * sum(lat) / len(lat),
+                rpc_p50_ms=1000.0 * lat[len(lat) // 2],
+                rpc_p99_ms=1000.0 * lat[min(len(lat) - 1, int(len(lat) * 0.99))],
+                rpc_max_ms=1000.0 * lat[-1],
+            )
+        return out
@@ -0,0 +1,112 @@
+import json
+import socket
+import time
+
+import numpy as np
+
+# 仿真循环的阶段划分，顺序与 run_simulation 中一致
+STAGES = ("fdm", "pacing", "commands", "script", "terminate", "visualize", "log")
+
+
+class StageProfiler:
+    # 分阶段计时：每步只调用几次 perf_counter，耗时写入预分配的滚动窗口
+    # dump_rate(Hz, 墙钟) 不为空时周期性输出统计：写入 dump_csv 记录文件，和/或以 JSON 发送到 dump_udp=(host, port)
+    def __init__(self, stages=STAGES, window=2400, dump_rate=None, dump_csv=None, dump_udp=None):
+        self.stages = tuple(stages)
+        self.window = int(window)
+        self.samples = np.zeros((self.window, len(self.stages)), dtype=np.float64)
+        self.totals = np.zeros(self.window, dtype=np.float64)
+        self.count = 0
+        self._marks = [0.0] * (len(self.stages) + 1)
+        self._start_wall = None
+        # 额外统计来源：名称 -> 无参函数，如命令缓冲的积压数量
+        self.gauges = {}
+
+        self.dump_period = 1.0 / dump_rate if dump_rate else None
+        self._next_dump = None
+        self._recorder = None
+        if dump_csv:
+            from flight_recorder import FlightRecorder
+            names = ["wall_time", "steps_per_sec"]
+            for stage in self.stages:
+                names += [f"{stage}_p50_ms", f"{stage}_p99_ms", f"{stage}_max_ms"]
+            self._recorder = FlightRecorder(names, csv_file=dump_csv, chunk_size=10, retention=100)
+        self._udp_addr = dump_udp
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if dump_udp else None
+
+    def begin(self):
+        self._marks[0] = time.perf_counter()
+        if self._start_wall is None:
+            self._start_wall = self._marks[0]
+
+    def mark(self, i):
+        # 第 i 个阶段结束
+        self._marks[i + 1] = time.perf_counter()
+
+    def end(self):
+        m = self._marks
+        k = self.count % self.window
+        row = self.samples[k]
+        for i in range(len(self.stages)):
+            row[i] = m[i + 1] - m[i]
+        self.totals[k] = m[-1] - m[0]
+        self.count += 1
+        if self.dump_period is not None:
+            now = m[-1]
+            if self._next_dump is None:
+                self._next_dump = now + self.dump_period
+            elif now >= self._next_dump:
+                self._next_dump = now + self.dump_period
+                self.dump()
+
+    def snapshot(self):
+        n = min(self.count, self.window)
+        out = {"steps": self.count, "window": n}
+        if self._start_wall is not None:
+            wall = time.perf_counter() - self._start_wall
+            out["steps_per_sec"] = self.count / wall if wall > 0 else 0.0
+        if n:
+            data = self.samples[:n] * 1000.0
+            p50, p99 = np.percentile(data, (50, 99), axis=0)
+            mean = data.mean(axis=0)
+            peak = data.max(axis=0)
+            for i, stage in enumerate(self.stages):
+                out[stage] = {"mean_ms": mean[i], "p50_ms": p50[i], "p99_ms": p99[i], "max_ms": peak[i]}
+            total = self.totals[:n] * 1000.0
+            out["step"] = {"mean_ms": total.mean(), "p50_ms": float(np.percentile(total, 50)),
+                           "p99_ms": float(np.percentile(total, 99)), "max_ms": total.max()}
+        for name, gauge in self.gauges.items():
+            out[name] = gauge()
+        return out
+
+    def dump(self):
+        snap = self.snapshot()
+        if self._recorder is not None and "step" in snap:
+            values = [time.perf_counter() - self._start_wall, snap.get("steps_per_sec", 0.0)]
+            for stage in self.stages:
+                values += [snap[stage]["p50_ms"], snap[stage]["p99_ms"], snap[stage]["max_ms"]]
+            self._recorder.append(values)
+        if self._sock:
+            try:
+                self._sock.sendto(json.dumps(snap, default=float).encode("utf-8"), self._udp_addr)
+            except OSError:
+                pass
+        return snap
+
+    def report(self):
+        snap = self.snapshot()
+        if "step" not in snap:
+            return "(PROFILE)无数据"
+        lines = [f"(PROFILE)步数:{snap['steps']}, 步/秒:{snap.get('steps_per_sec', 0.0):.0f}"]
+        for stage in self.stages + ("step",):
+            s = snap[stage]
+            lines.append(f"  {stage:<10} p50={s['p50_ms']:.3f}ms p99={s['p99_ms']:.3f}ms max={s['max_ms']:.3f}ms")
+        for name in self.gauges:
+            lines.append(f"  {name}: {snap[name]}")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._recorder is not None:
+            self._recorder.close()
+        if self._sock:
+            self._sock.close()
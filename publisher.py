@@ -0,0 +1,337 @@
+import errno
+import json
+import socket
+import struct
+import threading
+import time
+
+from output_scheduler import OutputGate
+from telemetry import FRAME_FIELDS, SEQ_MOD, decode_frames, encode_frames
+
+# 多订阅者遥测发布：UE、地面站、数据记录等同时订阅，各自选择字段、频率和编码
+# 相同 (字段, 频率, 编码, 模式) 的订阅者归为一组，每组到输出时刻只编码一次，再发送给组内所有地址；
+# 订阅地址可以是组播地址（如 239.255.0.1），同一网段内加入该组播的接收端都能收到，发布端只发送一次
+# 订阅方式：
+#   静态    publisher.subscribe(("127.0.0.1", 5555), encoding="telemetry", rate=60)，不过期
+#   动态    向控制端口发送 JSON 请求（见 TelemetrySubscriber），按 lease 秒续订，超时未续订自动移除：
+#           {"op": "subscribe", "fields": [...], "rate": 30, "encoding": "binary", "mode": "decimate"}
+#           {"op": "unsubscribe"}
+# 编码：
+#   binary     数据报 = 魔数 b"TS" + 版本(uint8) + 字段数(uint8) + 序号(uint32) + 字段值 * float64（顺序同订阅的字段）
+#   json       {"seq": 序号, 字段: 值, ...}
+#   telemetry  telemetry.encode_frames 的单帧数据报，字段固定，UEVisualizer 可直接接收
+ENCODINGS = ("binary", "json", "telemetry")
+STATE_MAGIC = b"TS"
+STATE_VERSION = 1
+STATE_HEADER = struct.Struct("<2sBBI")
+MAX_FIELDS = 255
+DEFAULT_LEASE = 10.0
+
+
+def encode_state(seq, values):
+    return STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION, len(values), seq % SEQ_MOD) + struct.pack(
+        f"<{len(values)}d", *values)
+
+
+def decode_state(data):
+    # 返回 (序号, 字段值元组)
+    magic, version, count, seq = STATE_HEADER.unpack_from(data)
+    if magic != STATE_MAGIC:
+        raise ValueError("不是状态数据报")
+    if version != STATE_VERSION:
+        raise ValueError(f"不支持的状态数据报版本: {version}")
+    return seq, struct.unpack_from(f"<{count}d", data, STATE_HEADER.size)
+
+
+class _Group:
+    # 一组相同订阅参数的订阅者
+    def __init__(self, key, columns, angle_ranges):
+        self.fields, self.rate, self.encoding, self.mode = key
+        # 发送的字段在完整状态记录中的列号
+        self.columns = columns
+        # 频率控制作用于完整状态记录，angle_ranges 为角度字段在记录中的列号，平均模式下按圆周求均值
+        self.gate = OutputGate(self.rate, self.mode, angle_ranges)
+        # 地址 -> 过期时间（墙钟），None 表示静态订阅不过期；发送时读取 addrs 元组，修改时整体替换
+        self.expiry = {}
+        self.addrs = ()
+        self.seq = 0
+        self.sent = 0
+
+    def encode(self, values):
+        row = [values[i] for i in self.columns]
+        seq = self.seq
+        self.seq += 1
+        if self.encoding == "binary":
+            return encode_state(seq, row)
+        if self.encoding == "json":
+            return (json.dumps(dict(zip(self.fields, row), seq=seq)) + "\n").encode("utf-8")
+        return encode_frames([(seq, row)])
+
+
+class TelemetryPublisher:
+    # control_port: 动态订阅的控制端口，None 表示只支持静态订阅
+    # angle_fields: 平均模式下按圆周求均值的状态字段 {字段名: 取值下限}
+    def __init__(self, host="0.0.0.0", control_port=5556, lease=DEFAULT_LEASE, multicast_ttl=1, angle_fields=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, multicast_ttl)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.lease = lease
+        # telemetry 编码的 FRAME_FIELDS 键 -> 状态字段名，由 set_schema 设置
+        self.telemetry_fields = {}
+        self.angle_fields = dict(angle_fields or {"roll": -180.0, "yaw": 0.0})
+        self.names = None
+        self.index = {}
+        self._angle_ranges = {}
+        self._lock = threading.Lock()
+        self._groups = {}
+        # 订阅地址 -> 组参数，每个地址只保留最新的一个订阅
+        self._subscribers = {}
+        # 仿真线程读取的组元组，修改时整体替换
+        self._active = ()
+        # 在设置字段名之前收到的静态订阅
+        self._pending = []
+
+        self.published = 0
+        self.errors = 0
+        self.rejected = 0
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.control = None
+        if control_port is not None:
+            self.control = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.control.bind((host, control_port))
+            self.control.settimeout(1.0)
+            self._thread = threading.Thread(target=self._control_loop, daemon=True)
+            self._thread.start()
+
+    def set_schema(self, names, telemetry_fields=()):
+        # 由 AircraftSimulation 在构造时调用，names 为状态字段名（第0个为 time），
+        # telemetry_fields 为 (FRAME_FIELDS 键, 状态字段名)，即 AircraftSimulation.UDP_FIELDS
+        with self._lock:
+            self.telemetry_fields = dict(telemetry_fields)
+            self.names = tuple(names)
+            self.index = {name: i for i, name in enumerate(self.names)}
+            self._angle_ranges = {self.index[n]: low for n, low in self.angle_fields.items() if n in self.index}
+        pending, self._pending = self._pending, []
+        for args in pending:
+            self.subscribe(*args)
+
+    def _key(self, fields, rate, encoding, mode):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"未知的编码方式: {encoding}，可选 {ENCODINGS}")
+        if encoding == "telemetry":
+            fields = FRAME_FIELDS
+            names = [self.telemetry_fields.get(k, k) for k in FRAME_FIELDS]
+        else:
+            # 时间总是第一个字段
+            fields = ("time",) + tuple(f for f in (fields or self.names) if f != "time")
+            names = fields
+        missing = [name for name in names if name not in self.index]
+        if missing:
+            raise ValueError(f"未知的状态字段: {', '.join(missing)}")
+        if len(fields) > MAX_FIELDS:
+            raise ValueError(f"最多订阅 {MAX_FIELDS} 个字段")
+        rate = float(rate) if rate else 0.0
+        return (tuple(fields), rate, encoding, mode), [self.index[name] for name in names]
+
+    def subscribe(self, addr, fields=None, rate=None, encoding="binary", mode="decimate", lease=None):
+        # 添加或更新订阅，rate 单位 Hz（None 为每步），lease 为过期秒数（None 不过期）；返回实际发送的字段
+        if self.names is None:
+            self._pending.append((addr, fields, rate, encoding, mode, lease))
+            return None
+        key, columns = self._key(fields, rate, encoding, mode)
+        with self._lock:
+            if self._subscribers.get(addr) == key:
+                # 续订：只更新过期时间，保留组的序号和频率状态
+                self._groups[key].expiry[addr] = None if lease is None else time.monotonic() + lease
+                return key[0]
+            self._remove(addr)
+            group = self._groups.get(key)
+            if group is None:
+                group = _Group(key, columns, self._angle_ranges)
+                self._groups[key] = group
+            group.expiry[addr] = None if lease is None else time.monotonic() + lease
+            group.addrs = tuple(group.expiry)
+            self._subscribers[addr] = key
+            self._refresh()
+        return key[0]
+
+    def unsubscribe(self, addr):
+        with self._lock:
+            self._remove(addr)
+            self._refresh()
+
+    def _remove(self, addr):
+        key = self._subscribers.pop(addr, None)
+        if key is None:
+            return
+        group = self._groups[key]
+        group.expiry.pop(addr, None)
+        group.addrs = tuple(group.expiry)
+        if not group.addrs:
+            del self._groups[key]
+
+    def _refresh(self):
+        self._active = tuple(self._groups.values())
+
+    def publish(self, values):
+        # 仿真线程每步调用，values 为完整状态记录
+        for group in self._active:
+            out = group.gate.push(values)
+            if out is None:
+                continue
+            data = group.encode(out)
+            for addr in group.addrs:
+                try:
+                    self.sock.sendto(data, addr)
+                    group.sent += 1
+                except OSError as e:
+                    self.errors += 1
+                    if e.errno not in (errno.ECONNREFUSED, 10061, 10054, 111):
+                        print(f"(PUB)发送异常 {addr}: {e}")
+        self.published += 1
+
+    def _control_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                data, addr = self.control.recvfrom(65535)
+            except socket.timeout:
+                data = None
+            except OSError:
+                break
+            if data is not None:
+                self._handle(data, addr)
+            self._expire()
+
+    def _handle(self, data, addr):
+        try:
+            req = json.loads(data.decode("utf-8"))
+            op = req.get("op")
+            if op == "subscribe":
+                if self.names is None:
+                    raise ValueError("仿真尚未启动")
+                target = (addr[0], int(req["port"])) if req.get("port") else addr
+                fields = self.subscribe(target, req.get("fields"), req.get("rate"), req.get("encoding", "binary"),
+                                        req.get("mode", "decimate"), self.lease)
+                reply = {"op": "ack", "fields": list(fields), "lease": self.lease}
+            elif op == "unsubscribe":
+                target = (addr[0], int(req["port"])) if req.get("port") else addr
+                self.unsubscribe(target)
+                reply = {"op": "ack"}
+            else:
+                raise ValueError(f"未知请求: {op}")
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError) as e:
+            self.rejected += 1
+            reply = {"op": "error", "error": str(e)}
+        try:
+            self.control.sendto(json.dumps(reply).encode("utf-8"), addr)
+        except OSError:
+            pass
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            stale = []
+            for addr, key in self._subscribers.items():
+                expiry = self._groups[key].expiry[addr]
+                if expiry is not None and expiry < now:
+                    stale.append(addr)
+            for addr in stale:
+                self._remove(addr)
+            if stale:
+                self._refresh()
+        for addr in stale:
+            print(f"(PUB)订阅超时已移除: {addr}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(2.0)
+        if self.control:
+            self.control.close()
+        self.sock.close()
+        print(f"已关闭遥测发布, 发布:{self.published}, 订阅组:{len(self._groups)}, 错误:{self.errors}")
+
+    def stats(self):
+        with self._lock:
+            groups = [{"fields": len(g.fields), "rate": g.rate, "encoding": g.encoding, "mode": g.mode,
+                       "subscribers": len(g.addrs), "sent": g.sent} for g in self._groups.values()]
+        return {"published": self.published, "subscribers": len(self._subscribers), "groups": groups,
+                "errors": self.errors, "rejected": self.rejected}
+
+
+class TelemetrySubscriber:
+    # 动态订阅客户端：向发布端控制端口订阅，按 lease 的一半周期自动续订
+    # multicast_group: 从组播地址接收（此时需发布端以静态订阅发往该组播地址，不发送订阅请求）
+    def __init__(self, fields=None, rate=None, encoding="binary", mode="decimate", host="127.0.0.1",
+                 control_port=5556, port=0, multicast_group=None, timeout=1.0):
+        self.request = {"op": "subscribe", "fields": list(fields) if fields else None, "rate": rate,
+                        "encoding": encoding, "mode": mode}
+        self.encoding = encoding
+        # 回复的源地址是数值 IP，主机名需先解析才能与之比较
+        self.control_addr = (socket.gethostbyname(host), control_port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.multicast_group = multicast_group
+        if multicast_group:
+            self.sock.bind(("", port))
+            mreq = struct.pack("4s4s", socket.inet_aton(multicast_group), socket.inet_aton("0.0.0.0"))
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        else:
+            self.sock.bind(("", port))
+        self.sock.settimeout(timeout)
+        self.fields = tuple(fields) if fields else None
+        self.lease = None
+        self._renew_at = 0.0
+        if not multicast_group:
+            self.subscribe()
+
+    def subscribe(self):
+        # 订阅请求和回复都经过数据端口，回复中给出实际的字段顺序和过期时间
+        self.sock.sendto(json.dumps(self.request).encode("utf-8"), self.control_addr)
+        deadline = time.monotonic() + self.sock.gettimeout()
+        while time.monotonic() < deadline:
+            data, addr = self.sock.recvfrom(65535)
+            if addr != self.control_addr or not data.startswith(b"{\"op\""):
+                continue
+            reply = json.loads(data.decode("utf-8"))
+            if reply["op"] == "error":
+                raise ValueError(f"订阅失败: {reply['error']}")
+            self.fields = tuple(reply["fields"])
+            self.lease = reply["lease"]
+            self._renew_at = time.monotonic() + self.lease / 2.0
+            return self.fields
+        raise TimeoutError("订阅请求无回复")
+
+    def _renew(self):
+        if self.lease and time.monotonic() >= self._renew_at:
+            self._renew_at = time.monotonic() + self.lease / 2.0
+            self.sock.sendto(json.dumps(self.request).encode("utf-8"), self.control_addr)
+
+    def recv(self):
+        # 返回字段字典，超时返回 None
+        self._renew()
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(65535)
+            except socket.timeout:
+                return None
+            if addr == self.control_addr:
+                # 续订回复
+                continue
+            if self.encoding == "json":
+                return json.loads(data.decode("utf-8"))
+            if self.encoding == "telemetry":
+                seq, values = decode_frames(data)[0]
+                return dict(zip(FRAME_FIELDS, values), seq=seq)
+            seq, values = decode_state(data)
+            return dict(zip(self.fields, values), seq=seq)
+
+    def close(self):
+        if self.lease:
+            try:
+                self.sock.sendto(json.dumps({"op": "unsubscribe"}).encode("utf-8"), self.control_addr)
+            except OSError:
+                pass
+        self.sock.close()
@@ -0,0 +1,173 @@
+import threading
+import time
+
+import numpy as np
+
+from flight_recorder import map_binary
+from geodesy import LocalFrame
+
+REPLAY_COLUMNS = ("time", "lon_deg", "lat_deg", "altitude_ft", "roll", "pitch", "yaw")
+FRAME_FIELDS = ("time", "ned_n", "ned_e", "ned_d", "qw", "qx", "qy", "qz")
+
+
+class TrajectorySource:
+    # 按块读取飞行记录（CSV 或 flight_recorder 二进制），逐块转换为 NED 与四元数
+    # 二进制记录按内存映射读取；CSV 无法随机访问，一次读入回放需要的 7 列后按块切片
+    # 转换结果只保留最近使用的少量数据块
+    def __init__(self, path, chunk_rows=6000, cache_chunks=3):
+        self.path = str(path)
+        self.chunk_rows = int(chunk_rows)
+        self.cache_chunks = cache_chunks
+        self._cache = {}
+        if self.path.endswith(".csv"):
+            import pandas as pd
+            df = pd.read_csv(self.path, usecols=list(REPLAY_COLUMNS))
+            rows = df[list(REPLAY_COLUMNS)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+            # 时间为空或无法解析的行会破坏时间列的单调性，searchsorted 会取错帧
+            self._rows = rows[np.isfinite(rows[:, 0])]
+            self.times = self._rows[:, 0]
+            self._mm = None
+        else:
+            names, self._mm = map_binary(self.path)
+            missing = [c for c in REPLAY_COLUMNS if c not in names]
+            if missing:
+                raise ValueError(f"记录缺少必要列: {missing}")
+            self._cols = [names.index(c) for c in REPLAY_COLUMNS]
+            self.times = np.asarray(self._mm[:, names.index("time")], dtype=np.float64)
+        if len(self.times) == 0:
+            raise ValueError(f"记录没有数据: {self.path}")
+        # 与离线加载一致，参考点取最后一个点
+        last = self._read_rows(len(self.times) - 1, 1)
+        self.frame = LocalFrame(last[0, 1], last[0, 2], last[0, 3])
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def start_time(self):
+        return float(self.times[0])
+
+    @property
+    def end_time(self):
+        return float(self.times[-1])
+
+    def _read_rows(self, start, n):
+        # 返回 REPLAY_COLUMNS 顺序的 (n, 7) 数组
+        if self._mm is not None:
+            return np.asarray(self._mm[start:start + n][:, self._cols], dtype=np.float64)
+        return self._rows[start:start + n]
+
+    def _chunk(self, k):
+        chunk = self._cache.get(k)
+        if chunk is None:
+            # 多读一行，块尾插值不需要加载下一块
+            rows = self._read_rows(k * self.chunk_rows, self.chunk_rows + 1)
+            t, lon, lat, alt, roll, pitch, yaw = rows.T
+            chunk = np.column_stack((t,) + self.frame.convert(lon, lat, alt, roll, pitch, yaw))
+            if len(self._cache) >= self.cache_chunks:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[k] = chunk
+        return chunk
+
+    def sample(self, sim_time, interpolate=True):
+        # 取 sim_time 时刻的位姿；interpolate=False 时取不晚于该时刻的最近一帧
+        i = int(np.searchsorted(self.times, sim_time, side="right")) - 1
+        i = min(max(i, 0), len(self.times) - 1)
+        k, j = divmod(i, self.chunk_rows)
+        chunk = self._chunk(k)
+        row = chunk[j]
+        if not interpolate or j + 1 >= len(chunk):
+            return dict(zip(FRAME_FIELDS, row.tolist()))
+        nxt = chunk[j + 1]
+        dt = nxt[0] - row[0]
+        alpha = 0.0 if dt <= 0 else min(max((sim_time - row[0]) / dt, 0.0), 1.0)
+        out = row + (nxt - row) * alpha
+        # 四元数取短弧后归一化（nlerp）
+        q0, q1 = row[4:], nxt[4:]
+        if np.dot(q0, q1) < 0:
+            q1 = -q1
+        q = q0 + (q1 - q0) * alpha
+        out[4:] = q / np.linalg.norm(q)
+        out[0] = sim_time
+        return dict(zip(FRAME_FIELDS, out.tolist()))
+
+
+class ReplayEngine:
+    # 按记录中的 time 列以指定倍速回放，支持暂停、跳转；以固定帧率取样，快放时自动丢帧，慢放时插值
+    MIN_SPEED = 0.25
+    MAX_SPEED = 50.0
+
+    def __init__(self, source, sink, speed=1.0, fps=60.0, interpolate=True):
+        self.source = source
+        self.sink = sink
+        self.fps = fps
+        self.interpolate = interpolate
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.speed = self._clamp(speed)
+        self.paused = False
+        # 回放时钟锚点：墙钟时刻 _anchor_wall 对应记录时间 _anchor_sim
+        self._anchor_sim = source.start_time
+        self._anchor_wall = time.perf_counter()
+        self.frames_sent = 0
+        self.late_ticks = 0
+
+    def _clamp(self, speed):
+        return min(max(float(speed), self.MIN_SPEED), self.MAX_SPEED)
+
+    def position(self):
+        with self.lock:
+            return self._position(time.perf_counter())
+
+    def _position(self, now):
+        if self.paused:
+            return self._anchor_sim
+        return self._anchor_sim + (now - self._anchor_wall) * self.speed
+
+    def _rebase(self, sim_time):
+        self._anchor_sim = min(max(sim_time, self.source.start_time), self.source.end_time)
+        self._anchor_wall = time.perf_counter()
+
+    def set_speed(self, speed):
+        with self.lock:
+            self._rebase(self._position(time.perf_counter()))
+            self.speed = self._clamp(speed)
+
+    def seek(self, sim_time):
+        with self.lock:
+            self._rebase(sim_time)
+
+    def pause(self):
+        with self.lock:
+            self._rebase(self._position(time.perf_counter()))
+            self.paused = True
+
+    def resume(self):
+        with self.lock:
+            self._rebase(self._anchor_sim)
+            self.paused = False
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        period = 1.0 / self.fps
+        next_tick = time.perf_counter()
+        with self.lock:
+            self._rebase(self._anchor_sim)
+        while not self.stop_event.is_set():
+            t = self.position()
+            end = t >= self.source.end_time
+            self.sink(self.source.sample(min(t, self.source.end_time), self.interpolate))
+            self.frames_sent += 1
+            if end and not self.paused:
+                break
+            # 无漂移定时：按固定节拍推进，落后时跳过错过的节拍
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_ticks += 1
+                next_tick = time.perf_counter()
+        print(f"(REPLAY)回放结束, 已发送{self.frames_sent}帧, 延迟节拍{self.late_ticks}")
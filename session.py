@@ -0,0 +1,333 @@
+import csv
+import hashlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import jsbsim
+import numpy as np
+
+from command_buffer import JournalPlayer, read_journal
+from flight_recorder import map_binary
+from trim import _model_files, apply_solution, config_key
+
+# 可复现的会话记录与重放
+# 记录：AircraftSimulation(session_dir=...) 在会话目录中写入
+#   commands.jnl  实际生效的命令及其仿真步序号（键盘线程、命令服务器、定时命令都经过 CommandBuffer）
+#   golden.bin    逐步的二进制飞行记录（flight_recorder 格式），作为基准
+#   session.json  初始条件、配平解、事件脚本、模型/自动驾驶/初始条件文件的哈希和结束步
+# 重放：新建 FDM，按相同的初始条件和初始化任务运行，命令在记录的仿真步写入，不限速；
+# 模型和命令相同时轨迹与记录逐位一致。修改 c310ap.xml 等文件后重放，compare_logs 给出各通道首次超出容差的时刻
+# 注意：复用 FDM（reset_to_initial_conditions）的结果与新加载有 1e-8 量级的差别，重放总是新建 FDM
+SESSION_VERSION = 1
+MANIFEST = "session.json"
+JOURNAL = "commands.jnl"
+GOLDEN_LOG = "golden.bin"
+
+# 各通道的默认容差（绝对值），未列出的通道使用 compare_logs 的 default_tol
+DEFAULT_TOLERANCES = {
+    "altitude_ft": 1.0,
+    "lat_deg": 1e-5,
+    "lon_deg": 1e-5,
+    "vc_kts": 0.5,
+    "roll": 1.0,
+    "pitch": 0.5,
+    "yaw": 1.0,
+}
+# 按圆周计算差值的角度通道
+ANGLE_CHANNELS = ("roll", "pitch", "yaw")
+REPORT_FIELDS = ("session", "status", "changed", "steps", "golden_steps", "end_time", "golden_end_time",
+                 "first_time", "first_channel", "worst_channel", "worst_ratio", "wall_time", "error")
+
+
+def _sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def config_files(fdm, model, init_xml, scripts=()):
+    # 决定仿真结果的配置文件 -> 哈希：飞机模型及其系统/自动驾驶文件、初始条件、事件脚本
+    files = _model_files(fdm.get_full_aircraft_path(), model) + [init_xml] + list(scripts)
+    return {os.path.abspath(p): _sha1(p) for p in files}
+
+
+def write_manifest(sim, model="c310"):
+    # 由 AircraftSimulation.run_simulation 在结束时调用
+    events = sim.events
+    recorder = sim.outputs["recorder"]
+    manifest = {
+        "version": SESSION_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "jsbsim": jsbsim.__version__,
+        "model": model,
+        "dt": sim.fdm.get_delta_t(),
+        "init_xml": os.path.abspath(sim.init_xml),
+        "ic": sim.ic,
+        "state_fields": [list(f) for f in sim.state_fields],
+        "trim": sim.trim_solution,
+        "initial_work": getattr(sim, "initial_work", "initial_work1"),
+        "max_time": sim.max_time,
+        "events": [os.path.abspath(p) for p in events.sources] if events is not None else [],
+        "events_total": len(events.events) if events is not None else 0,
+        "main_script": sim.main_script is not None,
+        "recorder": {"rate": recorder.rate, "mode": recorder.mode},
+        "config_key": config_key(sim.fdm.get_full_aircraft_path(), model, sim.init_xml),
+        "files": config_files(sim.fdm, model, sim.init_xml, events.sources if events is not None else ()),
+        "journal": os.path.basename(sim.commands.journal_file or ""),
+        "log": os.path.basename(sim.recorder.bin_file or ""),
+        "commands": sim.commands.applied,
+        "steps": sim.step,
+        "end_time": sim.sim_time,
+    }
+    path = os.path.join(sim.session_dir, MANIFEST)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_manifest(session_dir):
+    with open(os.path.join(session_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SESSION_VERSION:
+        raise ValueError(f"不支持的会话版本: {manifest.get('version')}")
+    return manifest
+
+
+def changed_files(manifest):
+    # 与记录时相比内容变化或缺失的配置文件
+    changed = []
+    for path, digest in manifest["files"].items():
+        if not os.path.exists(path) or _sha1(path) != digest:
+            changed.append(path)
+    return changed
+
+
+class RecordedTrim:
+    # 重放时直接写入记录的配平解，接口与 trim.TrimCache 一致
+    def __init__(self, solution):
+        self.solution = solution
+
+    def apply(self, fdm):
+        return apply_solution(fdm, self.solution)
+
+
+def replay(session_dir, log_bin=None, log_csv=None, journal_file=None, ic=None, setup=None, max_time=None):
+    # 无界面全速重放一个会话，返回仿真对象；log_bin/log_csv 为重放的飞行记录
+    # ic: 在记录的初始条件上覆盖；setup(sim): 运行前调用，用于恢复记录时在 Python 中添加的事件或 main_script
+    from fcs_core import AircraftSimulation
+    manifest = load_manifest(session_dir)
+    journal = os.path.join(session_dir, manifest["journal"]) if manifest["journal"] else None
+    commands = read_journal(journal) if journal and os.path.exists(journal) else []
+    sim = AircraftSimulation(
+        max_time=manifest["max_time"] if max_time is None else max_time,
+        init_xml=manifest["init_xml"],
+        log_csv=log_csv,
+        log_bin=log_bin,
+        state_fields=[tuple(f) for f in manifest["state_fields"]],
+        ic=dict(manifest["ic"], **(ic or {})),
+        trim=RecordedTrim(manifest["trim"]) if manifest["trim"] else None,
+    )
+    sim.print_enable = False
+    sim.commands = JournalPlayer(sim.fdm, commands, journal_file=journal_file)
+    sim.profiler.gauges["command_pending"] = sim.commands.pending
+    rec = manifest["recorder"]
+    sim.set_output_rate("recorder", rec["rate"], rec["mode"])
+    for path in manifest["events"]:
+        sim.load_events(path)
+    if setup is not None:
+        setup(sim)
+    loaded = len(sim.events.events) if sim.events is not None else 0
+    if loaded < manifest["events_total"] or (manifest["main_script"] and sim.main_script is None):
+        print(f"(SESSION){session_dir}: 记录时有在 Python 中添加的事件或 main_script，需通过 setup 恢复，否则轨迹会不同")
+    initial_work = manifest["initial_work"]
+    sim.run_simulation(initial_work=initial_work)
+    return sim
+
+
+# ---------- 对比 ----------
+def _load_log(path):
+    # 返回 (列名, 二维数组)
+    path = str(path)
+    if path.endswith(".csv"):
+        import pandas as pd
+        df = pd.read_csv(path)
+        return tuple(df.columns), df.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    names, data = map_binary(path)
+    return tuple(names), np.asarray(data)
+
+
+def compare_logs(golden, replayed, tolerances=None, default_tol=1e-6):
+    # 对比两条飞行记录（文件路径或 (列名, 数组)），各通道按容差判断，整表一次向量化计算
+    # 按时间对齐：两条记录的时间在 1e-9 秒内一致的行参与比较；未参与比较的尾部视为长度不一致
+    # 返回 {"status": "exact" / "within_tol" / "diverged", "first_time", "first_channel", "channels": {...}}
+    g_names, g = _load_log(golden) if isinstance(golden, (str, os.PathLike)) else golden
+    r_names, r = _load_log(replayed) if isinstance(replayed, (str, os.PathLike)) else replayed
+    if "time" not in g_names or "time" not in r_names:
+        raise ValueError("记录缺少 time 列")
+    tol = dict(DEFAULT_TOLERANCES, **(tolerances or {}))
+    channels = [n for n in g_names if n in r_names and n != "time"]
+    gt = g[:, g_names.index("time")]
+    rt = r[:, r_names.index("time")]
+    n = min(len(gt), len(rt))
+    if n and np.array_equal(gt[:n], rt[:n]):
+        gi = ri = np.arange(n)
+    else:
+        # 输出频率不同等情况：按时间查找匹配的行
+        j = np.clip(np.searchsorted(rt, gt), 0, max(len(rt) - 1, 0))
+        ok = np.abs(rt[j] - gt) <= 1e-9 if len(rt) else np.zeros(len(gt), dtype=bool)
+        gi = np.flatnonzero(ok)
+        ri = j[ok]
+    times = gt[gi]
+    G = g[np.ix_(gi, [g_names.index(c) for c in channels])]
+    R = r[np.ix_(ri, [r_names.index(c) for c in channels])]
+    diff = np.abs(R - G)
+    angles = [k for k, c in enumerate(channels) if c in ANGLE_CHANNELS]
+    if angles:
+        diff[:, angles] = np.abs((diff[:, angles] + 180.0) % 360.0 - 180.0)
+    # NaN 只与 NaN 视为一致
+    both_nan = np.isnan(R) & np.isnan(G)
+    diff = np.where(both_nan, 0.0, np.where(np.isnan(diff), np.inf, diff))
+    limits = np.array([tol.get(c, default_tol) for c in channels], dtype=np.float64)
+    exceed = diff > limits
+    any_exceed = exceed.any(axis=0)
+    first_row = np.where(any_exceed, exceed.argmax(axis=0), -1)
+    count = max(len(times), 1)
+    max_diff = diff.max(axis=0) if len(times) else np.zeros(len(channels))
+    rms = np.sqrt((diff * diff).sum(axis=0) / count) if len(times) else np.zeros(len(channels))
+    result = {
+        "rows": len(times),
+        "golden_rows": len(gt),
+        "replay_rows": len(rt),
+        "golden_end_time": float(gt[-1]) if len(gt) else float("nan"),
+        "end_time": float(rt[-1]) if len(rt) else float("nan"),
+        "channels": {},
+        "first_time": None,
+        "first_channel": None,
+    }
+    for k, c in enumerate(channels):
+        result["channels"][c] = {"max": float(max_diff[k]), "rms": float(rms[k]), "tol": float(limits[k]),
+                                 "first_time": float(times[first_row[k]]) if first_row[k] >= 0 else None}
+    if any_exceed.any():
+        k = int(np.argmin(np.where(any_exceed, first_row, np.iinfo(np.int64).max)))
+        result["first_time"] = float(times[first_row[k]])
+        result["first_channel"] = channels[k]
+    ratio = np.where(limits > 0, max_diff / np.where(limits > 0, limits, 1.0), np.where(max_diff > 0, np.inf, 0.0))
+    if len(channels):
+        k = int(np.argmax(ratio))
+        result["worst_channel"], result["worst_ratio"] = channels[k], float(ratio[k])
+    same_length = len(gt) == len(rt) == len(times)
+    if any_exceed.any() or not same_length:
+        result["status"] = "diverged"
+        if result["first_time"] is None:
+            # 各通道都在容差内但提前或推迟结束（如着陆判断的时刻不同）
+            result["first_time"] = float(times[-1]) if len(times) else 0.0
+            result["first_channel"] = "length"
+    elif (max_diff == 0).all():
+        result["status"] = "exact"
+    else:
+        result["status"] = "within_tol"
+    return result
+
+
+# ---------- 批量重放 ----------
+def _replay_one(args):
+    session_dir, out_dir, tolerances = args
+    start = time.perf_counter()
+    name = os.path.basename(os.path.normpath(session_dir))
+    result = {"session": name, "status": "error", "error": ""}
+    try:
+        manifest = load_manifest(session_dir)
+        result["changed"] = ";".join(os.path.basename(p) for p in changed_files(manifest))
+        result["golden_steps"] = manifest["steps"]
+        log_bin = os.path.join(out_dir, f"{name}.bin")
+        sim = replay(session_dir, log_bin=log_bin)
+        result["steps"] = sim.step
+        cmp = compare_logs(os.path.join(session_dir, manifest["log"]), log_bin, tolerances)
+        for key in ("status", "first_time", "first_channel", "worst_channel", "worst_ratio", "end_time",
+                    "golden_end_time"):
+            result[key] = cmp.get(key)
+        result["channels"] = cmp["channels"]
+    except Exception:
+        result["error"] = traceback.format_exc(limit=3).strip().replace("\n", " | ")
+    result["wall_time"] = time.perf_counter() - start
+    return result
+
+
+def replay_many(session_dirs, out_dir="replays", tolerances=None, workers=None, report_csv=None):
+    # 重放多个会话并与各自的基准对比，每个工作进程依次重放（每个会话新建 FDM 保证逐位可复现）
+    # 返回与 session_dirs 顺序一致的结果列表，report_csv 不为空时写入汇总表
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(d, out_dir, tolerances) for d in session_dirs]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_replay_one, jobs))
+    else:
+        results = [_replay_one(job) for job in jobs]
+    if report_csv:
+        with open(report_csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, REPORT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(results)
+    return results
+
+
+def find_sessions(paths):
+    # 接受会话目录或包含多个会话目录的上级目录
+    found = []
+    for p in paths:
+        if os.path.exists(os.path.join(p, MANIFEST)):
+            found.append(p)
+        elif os.path.isdir(p):
+            found.extend(sorted(os.path.join(p, d) for d in os.listdir(p)
+                                if os.path.exists(os.path.join(p, d, MANIFEST))))
+    return found
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="重放记录的会话并与基准对比")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_replay = sub.add_parser("replay", help="批量重放会话")
+    p_replay.add_argument("sessions", nargs="+", help="会话目录或其上级目录")
+    p_replay.add_argument("--out", default="replays")
+    p_replay.add_argument("--workers", type=int, default=None)
+    p_replay.add_argument("--report", help="汇总表 CSV")
+    p_compare = sub.add_parser("compare", help="对比两条飞行记录")
+    p_compare.add_argument("golden")
+    p_compare.add_argument("replayed")
+    for p in (p_replay, p_compare):
+        p.add_argument("--tol", action="append", default=[], help="通道容差，如 altitude_ft=2.0")
+    args = parser.parse_args()
+    tolerances = {}
+    for item in args.tol:
+        name, _, value = item.partition("=")
+        tolerances[name] = float(value)
+
+    if args.cmd == "compare":
+        print(json.dumps(compare_logs(args.golden, args.replayed, tolerances), indent=2, ensure_ascii=False))
+    else:
+        sessions = find_sessions(args.sessions)
+        if not sessions:
+            raise ValueError(f"没有找到会话: {args.sessions}")
+        start = time.perf_counter()
+        results = replay_many(sessions, args.out, tolerances, args.workers, args.report)
+        for r in results:
+            changed = f", 已修改: {r['changed']}" if r.get("changed") else ""
+            if r["status"] == "error":
+                print(f"(REPLAY){r['session']}: 错误 {r['error']}")
+            elif r["status"] == "diverged":
+                print(f"(REPLAY){r['session']}: 在 {r['first_time']:.3f}s 偏离 ({r['first_channel']}), "
+                      f"最大超差 {r['worst_channel']} x{r['worst_ratio']:.1f}{changed}")
+            else:
+                print(f"(REPLAY){r['session']}: {r['status']}, 最大偏差/容差 {r['worst_channel']} "
+                      f"x{r['worst_ratio']:.2f}{changed}")
+        counts = {}
+        for r in results:
+            counts[r["status"]] = counts.get(r["status"], 0) + 1
+        print(f"(REPLAY){len(results)} 个会话, 耗时 {time.perf_counter() - start:.1f}s, {counts}")
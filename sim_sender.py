@@ -0,0 +1,142 @@
+import errno
+import json
+import socket
+import threading
+from collections import deque
+
+from telemetry import FRAME_FIELDS, MAX_BATCH, MAX_VEHICLES, encode_fleet, encode_frames
+
+# UDP 状态发送端，只依赖标准库，仿真节点无需安装 AirSim / pandas / matplotlib
+
+
+class SimDataSender:
+    # encoding: "binary" 为定长二进制帧（带序号），"json" 为旧版逐帧JSON
+    # batch: 每个数据报打包的帧数，>1 时可减少发送次数，代价是增加batch-1帧的延迟
+    # async_mode: 仿真线程只把帧放入有界队列，由后台线程发送；队列满时丢弃最旧的帧
+    # coalesce: 后台线程积压多帧时只发送最新一帧
+    def __init__(self, host='127.0.0.1', port=5555, encoding="binary", batch=1,
+                 async_mode=False, queue_size=64, coalesce=True):
+        if encoding not in ("binary", "json"):
+            raise ValueError(f"未知的编码方式: {encoding}")
+        self.addr = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.encoding = encoding
+        self.batch = max(1, min(int(batch), MAX_BATCH))
+        self.seq = 0
+        self.pending = []
+
+        # 发送统计
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+
+        self.async_mode = async_mode
+        self.coalesce = coalesce
+        self.queue = deque(maxlen=queue_size)
+        # 队列、丢弃计数和序号由仿真线程和发送线程共同修改，统一用此锁保护
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        if async_mode:
+            self._thread = threading.Thread(target=self._send_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread:
+            # 异步模式下最后的发送和关闭套接字由发送线程完成，主线程不与它同时操作队列和套接字
+            self._stop_event.set()
+            self._wake.set()
+            self._thread.join(1.0)
+            if self._thread.is_alive():
+                print("(UDP)发送线程仍在发送剩余数据，退出后自动关闭套接字")
+        else:
+            self.flush()
+            self.sock.close()
+        print(f"已关闭UDP发送端, 发送:{self.sent}, 丢弃:{self.dropped}, 合并:{self.coalesced}, 错误:{self.errors}")
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "queued": len(self.queue),
+        }
+
+    def send_udp(self, msg):
+        if self.async_mode:
+            # 满时挤掉最旧的一帧
+            with self._lock:
+                if len(self.queue) == self.queue.maxlen:
+                    self.dropped += 1
+                self.queue.append(msg)
+            self._wake.set()
+            return
+        self._emit(msg)
+
+    def send_fleet(self, sim_time, ids, values):
+        # 多机：同一时刻所有飞机的状态编码为一个数据报（超过 MAX_VEHICLES 时分成多个），values 为 N x VEHICLE_FIELDS
+        # 在调用线程中编码，values 之后可被修改；异步模式下整组数据报作为一项入队，合并时不会被拆开
+        datagrams = []
+        for i in range(0, len(ids), MAX_VEHICLES):
+            datagrams.append(encode_fleet(self._next_seq(), sim_time, ids[i:i + MAX_VEHICLES],
+                                          values[i:i + MAX_VEHICLES]))
+        self.send_udp(tuple(datagrams))
+
+    def _next_seq(self):
+        # 多机数据报在仿真线程编号，单机帧在发送线程编号，共用一个序号
+        with self._lock:
+            seq = self.seq
+            self.seq += 1
+        return seq
+
+    def _send_loop(self):
+        while True:
+            self._wake.wait(0.1)
+            self._wake.clear()
+            with self._lock:
+                msgs = list(self.queue)
+                self.queue.clear()
+            if self.coalesce and len(msgs) > 1:
+                self.coalesced += len(msgs) - 1
+                msgs = msgs[-1:]
+            for msg in msgs:
+                self._emit(msg)
+            # 异步模式下不等待凑满batch，发送当前已有的帧
+            self.flush()
+            if self._stop_event.is_set() and not self.queue:
+                break
+        self.sock.close()
+
+    def _emit(self, msg):
+        if isinstance(msg, tuple):
+            # 已编码的多机数据报
+            for data in msg:
+                self._send(data)
+            return
+        if self.encoding == "json":
+            self._send((json.dumps(msg) + "\n").encode('utf-8'))
+            return
+        self.pending.append((self._next_seq(), [msg.get(k, 0.0) for k in FRAME_FIELDS]))
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            data = encode_frames(self.pending)
+            self.pending = []
+            self._send(data)
+
+    def _send(self, data):
+        try:
+            self.sock.sendto(data, self.addr)
+            self.sent += 1
+        except OSError as e:
+            self.errors += 1
+            # 服务端未启动时静默跳过
+            if e.errno in (errno.ECONNREFUSED, 10061, 10054, 111):
+                pass
+            else:
+                print(f"发送异常: {e}")
@@ -0,0 +1,219 @@
+import json
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+# 共享内存状态总线：仿真每步写入一帧状态，同机的任意多个进程（规划、HUD、记录）直接读取，
+# 不经过 UDP 编解码和内核收发，也不需要为每个读取方分配端口；只依赖标准库
+# 写入端是唯一的，用顺序锁（seqlock）保证一致性：
+#   写入前序号加一（奇数表示正在写），写完再加一；读取方在读数据前后各读一次序号，
+#   两次相同且为偶数时数据完整，否则重读；读取方不加锁，也不会阻塞写入端
+# 内存布局（little-endian）：
+#   头部 = 魔数 b"SBUS" + 版本(uint16) + 字段数(uint16) + 状态(uint32) + 序号(uint64) + 帧号(uint64)
+#          + 字段表长度(uint32) + 写入进程 PID(uint32)
+#   字段表 = 字段名 JSON（按 8 字节对齐）
+#   数据 = 字段数 x float64
+MAGIC = b"SBUS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQQII")
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 12
+FRAME_OFFSET = 20
+STATUS_OFFSET = 8
+STATUS = struct.Struct("<I")
+PID_OFFSET = 32
+# 状态：写入中 / 已关闭（仿真结束）
+RUNNING = 1
+CLOSED = 2
+DEFAULT_NAME = "jsbsim_state"
+# 本进程创建的共享内存名称
+_created = set()
+
+
+class StateBus:
+    # 写入端：names 为字段名（第0个一般为 time），name 为共享内存名称
+    # 同名的块只有在已关闭或写入进程已退出时才会被回收，否则报错，需换一个 name
+    def __init__(self, names, name=DEFAULT_NAME):
+        self.names = tuple(names)
+        schema = json.dumps(self.names).encode("utf-8")
+        schema_size = (len(schema) + 7) // 8 * 8
+        self._data_offset = HEADER.size + schema_size
+        size = self._data_offset + 8 * len(self.names)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 上次运行异常退出后残留的同名共享内存；仍在写入的块不能删除
+            stale = _attach(name)
+            try:
+                if not _reclaimable(stale.buf):
+                    raise ValueError(f"共享内存 {name} 正被其他仿真使用，请为 StateBus 指定不同的 name")
+            finally:
+                stale.close()
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+        _created.add(self.name)
+        buf = self.shm.buf
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, len(self.names), RUNNING, 0, 0, len(schema), os.getpid())
+        buf[HEADER.size:HEADER.size + len(schema)] = schema
+        self._data = buf[self._data_offset:size].cast("d")
+        self.seq = 0
+        self.frames = 0
+        self._count = len(self.names)
+
+    def publish(self, values):
+        # 每步调用一次；values 的长度须与 names 一致
+        buf = self.shm.buf
+        self.seq += 1
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq)
+        self._data[:] = _as_doubles(values, self._count)
+        self.frames += 1
+        SEQ.pack_into(buf, FRAME_OFFSET, self.frames)
+        self.seq += 1
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        # 标记为已关闭并删除共享内存名称，已连接的读取方仍可读到最后一帧
+        if self.shm is None:
+            return
+        STATUS.pack_into(self.shm.buf, STATUS_OFFSET, CLOSED)
+        self._data.release()
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        _created.discard(self.name)
+        self.shm = None
+
+
+def _reclaimable(buf):
+    # 已关闭，或写入进程已不存在；不是状态总线的块不动
+    if len(buf) < HEADER.size or bytes(buf[:4]) != MAGIC:
+        return False
+    if STATUS.unpack_from(buf, STATUS_OFFSET)[0] == CLOSED:
+        return True
+    pid = STATUS.unpack_from(buf, PID_OFFSET)[0]
+    if os.name != "posix" or not pid:
+        # Windows 下最后一个句柄关闭时共享内存即被释放，能打开说明写入端仍在
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def _as_doubles(values, count):
+    # memoryview 的切片赋值需要同类型缓冲区
+    if len(values) != count:
+        raise ValueError(f"状态长度应为 {count}，实际为 {len(values)}")
+    return memoryview(struct.pack(f"<{count}d", *values)).cast("d")
+
+
+def _attach(name):
+    # 读取方只连接不负责删除：避免 Python 的 resource_tracker 在读取进程退出时删除共享内存
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        # 同一进程中创建的共享内存由写入端负责删除
+        if os.name == "posix" and shm.name not in _created:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class StateBusReader:
+    # 读取端：read() 返回最新一帧，wait() 等待下一帧；可在任意进程中创建多个
+    # poll: 等待新帧时的轮询间隔(秒)
+    def __init__(self, name=DEFAULT_NAME, timeout=5.0, poll=0.0005):
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                self.shm = _attach(name)
+                break
+            except FileNotFoundError:
+                # 仿真可能还未启动
+                if time.perf_counter() >= deadline:
+                    raise
+                time.sleep(0.05)
+        buf = self.shm.buf
+        magic, version, count, _, _, _, schema_size, _ = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError(f"共享内存 {name} 不是状态总线")
+        if version != VERSION:
+            raise ValueError(f"不支持的状态总线版本: {version}")
+        self.names = tuple(json.loads(bytes(buf[HEADER.size:HEADER.size + schema_size]).decode("utf-8")))
+        self.index = {n: i for i, n in enumerate(self.names)}
+        offset = HEADER.size + (schema_size + 7) // 8 * 8
+        self._data = buf[offset:offset + 8 * count].cast("d")
+        self.poll = poll
+        # 最近读到的帧号，以及读到写入中的数据而重读的次数
+        self.frame = 0
+        self.retries = 0
+        self.missed = 0
+
+    @property
+    def closed(self):
+        return STATUS.unpack_from(self.shm.buf, STATUS_OFFSET)[0] == CLOSED
+
+    def latest_frame(self):
+        return SEQ.unpack_from(self.shm.buf, FRAME_OFFSET)[0]
+
+    def read(self):
+        # 返回最新一帧 (帧号, 数值元组)，写入端尚未写入时返回 (0, None)
+        buf = self.shm.buf
+        while True:
+            before = SEQ.unpack_from(buf, SEQ_OFFSET)[0]
+            if before & 1:
+                # 写入端正在写，让出时间片
+                self.retries += 1
+                time.sleep(0)
+                continue
+            values = tuple(self._data)
+            frame = SEQ.unpack_from(buf, FRAME_OFFSET)[0]
+            if SEQ.unpack_from(buf, SEQ_OFFSET)[0] == before:
+                break
+            self.retries += 1
+        if frame == 0:
+            return 0, None
+        if self.frame and frame > self.frame + 1:
+            self.missed += frame - self.frame - 1
+        self.frame = frame
+        return frame, values
+
+    def read_dict(self):
+        _, values = self.read()
+        return None if values is None else dict(zip(self.names, values))
+
+    def wait(self, timeout=None):
+        # 等待比上次读取更新的一帧并返回数值元组；超时或写入端已关闭且没有新帧时返回 None
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.latest_frame() <= self.frame:
+            if self.closed or (deadline is not None and time.perf_counter() >= deadline):
+                return None
+            time.sleep(self.poll)
+        return self.read()[1]
+
+    def __iter__(self):
+        # 逐帧迭代直到写入端关闭；读取慢于写入时跳过中间帧（见 missed）
+        while True:
+            values = self.wait(1.0)
+            if values is None:
+                if self.closed:
+                    return
+                continue
+            yield values
+
+    def close(self):
+        self._data.release()
+        self.shm.close()
+
+    def stats(self):
+        return {"frame": self.frame, "retries": self.retries, "missed": self.missed}
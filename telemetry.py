@@ -0,0 +1,141 @@
+import json
+import struct
+from collections import deque
+
+# 遥测二进制帧格式（little-endian）：
+# 数据报头 = 魔数 b"TM" + 版本(uint8) + 帧数(uint8)
+# 每帧    = 序号(uint32) + 仿真时间(float64) + FRAME_FIELDS 中除 time 外的各字段(float64)
+MAGIC = b"TM"
+VERSION = 1
+FRAME_FIELDS = ("time", "longitude", "latitude", "altitude", "speed", "roll", "pitch", "yaw")
+MAX_BATCH = 255
+
+HEADER = struct.Struct("<2sBB")
+FRAME = struct.Struct("<I" + "d" * len(FRAME_FIELDS))
+SEQ_MOD = 1 << 32
+# 记录为丢失的序号最多保留这么多个，更早的序号迟到时按重复帧计数
+MISSING_WINDOW = 4096
+
+# 多机数据报（一个数据报为同一仿真时刻所有飞机的状态）：
+# 数据报头 = 魔数 b"TF" + 版本(uint8) + 保留(uint8) + 飞机数(uint16) + 序号(uint32) + 仿真时间(float64)
+# 之后为 飞机编号(uint16) x N，再按行排列 N x VEHICLE_FIELDS 的 float64
+FLEET_MAGIC = b"TF"
+VEHICLE_FIELDS = FRAME_FIELDS[1:]
+FLEET_HEADER = struct.Struct("<2sBBHId")
+# 单个 UDP 数据报不超过 65507 字节
+MAX_VEHICLES = (65507 - FLEET_HEADER.size) // (2 + 8 * len(VEHICLE_FIELDS))
+
+
+def encode_frames(frames):
+    # frames: [(seq, values), ...]，values 按 FRAME_FIELDS 顺序排列
+    if len(frames) > MAX_BATCH:
+        raise ValueError(f"单个数据报最多 {MAX_BATCH} 帧")
+    parts = [HEADER.pack(MAGIC, VERSION, len(frames))]
+    for seq, values in frames:
+        parts.append(FRAME.pack(seq % SEQ_MOD, *values))
+    return b"".join(parts)
+
+
+def encode_fleet(seq, sim_time, ids, values):
+    # ids: 飞机编号序列；values: N x VEHICLE_FIELDS 的行序列，或 float64 的 C 连续 numpy 数组（直接拷贝内存）
+    n = len(ids)
+    if n > MAX_VEHICLES:
+        raise ValueError(f"单个数据报最多 {MAX_VEHICLES} 架飞机")
+    parts = [FLEET_HEADER.pack(FLEET_MAGIC, VERSION, 0, n, seq % SEQ_MOD, sim_time), struct.pack(f"<{n}H", *ids)]
+    if hasattr(values, "tobytes"):
+        body = values.tobytes()
+    else:
+        body = struct.pack(f"<{n * len(VEHICLE_FIELDS)}d", *(v for row in values for v in row))
+    if len(body) != n * 8 * len(VEHICLE_FIELDS):
+        raise ValueError(f"飞机状态应为 {n} x {len(VEHICLE_FIELDS)}")
+    parts.append(body)
+    return b"".join(parts)
+
+
+def decode_fleet(data):
+    # 返回 (序号, 仿真时间, [(飞机编号, values), ...])
+    magic, version, _, n, seq, sim_time = FLEET_HEADER.unpack_from(data)
+    if magic != FLEET_MAGIC:
+        raise ValueError("不是多机遥测数据报")
+    if version != VERSION:
+        raise ValueError(f"不支持的遥测帧版本: {version}")
+    width = len(VEHICLE_FIELDS)
+    if len(data) != FLEET_HEADER.size + n * (2 + 8 * width):
+        raise ValueError(f"遥测数据报长度错误: {len(data)}")
+    ids = struct.unpack_from(f"<{n}H", data, FLEET_HEADER.size)
+    flat = struct.unpack_from(f"<{n * width}d", data, FLEET_HEADER.size + 2 * n)
+    return seq, sim_time, [(ids[i], flat[i * width:(i + 1) * width]) for i in range(n)]
+
+
+def decode_frames(data):
+    # 返回 [(seq, values), ...]；JSON 数据报（旧版发送端）按单帧处理，序号为 None
+    if data[:2] != MAGIC:
+        msg = json.loads(data.decode("utf-8"))
+        return [(None, tuple(float(msg.get(k, 0.0)) for k in FRAME_FIELDS))]
+    magic, version, count = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"不支持的遥测帧版本: {version}")
+    if len(data) != HEADER.size + count * FRAME.size:
+        raise ValueError(f"遥测数据报长度错误: {len(data)}")
+    frames = []
+    for k in range(count):
+        seq, *values = FRAME.unpack_from(data, HEADER.size + k * FRAME.size)
+        frames.append((seq, tuple(values)))
+    return frames
+
+
+class TelemetryDecoder:
+    # 解码数据报并统计丢包、乱序与重复，过期（乱序到达或重复）的帧不再返回
+    def __init__(self):
+        self.expected = None
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+        self.duplicates = 0
+        # 已按丢失计数、可能迟到的序号
+        self._missing = set()
+        self._missing_order = deque()
+
+    def _accept(self, seq):
+        # 按序号统计丢包和乱序，迟到的帧返回 False
+        self.received += 1
+        if seq is None:
+            return True
+        if self.expected is not None:
+            gap = (seq - self.expected) % SEQ_MOD
+            if gap >= SEQ_MOD // 2:
+                # 比期望序号小：之前按丢失计数的是迟到的帧，否则是重复的帧
+                if seq in self._missing:
+                    self._missing.discard(seq)
+                    self.reordered += 1
+                    self.lost -= 1
+                else:
+                    self.duplicates += 1
+                return False
+            self.lost += gap
+            for k in range(max(0, gap - MISSING_WINDOW), gap):
+                missing = (self.expected + k) % SEQ_MOD
+                self._missing.add(missing)
+                self._missing_order.append(missing)
+            while len(self._missing_order) > MISSING_WINDOW:
+                self._missing.discard(self._missing_order.popleft())
+        self.expected = (seq + 1) % SEQ_MOD
+        return True
+
+    def decode(self, data):
+        frames = []
+        for seq, values in decode_frames(data):
+            if self._accept(seq):
+                frames.append(dict(zip(FRAME_FIELDS, values)))
+        return frames
+
+    def decode_fleet(self, data):
+        # 多机数据报，返回 (仿真时间, [(飞机编号, 状态字典), ...])，迟到的数据报返回 None
+        seq, sim_time, vehicles = decode_fleet(data)
+        if not self._accept(seq):
+            return None
+        return sim_time, [(vid, dict(zip(VEHICLE_FIELDS, values), time=sim_time)) for vid, values in vehicles]
+
+    def stats(self):
+        return {"received": self.received, "lost": self.lost, "reordered": self.reordered,
+                "duplicates": self.duplicates}
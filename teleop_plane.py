@@ -2,7 +2,9 @@ import threading
 import time
 from pynput import keyboard
 from fcs_core import AircraftSimulation
-from flight_visualizer import PlotVisualizer, SimDataSender
+from sim_sender import SimDataSender
+from command_server import CommandServer
+from state_bus import StateBusReader
 # 键盘控制说明：
 # r 控制自动驾驶速度保持开关
 # q e 控制自动驾驶保持速度 增减
@@ -16,6 +18,8 @@ from flight_visualizer import PlotVisualizer, SimDataSender
 # 全局变量，存储当前的键盘状态（最新输入）
 current_key = None
 lock = threading.Lock()
+# 最新的仿真状态，由 get_states_from_jsbsim 线程更新
+latest_state = {}
 
 class FlightVariable:
     def __init__(self, simulation, name, min=0.0, max=1.0, step=0.05, initial=0.0):
@@ -42,11 +46,18 @@ class FlightVariable:
     def decrease(self):
         self.value -= self.step
 
-bro = SimDataSender()
+# 异步发送：网络或UE端卡顿时不阻塞仿真线程
+bro = SimDataSender(async_mode=True)
 csv_file = "c310_teleop.csv"
-sim = AircraftSimulation(max_time=300.0, log_csv=csv_file, broadcaster=bro)
+# 按真实时间推进，仿真速度不随机器负载变化
+# 状态同时写入共享内存状态总线，本机的规划/HUD等进程用 StateBusReader() 读取
+# 每次飞行记录为一个会话（命令按生效的仿真步记录），可用 python session.py replay sessions/ 无界面重放和对比
+sim = AircraftSimulation(max_time=300.0, log_csv=csv_file, broadcaster=bro, realtime_factor=1.0, state_bus=True,
+                         session_dir=time.strftime("sessions/%Y%m%d_%H%M%S"))
 # 仿真状态实时打印开关
 sim.print_enable = False
+# UE帧率有限，广播频率不必跟随120Hz仿真步长
+sim.set_output_rate("broadcaster", 60.0)
 
 throttle0 = FlightVariable(simulation=sim, name="fcs/throttle-cmd-norm[0]", min=0.0, max=1.0, step=0.01, initial=0.954)
 throttle1 = FlightVariable(simulation=sim, name="fcs/throttle-cmd-norm[1]", min=0.0, max=1.0, step=0.01, initial=0.954)
@@ -141,7 +152,12 @@ def set_controls_to_jsbsim():
         time.sleep(0.05)
 
 def get_states_from_jsbsim():
-    pass
+    reader = StateBusReader(sim.state_bus.name)
+    # 逐帧读取直到仿真结束
+    for values in reader:
+        with lock:
+            latest_state.update(zip(reader.names, values))
+    reader.close()
 
 def main():
     key_t = threading.Thread(target=keyboard_listener, daemon=True)
@@ -150,10 +166,17 @@ def main():
     key_t.start()
     in_t.start()
     out_t.start()
-    sim.run_simulation(initial_work="initial_work1")
+    # 外部程序通过 TCP:5600 / UDP:5601 写入 fcs/*、ap/* 属性并订阅状态
+    server = CommandServer(sim).start()
+    try:
+        sim.run_simulation(initial_work="initial_work1")
+    finally:
+        server.stop()
 
 if __name__ == "__main__":
     main()
+    # 绘图依赖 pandas/matplotlib，仿真结束后再导入
+    from flight_visualizer import PlotVisualizer
     csv_vis = PlotVisualizer(csv_file)
     csv_vis.plot(
     y_columns=['altitude_ft','vc_kts'],
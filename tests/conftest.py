@@ -0,0 +1,15 @@
+import pytest
+
+# 在仓库根目录运行：python -m pytest -q tests
+
+
+@pytest.fixture
+def c310():
+    # 已加载 lyj_init 初始条件的 c310 FDM
+    jsbsim = pytest.importorskip("jsbsim")
+    fdm = jsbsim.FGFDMExec(root_dir=None)
+    fdm.set_debug_level(0)
+    fdm.load_model("c310")
+    fdm.load_ic("./lyj_init.xml", True)
+    fdm.run_ic()
+    return fdm
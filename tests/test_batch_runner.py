@@ -0,0 +1,59 @@
+import csv
+import math
+
+import pytest
+
+from batch_runner import BatchRunner, _init_worker, load_scenarios, run_scenario
+
+SPARSE_CSV = """run_id,ic/vc-kts,ap/airspeed_setpoint,ap/airspeed_hold,max_time,script
+a,110,,,2,
+b,,150,1,,
+3,120,160,1,1.5,
+"""
+
+
+def test_load_scenarios_drops_blank_cells(tmp_path):
+    path = tmp_path / "scenarios.csv"
+    path.write_text(SPARSE_CSV)
+    rows = load_scenarios(str(path))
+    assert [r["run_id"] for r in rows] == ["a", "b", "3"]
+    assert rows[0] == {"run_id": "a", "ic/vc-kts": 110.0, "max_time": 2.0}
+    assert rows[1] == {"run_id": "b", "ap/airspeed_setpoint": 150.0, "ap/airspeed_hold": 1.0}
+    for row in rows:
+        assert not any(isinstance(v, float) and math.isnan(v) for v in row.values())
+        assert "script" not in row
+
+
+def test_load_scenarios_dicts_and_dataframe():
+    pd = pytest.importorskip("pandas")
+    records = [{"ic/vc-kts": 110, "script": None}, {"ap/airspeed_setpoint": 150.0, "script": ""}]
+    assert load_scenarios(records) == [{"ic/vc-kts": 110, "run_id": "0"},
+                                       {"ap/airspeed_setpoint": 150.0, "run_id": "1"}]
+    df = pd.DataFrame(records)
+    assert load_scenarios(df)[1] == {"ap/airspeed_setpoint": 150.0, "run_id": "1"}
+
+
+def test_sparse_scenarios_run(tmp_path):
+    pytest.importorskip("jsbsim")
+    path = tmp_path / "scenarios.csv"
+    path.write_text(SPARSE_CSV)
+    _init_worker("./lyj_init.xml", None, None)
+    for row in load_scenarios(str(path)):
+        result = run_scenario(row, max_time=1.0)
+        assert result["status"] == "ok", result["error"]
+        assert result["sim_time"] <= float(row.get("max_time", 1.0)) + 0.01
+
+
+def test_results_keep_columns_blank_in_first_row(tmp_path):
+    pytest.importorskip("jsbsim")
+    results = tmp_path / "results.csv"
+    # 已有结果文件只有最早一批的列，追加时需要扩展表头而不是丢列
+    results.write_text("run_id,status,error,wall_time,ic/vc-kts\nold,ok,,0.1,100\n")
+    scenarios = [{"run_id": "a", "ic/vc-kts": 110}, {"run_id": "b", "ap/airspeed_setpoint": 150, "ap/airspeed_hold": 1}]
+    BatchRunner(scenarios, results_csv=str(results), workers=1, max_time=0.5).run()
+    with open(results, newline="") as f:
+        rows = {row["run_id"]: row for row in csv.DictReader(f)}
+    assert set(rows) == {"old", "a", "b"}
+    assert rows["old"]["ic/vc-kts"] == "100" and rows["old"]["ap/airspeed_setpoint"] == ""
+    assert rows["b"]["ap/airspeed_setpoint"] == "150" and rows["b"]["ap/airspeed_hold"] == "1"
+    assert rows["b"]["status"] == "ok" and rows["b"]["final_vc_kts"]
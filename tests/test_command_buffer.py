@@ -0,0 +1,17 @@
+import pytest
+
+from command_buffer import CommandBuffer
+
+
+def test_unknown_property_is_rejected(c310):
+    fdm = c310
+    buf = CommandBuffer(fdm)
+    with pytest.raises(ValueError):
+        buf.set_many({"ap/airspeed_setpoint": 150.0, "ap/airspeed_setpiont": 150.0})
+    assert fdm.get_property_manager().get_node("ap/airspeed_setpiont", False) is None
+    assert buf.pending() == 0
+    assert buf.stats()["rejected"] == 2
+
+    buf.set("ap/airspeed_setpoint", 150.0)
+    assert buf.apply(0.0) == 1
+    assert fdm["ap/airspeed_setpoint"] == 150.0
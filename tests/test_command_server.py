@@ -0,0 +1,67 @@
+import socket
+import time
+
+import pytest
+
+import command_server
+from command_server import CommandClient, CommandServer
+
+
+class FakeState:
+    names = ("h", "v")
+    values = (1.0, 2.0)
+
+
+class FakeSim:
+    def __init__(self):
+        self.step = 0
+        self.sim_time = 0.0
+        self.state = FakeState()
+
+    def add_commands(self, updates, at=None):
+        pass
+
+
+def _free_port(kind):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_start_raises_when_port_in_use():
+    busy = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    busy.bind(("127.0.0.1", 0))
+    busy.listen()
+    try:
+        server = CommandServer(FakeSim(), tcp_port=busy.getsockname()[1], udp_port=None)
+        with pytest.raises(OSError):
+            server.start()
+        server.thread.join(1.0)
+        assert not server.thread.is_alive()
+    finally:
+        busy.close()
+
+
+def test_udp_subscription_expires_without_renewal(monkeypatch):
+    monkeypatch.setattr(command_server, "UDP_LEASE", 0.3)
+    sim = FakeSim()
+    port = _free_port(socket.SOCK_DGRAM)
+    server = CommandServer(sim, tcp_port=None, udp_port=port).start()
+    try:
+        client = CommandClient(port=port, timeout=0.5)
+        assert client.subscribe(50)[0] == command_server.STATUS_OK
+        assert len(server._subscriptions) == 1
+        time.sleep(0.6)
+        assert server._subscriptions == {}
+
+        # recv_state 在租期过半时自动续订
+        client.subscribe(50)
+        for _ in range(8):
+            sim.step += 1
+            client.recv_state()
+            time.sleep(0.1)
+        assert len(server._subscriptions) == 1
+        client.close()
+    finally:
+        server.stop()
+    assert not server.thread.is_alive()
@@ -0,0 +1,61 @@
+import pytest
+
+from events import EventEngine
+
+
+def _fly(fdm, engine, until):
+    # 与 run_simulation 相同：每步先推进 FDM，再更新事件；返回 {事件名: 首次触发时刻}
+    fired = {}
+    while not until():
+        fdm.run()
+        t = fdm.get_sim_time()
+        before = {e.name: e.fired for e in engine.events}
+        engine.update(t)
+        for e in engine.events:
+            if e.fired > before[e.name]:
+                fired.setdefault(e.name, t)
+    return fired
+
+
+def test_zzy_land_v1_events_fire_once_in_order(c310):
+    engine = EventEngine(c310, verbose=False).load("zzy_land_v1.xml")
+    assert engine.initialize == "land_v1" and engine.end_time == 1000.0
+    dt = c310.get_delta_t()
+    fired = _fly(c310, engine, lambda: c310["simulation/terminate"] or c310.get_sim_time() > 120.0)
+    names = [e.name for e in engine.events]
+    assert list(fired) == names
+    # 时间门限事件在条件首次成立的那一步触发；条件之后一直为真也只触发一次
+    assert 0.25 <= fired[names[0]] < 0.25 + 2 * dt
+    assert 2.0 <= fired[names[1]] < 2.0 + 2 * dt
+    assert all(e.fired == 1 for e in engine.events)
+    assert engine.pending() == 0
+    (t_rev, _, rev), (t_end, _, end) = engine.notifications
+    assert rev["position/h-agl-ft"] < 15.0 and end["position/h-agl-ft"] < 5.0 and t_rev < t_end
+
+
+def test_rising_edge_persistent_and_delay(c310):
+    engine = EventEngine(c310, verbose=False)
+    flag = engine.node("test/flag")
+    once = engine.add("once", "test/flag eq 1", [("test/once", 1, {"type": "FG_DELTA"})])
+    again = engine.add("again", "test/flag eq 1", [("test/again", 1, {"type": "FG_DELTA"})], persistent=True)
+    engine.add("later", "test/flag eq 1", {"test/later": 1.0}, delay=0.5)
+
+    def run(value, t):
+        flag.set_double_value(value)
+        engine.update(t)
+
+    run(1, 1.0)
+    run(1, 1.1)
+    # 条件保持为真时不重复触发
+    assert (c310["test/once"], c310["test/again"]) == (1.0, 1.0)
+    assert c310["test/later"] == 0.0
+    run(0, 1.4)
+    assert c310["test/later"] == 0.0
+    run(0, 1.5)
+    assert c310["test/later"] == 1.0
+    # 条件再次由假变真：只有 persistent 事件重新触发
+    run(1, 2.0)
+    assert (c310["test/once"], c310["test/again"]) == (1.0, 2.0)
+    assert (once.fired, again.fired) == (1, 2)
+    with pytest.raises(ValueError):
+        engine.add("bad", "test/flag is 1", {})
@@ -0,0 +1,30 @@
+import pytest
+
+from fcs_core import StateSnapshot, capture_inputs, restore_inputs
+
+
+def test_snapshot_reads_fields_in_order(c310):
+    state = StateSnapshot(c310)
+    values = state.update(1.5)
+    assert state.names[0] == "time" and values[0] == 1.5
+    for name, prop in StateSnapshot.DEFAULT_FIELDS:
+        assert state[name] == c310[prop]
+    assert state.as_dict()["vc_kts"] == c310["velocities/vc-kts"]
+
+    custom = StateSnapshot(c310, [("hdot_fps", "velocities/h-dot-fps")])
+    assert custom.names == ("time", "hdot_fps") and "hdot_fps" in custom and "roll" not in custom
+    with pytest.raises(ValueError):
+        StateSnapshot(c310, [("bad", "velocities/no-such-property")])
+
+
+def test_input_capture_restore_round_trip(c310):
+    saved = capture_inputs(c310)
+    before = StateSnapshot(c310).update(0.0)
+    setpoint, throttle = c310["ap/airspeed_setpoint"], c310["fcs/throttle-cmd-norm[0]"]
+    c310["ap/airspeed_setpoint"] = setpoint + 50.0
+    c310["fcs/throttle-cmd-norm[0]"] = 0.3
+    restore_inputs(saved)
+    assert c310["ap/airspeed_setpoint"] == setpoint
+    assert c310["fcs/throttle-cmd-norm[0]"] == throttle
+    c310.reset_to_initial_conditions(0)
+    assert StateSnapshot(c310).update(0.0) == pytest.approx(before)
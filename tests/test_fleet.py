@@ -0,0 +1,11 @@
+from fleet import _advance, _build_member
+
+
+def test_member_log_ends_with_touchdown_row():
+    sim = _build_member({"name": "c310_0"}, "./lyj_init.xml", 400.0, None, None)
+    sim.load_events("zzy_land_v1.xml")
+    while not _advance(sim):
+        pass
+    last = sim.recorder.recent(1)[-1]
+    assert last[sim.state.index["altitude_ft"]] < 5.0
+    assert last[0] == sim.sim_time
@@ -0,0 +1,42 @@
+import numpy as np
+
+from flight_recorder import FlightRecorder, map_binary, read_binary
+
+NAMES = ("time", "altitude_ft")
+
+
+def _row(i):
+    return (i * 0.5, 1000.0 + i)
+
+
+def test_ring_keeps_latest_rows_in_order():
+    rec = FlightRecorder(NAMES, chunk_size=4, retention=6)
+    for i in range(15):
+        rec.append(_row(i))
+    assert len(rec) == 6
+    assert rec.recent()[:, 1].tolist() == [1009.0 + k for k in range(6)]
+    assert rec.recent(2)[:, 0].tolist() == [6.5, 7.0]
+    assert rec.column("altitude_ft", 1).tolist() == [1014.0]
+
+
+def test_chunked_flush_and_binary_round_trip(tmp_path):
+    csv_file, bin_file = tmp_path / "log.csv", tmp_path / "log.bin"
+    rec = FlightRecorder(NAMES, csv_file=str(csv_file), bin_file=str(bin_file), chunk_size=4, retention=6)
+    for i in range(10):
+        rec.append(_row(i))
+        # 每满一个数据块落盘一次
+        assert rec.flushed == (i + 1) // 4 * 4
+    rec.close()
+    expected = np.array([_row(i) for i in range(10)])
+
+    names, data = read_binary(str(bin_file))
+    assert names == NAMES and np.array_equal(data, expected)
+    names, mm = map_binary(str(bin_file))
+    assert names == NAMES and np.array_equal(np.asarray(mm), expected)
+    assert np.array_equal(np.loadtxt(csv_file, delimiter=",", skiprows=1), expected)
+
+    # 崩溃时留下的半行被丢弃
+    with open(bin_file, "ab") as f:
+        f.write(b"\0" * 8)
+    assert read_binary(str(bin_file))[1].shape == (10, 2)
+    assert map_binary(str(bin_file))[1].shape == (10, 2)
@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+import pytest
+
+from fcs_core import AircraftSimulation
+from landing_analytics import LandingAnalytics
+
+pytest.importorskip("pandas")
+
+
+@pytest.fixture(scope="module")
+def landing_log(tmp_path_factory):
+    # 用 fcs_core 实际飞一次 zzy_land_v1 降落
+    path = tmp_path_factory.mktemp("landing") / "land.csv"
+    sim = AircraftSimulation(max_time=400.0, log_csv=str(path))
+    sim.print_enable = False
+    sim.load_events("zzy_land_v1.xml")
+    sim.run_simulation()
+    return path
+
+
+def _metrics(path):
+    return LandingAnalytics(str(path), cache_dir=None).metrics()
+
+
+def test_fcs_core_landing_is_detected(landing_log):
+    m = _metrics(landing_log)
+    assert m["landed"][0] == 1
+    assert m["touchdown_time"][0] < 400.0
+    assert math.isfinite(m["sink_rate_fps"][0]) and m["sink_rate_fps"][0] > 0
+    assert math.isfinite(m["touchdown_vc_kts"][0])
+
+
+def test_log_ending_one_step_above_touchdown_counts_as_landed(landing_log, tmp_path):
+    # 旧记录没有接地那一步：去掉最后一行后仍应判为接地
+    lines = landing_log.read_text().splitlines()
+    truncated = tmp_path / "truncated.csv"
+    truncated.write_text("\n".join(lines[:-1]) + "\n")
+    alt = np.array([float(line.split(",")[1]) for line in lines[-2:]])
+    assert alt[0] >= 5.0 > alt[1]
+    m = _metrics(truncated)
+    assert m["landed"][0] == 1
+    assert math.isfinite(m["sink_rate_fps"][0])
+
+    # 平飞结束的记录不算接地
+    level = tmp_path / "level.csv"
+    level.write_text(lines[0] + "\n0.0,500,29.6,-95.1,120,0,0,0\n0.1,500,29.6,-95.1,120,0,0,0\n")
+    assert _metrics(level)["landed"][0] == 0
@@ -0,0 +1,25 @@
+import pytest
+
+from output_scheduler import OutputGate
+
+
+def test_average_wraps_angles():
+    # 列: time, roll [-180, 180), yaw [0, 360), 普通量
+    gate = OutputGate(rate=10.0, mode="average", angle_ranges={1: -180.0, 2: 0.0})
+    assert gate.push([0.0, 0.0, 0.0, 0.0]) == [0.0, 0.0, 0.0, 0.0]
+    samples = [(0.025, 178.0, 358.0, 1.0), (0.05, -178.0, 359.0, 2.0),
+               (0.075, 178.0, 1.0, 3.0), (0.1, -176.0, 4.0, 4.0)]
+    outputs = [gate.push(list(s)) for s in samples]
+    assert outputs[:3] == [None, None, None]
+    t, roll, yaw, value = outputs[3]
+    assert t == 0.1
+    assert roll == pytest.approx(-179.5)
+    assert yaw == pytest.approx(0.5)
+    assert value == pytest.approx(2.5)
+
+
+def test_decimate_rate():
+    gate = OutputGate(rate=30.0)
+    emitted = [step / 120.0 for step in range(121) if gate.push([step / 120.0]) is not None]
+    assert len(emitted) == 31
+    assert emitted[1] == pytest.approx(4 / 120.0)
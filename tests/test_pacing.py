@@ -0,0 +1,57 @@
+import pytest
+
+import pacing
+from pacing import Pacer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(pacing, "time", clock)
+    return clock
+
+
+def test_catchup_within_budget_then_realign(clock):
+    pacer = Pacer(realtime_factor=2.0, max_catchup=0.25)
+    pacer.start(0.0)
+    pacer.wait(0.2)
+    # 2 倍速：0.2s 仿真时间对应 0.1s 墙钟
+    assert clock.now == pytest.approx(100.1)
+
+    # 落后 0.1s（未超出预算）：不等待，连续追赶，不丢弃时间
+    clock.now += 0.2
+    pacer.wait(0.3)
+    assert pacer.overruns == 1 and pacer.dropped_time == 0.0
+    slept = pacer.slept
+    pacer.wait(0.4)
+    assert pacer.slept == slept
+    pacer.wait(0.8)
+    assert clock.now == pytest.approx(100.4)
+
+    # 落后 0.5s 超出预算：丢弃落后的时间，从当前时刻重新对齐
+    clock.now += 0.5
+    pacer.wait(1.0)
+    assert pacer.dropped_time == pytest.approx(0.4)
+    before = clock.now
+    pacer.wait(1.2)
+    assert clock.now - before == pytest.approx(0.1)
+    assert pacer.stats()["max_lag_ms"] == pytest.approx(400.0)
+
+
+def test_unpaced_never_sleeps(clock):
+    pacer = Pacer(realtime_factor=None)
+    pacer.start(0.0)
+    for k in range(10):
+        pacer.wait(k * 10.0)
+    assert clock.now == 100.0 and pacer.steps == 10 and not pacer.enabled
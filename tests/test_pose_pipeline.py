@@ -0,0 +1,50 @@
+import socket
+import time
+
+import pytest
+
+pytest.importorskip("msgpackrpc")
+
+from airsim_stub import StubAirSimServer, StubClient
+from pose_pipeline import PoseUpdater
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(mapping, key):
+    # msgpack 旧版本把字符串解码为 bytes
+    return mapping[key] if key in mapping else mapping[key.encode()]
+
+
+def test_pose_updater_against_stub_server():
+    port = _free_port()
+    server = StubAirSimServer(port=port, latency=0.005).start()
+    time.sleep(0.1)
+    updater = PoseUpdater(StubClient(port=port), make_pose=lambda p: p, idle_unpause=0.2)
+    handler = server.handler
+    try:
+        frames = 60
+        for i in range(frames):
+            updater.submit({"ned_n": float(i), "ned_e": 0.0, "ned_d": 0.0})
+        assert updater.flush(5.0)
+
+        # 渲染端跟不上时只发送最新位姿，最后一帧一定送达
+        assert updater.replaced > 0
+        assert handler.calls["simSetVehiclePose"] == updater.sent < frames
+        assert _get(_get(handler.poses, "drone_1"), "ned_n") == frames - 1
+
+        # 连续帧只暂停一次，不逐帧 pause/unpause
+        assert handler.calls["simPause"] == 1
+        assert handler.paused
+
+        # 空闲 idle_unpause 后恢复运行
+        time.sleep(0.5)
+        assert not handler.paused
+        assert handler.calls["simPause"] == 2
+    finally:
+        updater.stop()
+        server.stop()
@@ -0,0 +1,24 @@
+import pytest
+
+from profiler import STAGES, StageProfiler
+
+
+def test_snapshot_per_stage_and_window():
+    prof = StageProfiler(window=4)
+    prof.gauges["queue"] = lambda: 3
+    assert prof.snapshot()["steps"] == 0 and "step" not in prof.snapshot()
+    for k in range(6):
+        prof.begin()
+        # 用固定的阶段时刻代替真实计时，第 k 步每个阶段耗时 (k + 1) 毫秒
+        base = prof._marks[0]
+        for i in range(len(STAGES)):
+            prof._marks[i + 1] = base + (i + 1) * (k + 1) * 1e-3
+        prof.end()
+    snap = prof.snapshot()
+    assert snap["steps"] == 6 and snap["window"] == 4
+    assert snap["queue"] == 3
+    # 窗口中只保留最近 4 步（k = 2..5）
+    assert snap["fdm"]["max_ms"] == pytest.approx(6.0)
+    assert snap["fdm"]["mean_ms"] == pytest.approx(4.5)
+    assert snap["step"]["max_ms"] == pytest.approx(6.0 * len(STAGES))
+    assert "(PROFILE)步数:6" in prof.report()
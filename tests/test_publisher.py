@@ -0,0 +1,28 @@
+import socket
+import time
+
+from publisher import TelemetryPublisher, TelemetrySubscriber
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_subscriber_by_hostname_skips_renewal_replies():
+    port = _free_port()
+    pub = TelemetryPublisher(host="127.0.0.1", control_port=port, lease=0.2)
+    pub.set_schema(("time", "h"))
+    sub = TelemetrySubscriber(host="localhost", control_port=port, timeout=0.5)
+    try:
+        assert sub.fields == ("time", "h")
+        for step in range(6):
+            # 超过 lease 的一半后 recv() 会续订，回复不能被当作状态帧解码
+            time.sleep(0.12)
+            pub.publish((step * 0.1, 100.0 + step))
+            assert sub.recv() == {"time": step * 0.1, "h": 100.0 + step, "seq": step}
+        assert pub.stats()["subscribers"] == 1
+    finally:
+        sub.close()
+        pub.stop()
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from replay import ReplayEngine, TrajectorySource
+
+pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def track(tmp_path):
+    # 0..10 秒、10Hz 的直线轨迹，中间混入时间为空和无法解析的行
+    lines = ["time,lon_deg,lat_deg,altitude_ft,roll,pitch,yaw"]
+    for i in range(101):
+        lines.append(f"{i / 10},{-95.1 + i * 1e-5},29.6,{500 + i},0,2,10")
+        if i == 30:
+            lines.append(",-95.0,29.6,500,0,2,10")
+            lines.append("bad,-95.0,29.6,500,0,2,10")
+    path = tmp_path / "track.csv"
+    path.write_text("\n".join(lines) + "\n")
+    return TrajectorySource(str(path), chunk_rows=16)
+
+
+def test_rows_without_time_are_dropped(track):
+    assert len(track) == 101
+    assert (track.start_time, track.end_time) == (0.0, 10.0)
+    for t in (3.0, 3.05, 7.25):
+        assert track.sample(t, interpolate=False)["time"] == pytest.approx(int(t * 10) / 10)
+    # 北向为 0 的直线，下方向随高度线性变化
+    assert track.sample(5.05)["ned_d"] == pytest.approx((track.sample(5.0)["ned_d"] + track.sample(5.1)["ned_d"]) / 2)
+
+
+def test_seek_and_pause(track):
+    engine = ReplayEngine(track, sink=lambda frame: None)
+    engine.seek(4.0)
+    assert engine.position() == pytest.approx(4.0, abs=0.05)
+    engine.seek(99.0)
+    assert engine.position() >= 10.0
+    engine.seek(2.0)
+    engine.pause()
+    held = engine.position()
+    time.sleep(0.1)
+    assert engine.position() == held
+    engine.resume()
+    time.sleep(0.1)
+    assert engine.position() == pytest.approx(held + 0.1, abs=0.05)
+
+
+def test_run_reaches_end_at_speed(track):
+    frames = []
+    engine = ReplayEngine(track, sink=frames.append, speed=50.0, fps=100.0)
+    engine.seek(8.0)
+    thread = threading.Thread(target=engine.run)
+    thread.start()
+    thread.join(2.0)
+    assert not thread.is_alive()
+    assert frames[0]["time"] >= 8.0 and frames[-1]["time"] == 10.0
+    times = [f["time"] for f in frames]
+    assert times == sorted(times)
@@ -0,0 +1,25 @@
+import socket
+
+from sim_sender import SimDataSender
+from telemetry import TelemetryDecoder
+
+
+def test_async_stop_drains_from_sender_thread():
+    recv = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    recv.bind(("127.0.0.1", 0))
+    recv.settimeout(1.0)
+    sender = SimDataSender(port=recv.getsockname()[1], async_mode=True, coalesce=False, queue_size=1000)
+    try:
+        for i in range(200):
+            sender.send_udp({"time": i * 0.01, "altitude": 100.0 + i})
+        sender.stop()
+        assert not sender._thread.is_alive()
+        assert sender.sock.fileno() == -1
+        assert sender.sent + sender.dropped == 200 and sender.errors == 0
+        decoder = TelemetryDecoder()
+        frames = []
+        for _ in range(sender.sent):
+            frames.extend(decoder.decode(recv.recv(65535)))
+        assert frames[-1]["altitude"] == 299.0
+    finally:
+        recv.close()
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+from state_bus import PID_OFFSET, STATUS, StateBus, StateBusReader
+
+
+def _name():
+    return f"sbus_test_{uuid.uuid4().hex[:8]}"
+
+
+def test_live_bus_is_not_reclaimed():
+    name = _name()
+    bus = StateBus(("time", "h"), name=name)
+    try:
+        bus.publish((1.0, 2.0))
+        with pytest.raises(ValueError):
+            StateBus(("time", "h"), name=name)
+        reader = StateBusReader(name, timeout=0.5)
+        assert reader.read()[1] == (1.0, 2.0)
+        reader.close()
+    finally:
+        bus.close()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="残留块只在 POSIX 上存在")
+def test_bus_of_exited_writer_is_reclaimed():
+    name = _name()
+    stale = StateBus(("time", "h"), name=name)
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True).stdout.strip()
+    STATUS.pack_into(stale.shm.buf, PID_OFFSET, int(dead))
+    stale._data.release()
+    stale.shm.close()
+    bus = StateBus(("time", "h", "v"), name=name)
+    try:
+        reader = StateBusReader(name, timeout=0.5)
+        assert reader.names == ("time", "h", "v")
+        reader.close()
+    finally:
+        bus.close()
@@ -0,0 +1,38 @@
+import pytest
+
+from telemetry import (FRAME_FIELDS, SEQ_MOD, TelemetryDecoder, decode_fleet, decode_frames, encode_fleet,
+                       encode_frames)
+
+
+def _values(k):
+    return tuple(float(k + i) for i in range(len(FRAME_FIELDS)))
+
+
+def test_frames_and_fleet_round_trip():
+    frames = [(1, _values(0)), (SEQ_MOD + 2, _values(1))]
+    assert decode_frames(encode_frames(frames)) == [(1, _values(0)), (2, _values(1))]
+    assert decode_frames(b'{"time": 1.5, "yaw": 90}')[0][1][FRAME_FIELDS.index("yaw")] == 90.0
+    with pytest.raises(ValueError):
+        decode_frames(encode_frames(frames)[:-1])
+
+    rows = [_values(0)[1:], _values(5)[1:]]
+    seq, sim_time, vehicles = decode_fleet(encode_fleet(7, 2.5, [3, 9], rows))
+    assert (seq, sim_time) == (7, 2.5)
+    assert vehicles == [(3, rows[0]), (9, rows[1])]
+
+
+def test_decoder_counts_loss_reorder_and_duplicates():
+    dec = TelemetryDecoder()
+
+    def feed(seq):
+        return len(dec.decode(encode_frames([(seq, _values(seq))])))
+
+    assert [feed(s) for s in (0, 1, 4)] == [1, 1, 1]
+    assert dec.stats()["lost"] == 2
+    # 迟到的 2 冲抵一次丢包，重复的 2 和 4 只计为重复
+    assert [feed(s) for s in (2, 2, 4, 1)] == [0, 0, 0, 0]
+    assert dec.stats() == {"received": 7, "lost": 1, "reordered": 1, "duplicates": 3}
+    # 序号回绕不算丢包
+    dec = TelemetryDecoder()
+    assert [feed(s) for s in (SEQ_MOD - 1, 0)] == [1, 1]
+    assert dec.stats()["lost"] == 0
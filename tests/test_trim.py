@@ -0,0 +1,27 @@
+import json
+import multiprocessing
+
+from trim import TrimCache
+
+WORKERS = 4
+POINTS = 15
+
+
+def _add_points(cache_file, worker):
+    cache = TrimCache(cache_file=cache_file)
+    for i in range(POINTS):
+        cache.cache.setdefault("k", []).append({"vc_kts": 100.0 + worker, "h_sl_ft": 1000.0 * i, "settled": True})
+        cache._save()
+
+
+def test_concurrent_saves_keep_every_point(tmp_path):
+    cache_file = str(tmp_path / "trim_cache.json")
+    procs = [multiprocessing.Process(target=_add_points, args=(cache_file, w)) for w in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    with open(cache_file) as f:
+        points = json.load(f)["k"]
+    assert len(points) == WORKERS * POINTS
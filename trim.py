@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+
+import jsbsim
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，用 msvcrt 的字节锁
+    fcntl = None
+    import msvcrt
+
+# 配平求解与缓存
+# c310 为活塞发动机，推力取决于转速状态，JSBSim 自带的 do_trim 在 dt=0 下看不到油门的作用（udot 不可配平），
+# 因此这里用闭环稳定求解：自动驾驶保持高度/航向，外加油门 PI 保持空速，直到稳定后记录
+# 油门、升降舵（高度保持积分器）、俯仰角和迎角
+# 缓存按 飞机模型 + 自动驾驶文件 + 初始条件文件 的哈希分组，每组内按 (空速, 海拔) 保存多个配平点，
+# 附近的请求由周围的配平点线性插值得到，不再重新求解
+TRIM_FIELDS = ("throttle", "elevator", "integral", "theta_deg", "alpha_deg")
+
+# 插值时各轴的邻域半径
+NEIGHBOR_RADIUS = {"vc_kts": 10.0, "h_sl_ft": 1000.0}
+# 视为同一配平点的容差
+MATCH_TOL = {"vc_kts": 0.05, "h_sl_ft": 1.0}
+
+
+def _model_files(aircraft_dir, model):
+    # 飞机配置文件及其引用的系统/自动驾驶文件
+    path = os.path.join(aircraft_dir, f"{model}.xml")
+    files = [path]
+    root = ET.parse(path).getroot()
+    for tag in ("system", "autopilot", "flight_control"):
+        for el in root.iter(tag):
+            ref = el.get("file")
+            if not ref:
+                continue
+            for p in (os.path.join(aircraft_dir, ref + ".xml"), os.path.join(aircraft_dir, "Systems", ref + ".xml")):
+                if os.path.exists(p):
+                    files.append(p)
+                    break
+    return files
+
+
+def config_key(aircraft_dir, model, init_xml):
+    h = hashlib.sha1()
+    for path in _model_files(aircraft_dir, model) + [init_xml]:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+@contextmanager
+def _file_lock(path):
+    # 进程间互斥锁，锁在独立的 .lock 文件上，缓存文件本身仍用 os.replace 原子替换
+    with open(path + ".lock", "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class TrimCache:
+    # cache_file 为 JSON 缓存文件；settle_time 为单次求解的最长仿真时间(秒)
+    def __init__(self, cache_file="trim_cache.json", init_xml="./lyj_init.xml", model="c310", settle_time=600.0,
+                 throttle_kp=0.02, throttle_ki=0.004):
+        self.cache_file = cache_file
+        self.init_xml = init_xml
+        self.model = model
+        self.settle_time = settle_time
+        self.throttle_kp = throttle_kp
+        self.throttle_ki = throttle_ki
+        self._fdm = None
+        self.key = None
+        self.hits = 0
+        self.interpolated = 0
+        self.solved = 0
+        self.cache = {}
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file) as f:
+                self.cache = json.load(f)
+
+    def _solver(self):
+        # 求解用的 FDM 只加载一次
+        if self._fdm is None:
+            fdm = jsbsim.FGFDMExec(root_dir=None)
+            fdm.set_debug_level(0)
+            fdm.load_model(self.model)
+            fdm.load_ic(self.init_xml, True)
+            fdm.run_ic()
+            self._fdm = fdm
+            self.key = config_key(fdm.get_full_aircraft_path(), self.model, self.init_xml)
+        return self._fdm
+
+    def points(self):
+        self._solver()
+        return self.cache.setdefault(self.key, [])
+
+    def _same(self, a, b):
+        return all(abs(a[axis] - b[axis]) <= tol for axis, tol in MATCH_TOL.items())
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        # 批量运行时多个进程共用缓存文件，读取-合并-写入整体加锁，避免互相覆盖其他进程新增的配平点
+        with _file_lock(self.cache_file):
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file) as f:
+                    on_disk = json.load(f)
+                for key, points in on_disk.items():
+                    mine = self.cache.setdefault(key, [])
+                    mine.extend(p for p in points if not any(self._same(p, q) for q in mine))
+            tmp = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.cache, f, indent=1)
+            os.replace(tmp, self.cache_file)
+
+    def lookup(self, vc_kts, h_sl_ft):
+        # 命中缓存或可插值时返回配平解，否则返回 None
+        points = self.points()
+        request = {"vc_kts": vc_kts, "h_sl_ft": h_sl_ft}
+        for p in points:
+            if self._same(p, request):
+                self.hits += 1
+                return p
+        near = [p for p in points if p["settled"]
+                and abs(p["vc_kts"] - vc_kts) <= NEIGHBOR_RADIUS["vc_kts"]
+                and abs(p["h_sl_ft"] - h_sl_ft) <= NEIGHBOR_RADIUS["h_sl_ft"]]
+        if len(near) < 2:
+            return None
+        # 局部线性拟合，只在邻近点范围内插值，不外推
+        columns = [np.ones(len(near))]
+        for axis, value in request.items():
+            values = np.array([p[axis] for p in near])
+            if np.ptp(values) <= MATCH_TOL[axis]:
+                if abs(value - values.mean()) > MATCH_TOL[axis]:
+                    return None
+                continue
+            if not values.min() <= value <= values.max():
+                return None
+            columns.append(values - value)
+        A = np.column_stack(columns)
+        if np.linalg.matrix_rank(A) < A.shape[1]:
+            return None
+        Y = np.array([[p[name] for name in TRIM_FIELDS] for p in near])
+        coef = np.linalg.lstsq(A, Y, rcond=None)[0]
+        self.interpolated += 1
+        return dict(request, settled=True, interpolated=True, **dict(zip(TRIM_FIELDS, coef[0].tolist())))
+
+    def get(self, vc_kts, h_sl_ft):
+        solution = self.lookup(vc_kts, h_sl_ft)
+        if solution is None:
+            solution = self.solve(vc_kts, h_sl_ft)
+        if not solution["settled"]:
+            print(f"(TRIM)警告: vc={vc_kts:.1f}kts, h={h_sl_ft:.0f}ft 无法配平(油门饱和或未收敛)")
+        return solution
+
+    def solve(self, vc_kts, h_sl_ft):
+        fdm = self._solver()
+        fdm.load_ic(self.init_xml, True)
+        fdm["ic/vc-kts"] = vc_kts
+        fdm["ic/h-sl-ft"] = h_sl_ft
+        fdm.reset_to_initial_conditions(0)
+        fdm["fcs/mixture-cmd-norm[0]"] = 1.0
+        fdm["fcs/mixture-cmd-norm[1]"] = 1.0
+        fdm["fcs/advance-cmd-norm[0]"] = 1.0
+        fdm["fcs/advance-cmd-norm[1]"] = 1.0
+        fdm["propulsion/magneto_cmd"] = 3
+        fdm["propulsion/starter_cmd"] = 1
+        fdm["propulsion/set-running"] = -1
+        fdm["ap/altitude_setpoint"] = h_sl_ft
+        fdm["ap/altitude_hold"] = 1
+        fdm["ap/heading_setpoint"] = fdm["attitude/psi-deg"]
+        fdm["ap/heading-setpoint-select"] = 0
+        fdm["ap/heading_hold"] = 1
+        fdm["ap/attitude_hold"] = 1
+        fdm["ap/yaw_damper"] = 1
+
+        dt = fdm.get_delta_t()
+        check_every = max(1, int(round(1.0 / dt)))
+        throttle = 0.8
+        integ = 0.0
+        stable = 0
+        settled = False
+        for i in range(int(self.settle_time / dt)):
+            err = vc_kts - fdm["velocities/vc-kts"]
+            integ += err * dt
+            throttle = min(1.0, max(0.0, 0.8 + self.throttle_kp * err + self.throttle_ki * integ))
+            fdm["fcs/throttle-cmd-norm[0]"] = throttle
+            fdm["fcs/throttle-cmd-norm[1]"] = throttle
+            fdm.run()
+            if i % check_every == 0:
+                # 连续 5 秒满足空速、升降率和高度误差条件视为稳定
+                if (abs(err) < 0.05 and abs(fdm["velocities/h-dot-fps"]) < 0.05
+                        and abs(fdm["position/h-sl-ft"] - h_sl_ft) < 1.0):
+                    stable += 1
+                else:
+                    stable = 0
+                if stable >= 5:
+                    settled = 0.0 < throttle < 1.0
+                    break
+        solution = {
+            "vc_kts": vc_kts, "h_sl_ft": h_sl_ft, "settled": settled,
+            "throttle": throttle, "elevator": fdm["ap/elevator_cmd"], "integral": fdm["fcs/integral"],
+            "theta_deg": fdm["attitude/theta-deg"], "alpha_deg": fdm["aero/alpha-deg"],
+            "settle_time": fdm.get_sim_time(),
+        }
+        self.solved += 1
+        self.points().append(solution)
+        self._save()
+        return solution
+
+    def apply(self, fdm):
+        # 在 fdm 完成初始化（run_ic）后调用：按当前初始条件的空速和海拔取配平解，
+        # 写入迎角/俯仰角后重新初始化，并设置油门和高度保持积分器，返回配平解
+        return apply_solution(fdm, self.get(fdm["velocities/vc-kts"], fdm["position/h-sl-ft"]))
+
+    def stats(self):
+        return {"hits": self.hits, "interpolated": self.interpolated, "solved": self.solved,
+                "points": len(self.points())}
+
+
+def apply_solution(fdm, solution):
+    # 写入配平解，会话重放时直接使用记录的配平解
+    fdm["ic/alpha-deg"] = solution["alpha_deg"]
+    fdm["ic/theta-deg"] = solution["theta_deg"]
+    fdm.reset_to_initial_conditions(0)
+    fdm["propulsion/set-running"] = -1
+    fdm["fcs/throttle-cmd-norm[0]"] = solution["throttle"]
+    fdm["fcs/throttle-cmd-norm[1]"] = solution["throttle"]
+    # 升降舵命令 = -(积分器 + 比例项)，平飞时比例项为零，积分器即配平升降舵
+    fdm["fcs/integral/initial-integrator-value"] = solution["integral"]
+    return solution